@@ -51,11 +51,11 @@ def comp(optimizers, parameters, additional):
 
 
 def run():
-    return yatuner.utils.fetch_perf_stat(out)[metric] / 1000
+    return yatuner.utils.spawn([out])[metric] / 1000
 
 
 def perf():
-    return yatuner.utils.fetch_perf_stat(out)
+    return yatuner.perf.fetch_perf_stat(out)
 
 
 tuner = yatuner.Tuner(comp,
@@ -66,7 +66,7 @@ tuner = yatuner.Tuner(comp,
                       norm_range=0.99)
 
 tuner.initialize()
-tuner.test_run(num_samples=200, warmup=10)
+tuner.test_run(num_samples=200, warmup='auto')
 tuner.hypotest_optimizers(num_samples=5, num_epochs=30)
 tuner.hypotest_parameters(num_samples=5)
 # tuner.optimize(num_samples=10, num_epochs=50)
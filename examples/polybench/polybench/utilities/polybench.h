@@ -218,6 +218,15 @@ extern void polybench_timer_stop();
 extern void polybench_timer_print();
 # endif
 
+/* yaTuner region of interest, see yatuner/include/yatuner_roi.h */
+# ifdef YATUNER_ROI
+#  include <yatuner_roi.h>
+#  undef polybench_start_instruments
+#  undef polybench_stop_instruments
+#  define polybench_start_instruments yatuner_roi_begin();
+#  define polybench_stop_instruments yatuner_roi_end();
+# endif
+
 /* PAPI support. */
 # ifdef POLYBENCH_PAPI
 extern int polybench_papi_start_counter(int evid);
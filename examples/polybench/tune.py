@@ -20,6 +20,7 @@ base = '-O3'
 build_dir = './build'
 workspace_dir = './workspace'
 metric = 'duration_time'
+fidelities = ['MINI', 'SMALL', 'MEDIUM']
 
 if not os.path.isdir(build_dir):
     os.mkdir(build_dir)
@@ -47,8 +48,12 @@ logger.setLevel(logging.INFO)
 
 for case_dir, case_name in benchmark_list:
 
-    def comp(optimizers, parameters, additional):
-        options = '-DMEDIUM_DATASET '
+    def comp(optimizers,
+             parameters,
+             additional,
+             build_dir=build_dir,
+             fidelity='MEDIUM'):
+        options = f'-D{fidelity}_DATASET '
 
         if additional is not None:
             options += f'{additional} '
@@ -64,6 +69,7 @@ for case_dir, case_name in benchmark_list:
                 options += f'--param={parameter}={val} '
 
         options += f'-I {case_dir} -I polybench/utilities '
+        options += f'-DYATUNER_ROI -I {yatuner.utils.fetch_include_dir()} '
 
         lm = ''
 
@@ -78,12 +84,14 @@ for case_dir, case_name in benchmark_list:
         if res['returncode'] != 0:
             raise RuntimeError(res['stderr'])
 
-    def run():
-        return yatuner.utils.fetch_perf_stat(
-            f'{build_dir}/{case_name}.exe')[metric] / 1000
+    def run(build_dir=build_dir, fidelity='MEDIUM'):
+        return yatuner.perf.fetch_perf_stat(f'{build_dir}/{case_name}.exe',
+                                            events=['task-clock'],
+                                            roi=True)[metric] / 1000
 
-    def perf():
-        return yatuner.utils.fetch_perf_stat(f'{build_dir}/{case_name}.exe')
+    def perf(build_dir=build_dir):
+        return yatuner.perf.fetch_perf_stat(f'{build_dir}/{case_name}.exe',
+                                            roi=True)
 
     tuner = yatuner.Tuner(comp,
                           run,
@@ -92,20 +100,23 @@ for case_dir, case_name in benchmark_list:
                           perf,
                           workspace=f'{workspace_dir}/{case_name}.db',
                           log_level=logging.INFO,
-                          norm_range=0.99)
+                          norm_range=0.99,
+                          num_workers=os.cpu_count(),
+                          measure_core=0)
 
     logger.info(f'[bold]Performing Optimization on {case_dir}[/]')
 
     tuner.initialize()
-    tuner.test_run(num_samples=200, warmup=10)
+    tuner.test_run(num_samples=200, warmup='auto')
     tuner.hypotest_optimizers(num_samples=5)
     tuner.hypotest_parameters(num_samples=5)
     # tuner.optimize(num_samples=10, num_epochs=60)
-    tuner.optimize_linUCB(alpha=0.25,
-                          num_bins=30,
-                          num_epochs=200,
-                          nth_choice=4,
-                          metric=metric)
+    # tuner.optimize_linUCB(alpha=0.25,
+    #                       num_bins=30,
+    #                       num_epochs=200,
+    #                       nth_choice=4,
+    #                       metric=metric)
+    tuner.optimize_hyperband(fidelities, num_samples=10, num_iterations=3)
 
     tuner.run(num_samples=50)
     tuner.plot_data()
@@ -50,25 +50,31 @@ def comp(optimizers, parameters, additional):
         raise RuntimeError(res['stderr'])
 
 
-def run():
-    return yatuner.utils.fetch_perf_stat(out)[metric] / 1000
+def run_batch(num_runs):
+    return [
+        x / 1000 for x in yatuner.utils.spawn_repeat([out], num_runs, metric)
+    ]
 
 
 def perf():
-    return yatuner.utils.fetch_perf_stat(out)
+    return yatuner.perf.fetch_perf_stat(out)
 
 
 tuner = yatuner.Tuner(comp,
-                      run,
+                      None,
                       optimizers,
                       parameters,
                       call_perf=perf,
-                      norm_range=0.99)
+                      norm_range=0.99,
+                      cache=yatuner.ArtifactCache(cc, [src], [out]),
+                      executable=out,
+                      call_running_batch=run_batch)
 
 tuner.initialize()
-tuner.test_run(num_samples=200, warmup=10)
+tuner.test_run(num_samples=200, warmup='auto')
 tuner.hypotest_optimizers(num_samples=5, num_epochs=30)
 tuner.hypotest_parameters(num_samples=5)
+tuner.discover_breakpoints()
 # tuner.optimize(num_samples=10, num_epochs=50)
 tuner.optimize_linUCB(alpha=0.25,
                       num_bins=30,
@@ -7,6 +7,7 @@ setup(name='yatuner',
       description='Yet another auto tuner for compilers.',
       long_description='README.md',
       packages=['yatuner'],
+      package_data={'yatuner': ['include/*.h', 'harness.c']},
       requires=[
           'GPyOpt', 'GPy', 'numpy', 'matplotlib', 'scipy', 'rich', 'seaborn'
       ],
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2022 Synodic Month, Juni May
+# yaTuner is licensed under Mulan PSL v2.
+# You can use this software according to the terms and conditions of the Mulan PSL v2.
+# You may obtain a copy of Mulan PSL v2 at:
+#          http://license.coscl.org.cn/MulanPSL2
+# THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import os
+import tempfile
+import unittest
+
+from yatuner.cache import ArtifactCache
+
+
+class TestArtifactCache(unittest.TestCase):
+
+    def test_key(self):
+        cache = ArtifactCache('gcc', ['tests/src/dummy.c'])
+        optimizers, parameters = ['-fa', '-fb'], {'x': 1, 'y': 2}
+        reordered = dict(reversed(parameters.items()))
+        self.assertEqual(cache.key(optimizers, parameters, '-O2'),
+                         cache.key(optimizers, reordered, '-O2'))
+        # the last of conflicting flags wins
+        self.assertNotEqual(cache.key(['-fa', '-fno-a'], None, None),
+                            cache.key(['-fno-a', '-fa'], None, None))
+        self.assertEqual(cache.key(['-fa', '-fno-a', '-fa'], None, None),
+                         cache.key(['-fno-a', '-fa'], None, None))
+        self.assertNotEqual(cache.key(['-fa'], None, None),
+                            cache.key(['-fa'], None, '-O2'))
+
+    def test_store_and_evict(self):
+        with tempfile.TemporaryDirectory() as root:
+            out = os.path.join(root, 'a.out')
+            cache = ArtifactCache('gcc', ['tests/src/dummy.c'], [out],
+                                  root=os.path.join(root, 'cache'),
+                                  max_size=1500)
+
+            for i in range(3):
+                with open(out, 'wb') as f:
+                    f.write(bytes([i]) * 1000)
+                cache.store(cache.key([f'-f{i}'], None, None))
+
+            self.assertFalse(cache.fetch(cache.key(['-f0'], None, None)))
+            self.assertFalse(cache.fetch(cache.key(['-f1'], None, None)))
+            self.assertTrue(cache.fetch(cache.key(['-f2'], None, None)))
+            with open(out, 'rb') as f:
+                self.assertEqual(f.read(), bytes([2]) * 1000)
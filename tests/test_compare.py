@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2022 Synodic Month, Juni May
+# yaTuner is licensed under Mulan PSL v2.
+# You can use this software according to the terms and conditions of the Mulan PSL v2.
+# You may obtain a copy of Mulan PSL v2 at:
+#          http://license.coscl.org.cn/MulanPSL2
+# THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import unittest
+
+import numpy as np
+from scipy import stats
+
+from yatuner import compare
+
+
+class TestCompare(unittest.TestCase):
+
+    def test_resample(self):
+        boot = compare.resample([[1, 2, 3], [5]],
+                                num_resamples=100,
+                                rng=np.random.default_rng(0))
+        self.assertEqual(boot.shape, (2, 100))
+        self.assertTrue(np.all((boot[0] >= 1) & (boot[0] <= 3)))
+        self.assertTrue(np.all(boot[1] == 5))
+
+    def test_fdr(self):
+        rejected = compare.fdr([0.01, 0.04, 0.03, 0.5, np.nan])
+        self.assertEqual(list(rejected), [True, False, False, False, False])
+        # 0.02 <= 0.05 * 2 / 3 lets the smaller one pass as well
+        rejected = compare.fdr([0.02, 0.03, 0.9])
+        self.assertEqual(list(rejected), [True, True, False])
+
+    def test_compare(self):
+        rng = np.random.default_rng(0)
+        # skewed timings, the first five are 10% faster
+        baseline = rng.lognormal(5, 0.1, 50)
+        samples = [
+            rng.lognormal(5 - 0.1 * (i < 5), 0.1, rng.integers(20, 30))
+            for i in range(50)
+        ]
+
+        res = compare.compare(samples, baseline, seed=0)
+        self.assertTrue(res['rejected'][:5].all())
+        self.assertLessEqual(res['rejected'][5:].sum(), 2)
+        self.assertTrue(np.all(res['high'][:5] < 0))
+        self.assertTrue(np.all(res['low'] <= res['effect']))
+        self.assertTrue(np.all(res['effect'] <= res['high']))
+
+        # a baseline for each, with sizes differing from the samples
+        pvalues = compare.rank_test(samples[:5], samples[5:10])
+        for pvalue, x, y in zip(pvalues, samples[:5], samples[5:10]):
+            self.assertAlmostEqual(pvalue, stats.mannwhitneyu(x, y).pvalue)
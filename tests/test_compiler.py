@@ -10,6 +10,8 @@
 # MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
 # See the Mulan PSL v2 for more details.
 
+import os
+import tempfile
 import yatuner
 import unittest
 
@@ -21,7 +23,47 @@ class TestCompiler(unittest.TestCase):
 
         gcc = yatuner.compiler.Gcc(src, out, cc='gcc')
         print(gcc.fetch_parameters())
-        
+
+    def test_preprocess(self):
+        src = 'tests/src/euler.c'
+
+        with tempfile.TemporaryDirectory() as build_dir:
+            out = os.path.join(build_dir, 'euler')
+            gcc = yatuner.compiler.Gcc(src, out, cc='gcc', preprocess=True)
+
+            gcc.compile('-O2')
+            preprocessed = gcc.fetch_preprocessed('-O2')
+            gcc.compile('-O2 -funroll-loops')
+            self.assertEqual(preprocessed,
+                             gcc.fetch_preprocessed('-O2 -funroll-loops'))
+            self.assertNotEqual(preprocessed,
+                                gcc.fetch_preprocessed('-O2 -DFOO'))
+            self.assertNotEqual(preprocessed,
+                                gcc.fetch_preprocessed('-O2 -I tests'))
+            self.assertNotEqual(preprocessed, gcc.fetch_preprocessed('-O0'))
+
+    def test_in_memory(self):
+        src = 'tests/src/euler.c'
+
+        with tempfile.TemporaryDirectory() as build_root:
+            gcc = yatuner.compiler.Gcc(src,
+                                       os.path.join(build_root, 'euler'),
+                                       cc='gcc',
+                                       in_memory=True)
+            if gcc.memory_dir is None:
+                self.skipTest("tmpfs is not available")
+
+            # outputs of the same name in different build directories
+            outs = []
+            for k in range(2):
+                gcc.compile('-O2',
+                            out=os.path.join(build_root, str(k), 'euler'))
+                outs.append(gcc.fetch_execute_cmd())
+            self.assertNotEqual(outs[0], outs[1])
+            for out in outs:
+                self.assertTrue(out.startswith(gcc.memory_dir + os.sep))
+                self.assertTrue(os.path.isfile(out))
+
 class TestOptimizer(unittest.TestCase):
     def test_initialize(self):
         optimizer = yatuner.optimizer.Optimizer()
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2022 Synodic Month, Juni May
+# yaTuner is licensed under Mulan PSL v2.
+# You can use this software according to the terms and conditions of the Mulan PSL v2.
+# You may obtain a copy of Mulan PSL v2 at:
+#          http://license.coscl.org.cn/MulanPSL2
+# THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import os
+import tempfile
+import unittest
+
+import yatuner
+
+
+class TestHarness(unittest.TestCase):
+
+    def test_measure(self):
+        with tempfile.TemporaryDirectory() as build_dir:
+            src = os.path.join(build_dir, 'kernel.c')
+            out = os.path.join(build_dir, 'kernel.so')
+            with open(src, 'w') as f:
+                f.write('volatile long sum;\n'
+                        'void yatuner_kernel(void) {\n'
+                        '  for (long i = 0; i < N; i++) sum += i;\n'
+                        '}\n')
+            gcc = yatuner.Gcc(src, out, cc='gcc', shared=True)
+
+            with yatuner.Harness(num_calls=10, warmup=1) as harness:
+                gcc.compile('-O1 -DN=100')
+                short = harness.measure(out, 5)
+                self.assertEqual(len(short), 5)
+                self.assertTrue(all(short > 0))
+
+                # rebuilt at the same path
+                gcc.compile('-O1 -DN=100000')
+                long = harness.measure(out, 5)
+                self.assertGreater(long.mean(), short.mean() * 10)
+
+                # in the shape of `call_running_batch`
+                call_running_batch = harness.runner('kernel.so')
+                self.assertEqual(
+                    len(call_running_batch(3, build_dir=build_dir)), 3)
+                self.assertEqual(len(harness.runner(out)(2)), 2)
+
+            with yatuner.Harness(symbol='missing') as harness:
+                with self.assertRaises(RuntimeError):
+                    harness.measure(out, 1)
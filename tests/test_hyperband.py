@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2022 Synodic Month, Juni May
+# yaTuner is licensed under Mulan PSL v2.
+# You can use this software according to the terms and conditions of the Mulan PSL v2.
+# You may obtain a copy of Mulan PSL v2 at:
+#          http://license.coscl.org.cn/MulanPSL2
+# THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import unittest
+from collections import Counter
+
+import numpy as np
+
+from yatuner.hyperband import hyperband, propose
+
+
+class TestHyperband(unittest.TestCase):
+
+    def setUp(self):
+        self.target = np.array([0.3, 0.7, 0.5])
+
+    def evaluate(self, fidelity, points):
+        return np.sum((points - self.target)**2, axis=1)
+
+    def test_brackets(self):
+        history = hyperband(3, self.evaluate, 3, model=False, seed=0)
+        counts = Counter(fidelity for fidelity, _, _ in history)
+        # 9 -> 3 -> 1, 5 -> 1 and 3 at the target fidelity
+        self.assertEqual(counts, {0: 9, 1: 8, 2: 5})
+
+    def test_promotion(self):
+        history = hyperband(3, self.evaluate, 3, model=False, seed=0)
+        low = sorted(loss for fidelity, _, loss in history[:9])
+        promoted = [loss for fidelity, _, loss in history[9:12]]
+        self.assertEqual(sorted(promoted), low[:3])
+
+    def test_failure(self):
+
+        def evaluate(fidelity, points):
+            losses = self.evaluate(fidelity, points)
+            return np.where(points[:, 0] > 0.5, np.inf, losses)
+
+        history = hyperband(3, evaluate, 3, num_iterations=2, seed=0)
+        best = min(history, key=lambda x: x[2])
+        self.assertLess(best[1][0], 0.5)
+
+    def test_propose(self):
+        rng = np.random.default_rng(0)
+        points = rng.random((40, 2))
+        losses = np.sum((points - 0.2)**2, axis=1)
+        proposed = np.array([propose(points, losses, rng) for _ in range(20)])
+        self.assertLess(np.mean(np.sum((proposed - 0.2)**2, axis=1)),
+                        np.mean(losses))
+
+
+if __name__ == '__main__':
+    unittest.main()
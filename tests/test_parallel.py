@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2022 Synodic Month, Juni May
+# yaTuner is licensed under Mulan PSL v2.
+# You can use this software according to the terms and conditions of the Mulan PSL v2.
+# You may obtain a copy of Mulan PSL v2 at:
+#          http://license.coscl.org.cn/MulanPSL2
+# THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import os
+import tempfile
+import unittest
+
+from yatuner.parallel import BuildPool
+
+
+class TestBuildPool(unittest.TestCase):
+
+    def test_imap(self):
+        self._test_imap(pipeline=False)
+
+    def test_imap_pipeline(self):
+        self._test_imap(pipeline=True)
+
+    def _test_imap(self, pipeline):
+
+        def comp(optimizers, parameters, additional, build_dir):
+            if optimizers[0] == '-fbad':
+                raise RuntimeError('bad option')
+            with open(os.path.join(build_dir, 'out'), 'w') as f:
+                f.write(optimizers[0])
+
+        with tempfile.TemporaryDirectory() as root:
+            pool = BuildPool(comp, root, num_workers=2, pipeline=pipeline)
+            configs = [([opt], None, None)
+                       for opt in ['-fa', '-fbad', '-fc', '-fd', '-fe']]
+            for (optimizers, _, _), (build_dir,
+                                     err) in zip(configs, pool.imap(configs)):
+                if optimizers[0] == '-fbad':
+                    self.assertIsInstance(err, RuntimeError)
+                    continue
+                self.assertIsNone(err)
+                with open(os.path.join(build_dir, 'out')) as f:
+                    self.assertEqual(f.read(), optimizers[0])
+            pool.shutdown()
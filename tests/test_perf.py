@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2022 Synodic Month, Juni May
+# yaTuner is licensed under Mulan PSL v2.
+# You can use this software according to the terms and conditions of the Mulan PSL v2.
+# You may obtain a copy of Mulan PSL v2 at:
+#          http://license.coscl.org.cn/MulanPSL2
+# THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import yatuner
+from yatuner import perf
+
+
+class TestPerf(unittest.TestCase):
+
+    def test_fetch_counters(self):
+        try:
+            counters = perf.fetch_counters(
+                ['sh', '-c', 'echo x > /dev/null'],
+                groups=[['task-clock', 'page-faults']])
+        except OSError as err:
+            self.skipTest(f'perf_event_open is not permitted: {err}')
+
+        self.assertEqual(set(counters),
+                         {'task-clock', 'page-faults', 'duration_time'})
+        self.assertGreater(counters['task-clock'], 0)
+        self.assertGreater(counters['page-faults'], 0)
+        self.assertGreater(counters['duration_time'], 0)
+
+        with self.assertRaises(RuntimeError):
+            perf.fetch_counters(['false'], groups=[['task-clock']])
+
+    def test_probe_events(self):
+        with tempfile.TemporaryDirectory() as cache_dir, mock.patch.dict(
+                os.environ, {'XDG_CACHE_HOME': cache_dir}):
+            try:
+                groups = perf.probe_events(['task-clock', 'page-faults'])
+            except OSError as err:
+                self.skipTest(f'perf_event_open is not permitted: {err}')
+
+            self.assertEqual(groups, [['task-clock', 'page-faults']])
+            self.assertTrue(os.path.exists(perf.fetch_probe_file()))
+            with mock.patch.object(perf, '_probe') as probe:
+                self.assertEqual(
+                    perf.probe_events(['task-clock', 'page-faults']), groups)
+                probe.assert_not_called()
+
+    def test_scheduler(self):
+        groups = [['task-clock'], ['cpu-cycles', 'instructions'],
+                  ['cache-misses']]
+        with mock.patch.object(perf, 'probe_events', return_value=groups):
+            scheduler = perf.EventScheduler()
+
+        # every group within one measurement
+        self.assertEqual(scheduler.runs(),
+                         [groups[:2], [groups[0], groups[2]]])
+
+        first = {'task-clock': 1.0, 'cpu-cycles': 2.0, 'instructions': 3.0}
+        second = {'task-clock': 4.0, 'cache-misses': 5.0}
+        counters = scheduler.merge([first, second])
+        self.assertEqual(counters, dict(first, **{'cache-misses': 5.0}))
+
+        with mock.patch.object(perf, 'probe_events', return_value=[]):
+            self.assertEqual(perf.EventScheduler().runs(), [[]])
+
+    def test_unknown_event(self):
+        with self.assertRaises(OSError):
+            perf.perf_event_open('cpu/event=0x3c/', 0)
+
+        with mock.patch.object(perf.utils,
+                               'fetch_perf_stat',
+                               return_value={'x': 1.0}) as fallback:
+            self.assertEqual(
+                perf.fetch_perf_stat('true', events=['cpu/event=0x3c/']),
+                {'x': 1.0})
+            fallback.assert_called_once()
+
+    def test_roi(self):
+        src = ('#include <yatuner_roi.h>\n'
+               'int main() {\n'
+               '  yatuner_roi_begin();\n'
+               '  yatuner_roi_end();\n'
+               '  return 0;\n'
+               '}\n')
+
+        with tempfile.TemporaryDirectory() as build_dir:
+            out = os.path.join(build_dir, 'roi')
+            with open(out + '.c', 'w') as f:
+                f.write(src)
+            res = yatuner.utils.execute(
+                f'gcc -I {yatuner.utils.fetch_include_dir()} '
+                f'{out}.c -o {out}')
+            self.assertEqual(res['returncode'], 0, res['stderr'])
+            self.assertEqual(yatuner.utils.spawn([out])['returncode'], 0)
+
+            try:
+                counters = perf.fetch_counters([out],
+                                               groups=[['task-clock']],
+                                               roi=True)
+            except OSError as err:
+                self.skipTest(f'perf_event_open is not permitted: {err}')
+            self.assertGreater(counters['duration_time'], 0)
+            self.assertLess(counters['duration_time'], 1e9)
+
+            with self.assertRaises(RuntimeError):
+                perf.fetch_counters(['true'],
+                                    groups=[['task-clock']],
+                                    roi=True)
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2022 Synodic Month, Juni May
+# yaTuner is licensed under Mulan PSL v2.
+# You can use this software according to the terms and conditions of the Mulan PSL v2.
+# You may obtain a copy of Mulan PSL v2 at:
+#          http://license.coscl.org.cn/MulanPSL2
+# THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import unittest
+
+import numpy as np
+
+from yatuner.racing import race
+
+
+class TestRacing(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+        self.means = np.array([100, 150, 100.1, 300, 100.2, 120])
+
+    def sample(self, alive, num_samples):
+        return [
+            self.rng.normal(self.means[idx], 1, num_samples) for idx in alive
+        ]
+
+    def test_race(self):
+        samples, alive = race(len(self.means), self.sample, 240, step=3)
+        lengths = [len(x) for x in samples]
+        self.assertLessEqual(sum(lengths), 240)
+        # clearly slower candidates stop early, close ones go on
+        self.assertEqual(sorted(alive), [0, 2, 4])
+        for idx in (1, 3, 5):
+            self.assertLess(lengths[idx], lengths[0])
+
+    def test_halving(self):
+        samples, alive = race(len(self.means), self.sample, 240, eta=2)
+        lengths = [len(x) for x in samples]
+        self.assertEqual(len(alive), 1)
+        self.assertIn(alive[0], (0, 2, 4))
+        self.assertEqual(sorted(lengths), [2, 2, 2, 4, 6, 6])
+
+    def test_budget(self):
+        samples, alive = race(len(self.means), self.sample, 6)
+        self.assertEqual([len(x) for x in samples], [1] * 6)
+        self.assertEqual(len(alive), 6)
+
+    def test_single(self):
+        samples, alive = race(1, self.sample, 10)
+        self.assertEqual(len(samples[0]), 10)
+        self.assertEqual(alive, [0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2022 Synodic Month, Juni May
+# yaTuner is licensed under Mulan PSL v2.
+# You can use this software according to the terms and conditions of the Mulan PSL v2.
+# You may obtain a copy of Mulan PSL v2 at:
+#          http://license.coscl.org.cn/MulanPSL2
+# THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import threading
+import unittest
+
+from yatuner.parallel import fetch_cpus
+from yatuner.runner import (ConcurrentRunner, InterleavedRunner,
+                            fetch_physical_cores)
+
+
+class TestConcurrentRunner(unittest.TestCase):
+
+    def test_physical_cores(self):
+        cores = fetch_physical_cores()
+        self.assertTrue(cores)
+        self.assertTrue(set(cores).issubset(fetch_cpus()))
+
+    def _runner(self, slowdown):
+        lock = threading.Lock()
+        running = 0
+
+        def run(build_dir):
+            nonlocal running
+            with lock:
+                running += 1
+                res = {'a': 10.0, 'b': 20.0}[build_dir]
+                if running > 1:
+                    res *= slowdown
+            # let the other worker reach the same round
+            threading.Event().wait(0.01)
+            with lock:
+                running -= 1
+            return res
+
+        core = fetch_cpus()[0]
+        return ConcurrentRunner(run, [core, core], num_solo=2)
+
+    def test_measure(self):
+        runner = self._runner(slowdown=1.0)
+        samples_a, samples_b = runner.measure(['a', 'b'], 5)
+        self.assertEqual(samples_a.tolist(), [10.0] * 5)
+        self.assertEqual(samples_b.tolist(), [20.0] * 5)
+        self.assertFalse(runner.serial)
+        runner.shutdown()
+
+    def test_interference(self):
+        runner = self._runner(slowdown=2.0)
+        samples_a, samples_b = runner.measure(['a', 'b'], 5)
+        self.assertEqual(samples_a.tolist(), [10.0] * 5)
+        self.assertEqual(samples_b.tolist(), [20.0] * 5)
+        self.assertTrue(runner.serial)
+        runner.shutdown()
+
+
+class TestInterleavedRunner(unittest.TestCase):
+
+    def test_measure(self):
+        order = []
+        clock = 0.0
+
+        def run(build_dir):
+            nonlocal clock
+            # slow drift shared by every program
+            clock += 1.0
+            order.append(build_dir)
+            return {'a': 10.0, 'b': 20.0, 'base': 15.0}[build_dir] + clock
+
+        runner = InterleavedRunner(run, seed=0)
+        base, (a, b) = runner.measure(['a', 'b'], 20, 'base')
+
+        self.assertEqual(len(base), 20)
+        self.assertEqual(len(a), 20)
+        self.assertEqual(sorted(order[:3]), ['a', 'b', 'base'])
+        self.assertNotEqual(order[0::3], ['a'] * 20)
+        # within a round drift is at most the length of the round
+        self.assertTrue(all(abs(a - base + 5) <= 2))
+        self.assertTrue(all(abs(b - base - 5) <= 2))
+
+        base, (a, ) = runner.measure(['a'], 3)
+        self.assertEqual(len(base), 0)
+        self.assertEqual(len(a), 3)
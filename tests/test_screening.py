@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2022 Synodic Month, Juni May
+# yaTuner is licensed under Mulan PSL v2.
+# You can use this software according to the terms and conditions of the Mulan PSL v2.
+# You may obtain a copy of Mulan PSL v2 at:
+#          http://license.coscl.org.cn/MulanPSL2
+# THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import unittest
+
+import numpy as np
+
+from yatuner import screening
+
+
+class TestScreening(unittest.TestCase):
+
+    def test_hadamard(self):
+        for order in (4, 8, 12, 20, 24, 40, 44, 200):
+            matrix = screening.hadamard(order)
+            self.assertTrue(
+                np.array_equal(matrix @ matrix.T, order * np.eye(order)))
+
+    def test_plackett_burman(self):
+        for num_factors in (3, 11, 30, 190):
+            design = screening.plackett_burman(num_factors)
+            self.assertEqual(design.shape[1], num_factors)
+            self.assertLess(len(design), num_factors + 8)
+            self.assertTrue(np.all(design.sum(axis=0) == 0))
+            self.assertTrue(
+                np.array_equal(design.T @ design,
+                               len(design) * np.eye(num_factors)))
+
+    def test_estimate_effects(self):
+        rng = np.random.default_rng(0)
+        design = screening.plackett_burman(30)
+        truth = np.zeros(30)
+        truth[3], truth[7] = -10, 5
+        samples = [
+            100 + row @ truth / 2 + rng.normal(0, 2, 3) for row in design
+        ]
+
+        res = screening.estimate_effects(design, samples)
+        self.assertAlmostEqual(res['effect'][3], -10, delta=1.5)
+        self.assertAlmostEqual(res['effect'][7], 5, delta=1.5)
+        self.assertLess(res['pvalue'][3], 1e-6)
+        self.assertGreater(np.median(res['pvalue']), 0.05)
+
+        # every run with factor 0 at high fails
+        failed = [None if row[0] > 0 else x for row, x in zip(design, samples)]
+        res = screening.estimate_effects(design, failed)
+        self.assertTrue(np.isnan(res['effect'][0]))
+
+    def test_group_screen(self):
+        factors = [f'p{i}' for i in range(100)]
+        active = {'p7', 'p42', 'p43'}
+        rounds = []
+
+        def test(groups):
+            rounds.append(len(groups))
+            return [bool(active.intersection(group)) for group in groups]
+
+        self.assertEqual(screening.group_screen(factors, test),
+                         ['p7', 'p42', 'p43'])
+        # far fewer tests than factors
+        self.assertLess(sum(rounds), 40)
+        self.assertEqual(len(rounds), 8)
+
+        rounds.clear()
+        self.assertEqual(screening.group_screen(factors, test, 16),
+                         ['p7', 'p42', 'p43'])
+        self.assertEqual(rounds[0], 7)
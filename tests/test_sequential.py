@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2022 Synodic Month, Juni May
+# yaTuner is licensed under Mulan PSL v2.
+# You can use this software according to the terms and conditions of the Mulan PSL v2.
+# You may obtain a copy of Mulan PSL v2 at:
+#          http://license.coscl.org.cn/MulanPSL2
+# THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import unittest
+
+import numpy as np
+
+from yatuner.sequential import (SPRT, TwoSidedSPRT, plan_samples, steady_state,
+                                straddles)
+
+
+class TestSequential(unittest.TestCase):
+
+    def _stopping_time(self, test, mean, sigma, cap=1000):
+        rng = np.random.default_rng(0)
+        samples = []
+        while len(samples) < cap:
+            samples.append(rng.normal(mean, sigma))
+            decision = test.decide(samples)
+            if decision is not None:
+                return decision, len(samples)
+        return None, cap
+
+    def test_sprt(self):
+        test = SPRT(100, 99, sigma=1)
+        decision, n = self._stopping_time(test, 99, 1)
+        self.assertTrue(decision)
+        self.assertLess(n, 30)
+
+        decision, n = self._stopping_time(test, 100, 1)
+        self.assertFalse(decision)
+
+        # clearly worse is rejected at once
+        self.assertFalse(test.decide([110]))
+
+    def test_two_sided(self):
+        test = TwoSidedSPRT(100, 1, sigma=1)
+        self.assertTrue(self._stopping_time(test, 102, 1)[0])
+        self.assertTrue(self._stopping_time(test, 98, 1)[0])
+        self.assertFalse(self._stopping_time(test, 100, 1)[0])
+
+    def test_plan_samples(self):
+        # (1.96 + 0.84)^2 * 4 = 31.4
+        self.assertEqual(plan_samples(2, 1), 32)
+        self.assertEqual(plan_samples(2, 1, two_sample=True), 63)
+        self.assertEqual(plan_samples(0.1, 10), 2)
+        self.assertGreater(plan_samples(2, 0.5), plan_samples(2, 1))
+
+    def test_straddles(self):
+        self.assertTrue(straddles([100, 101], 100, sigma=2))
+        self.assertFalse(straddles([100] * 100, 101, sigma=2))
+        self.assertFalse(straddles([90, 91], 100, sigma=2))
+
+    def test_steady_state(self):
+        rng = np.random.default_rng(0)
+        self.assertTrue(steady_state(rng.normal(100, 1, 20)))
+        self.assertTrue(steady_state([100] * 20))
+        # still cooling down
+        self.assertFalse(
+            steady_state(np.linspace(120, 100, 20) + rng.normal(0, 1, 20)))
+        # a step in the middle of window
+        self.assertFalse(
+            steady_state(np.repeat([110, 100], 10) + rng.normal(0, 1, 20)))
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2022 Synodic Month, Juni May
+# yaTuner is licensed under Mulan PSL v2.
+# You can use this software according to the terms and conditions of the Mulan PSL v2.
+# You may obtain a copy of Mulan PSL v2 at:
+#          http://license.coscl.org.cn/MulanPSL2
+# THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import os
+import tempfile
+import unittest
+
+from yatuner.trials import DriftTracker, TrialStore
+
+
+class TestTrials(unittest.TestCase):
+
+    def test_store(self):
+        with tempfile.TemporaryDirectory() as workspace:
+            store = TrialStore(os.path.join(workspace, 'trials.csv'))
+            self.assertEqual(len(store.load()), 0)
+
+            store.append('optimize', 0, 100.0, config={'a': 1, 'b': 2})
+            store.append('optimize', 1, 110.0, kind='baseline', drift=1.1)
+            trials = store.load()
+
+            self.assertEqual(list(trials['kind']), ['trial', 'baseline'])
+            self.assertEqual(trials['config'][0], 'a=1 b=2')
+            self.assertAlmostEqual(trials['normalized'][1], 100.0)
+
+    def test_drift(self):
+        drift = DriftTracker(100.0, smoothing=0.5)
+        self.assertEqual(drift.normalize(90.0), 90.0)
+
+        with self.assertLogs('yatuner', level='WARNING'):
+            self.assertAlmostEqual(drift.update(120.0), 1.1)
+        self.assertAlmostEqual(drift.normalize(99.0), 90.0)
+
+        drift.update(100.0)
+        self.assertAlmostEqual(drift.drift, 1.05)
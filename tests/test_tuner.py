@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2022 Synodic Month, Juni May
+# yaTuner is licensed under Mulan PSL v2.
+# You can use this software according to the terms and conditions of the Mulan PSL v2.
+# You may obtain a copy of Mulan PSL v2 at:
+#          http://license.coscl.org.cn/MulanPSL2
+# THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import logging
+import os
+import subprocess
+import tempfile
+import unittest
+
+import pandas as pd
+
+import yatuner
+
+
+class TestTuner(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.workspace = os.path.join(self.tmp.name, 'ws')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _tuner(self, call_compile=None, call_running=None, **kwargs):
+        """A tuner of a synthetic program built without a compiler."""
+        if call_compile is None:
+            call_compile = lambda optimizers, parameters, additional, **_: None
+        if call_running is None:
+            call_running = lambda **_: 100.0
+        tuner = yatuner.Tuner(call_compile,
+                              call_running, ['-fa', '-fb', '-fc'],
+                              {'p': (0, 2000, 10)},
+                              workspace=self.workspace,
+                              log_level=logging.WARNING,
+                              **kwargs)
+        tuner.initialize()
+        return tuner
+
+    def _select(self, optimizers, parameters):
+        selections = {'optimizers': optimizers, 'parameters': parameters}
+        for name, selected in selections.items():
+            with open(f'{self.workspace}/selected_{name}.txt',
+                      'w',
+                      encoding='utf-8') as file:
+                file.writelines(x + '\n' for x in selected)
+
+    def _optimized(self, parameters):
+        with open(f'{self.workspace}/optimized_parameters.txt',
+                  'w',
+                  encoding='utf-8') as file:
+            file.writelines(f'{k} {v}\n' for k, v in parameters.items())
+
+    def test_plackett_burman_options(self):
+        tuner = self._tuner()
+        combinations = [
+            dict(sequential=True),
+            dict(method='nonparametric'),
+            dict(num_samples='auto'),
+        ]
+        for kwargs in combinations:
+            with self.assertRaises(ValueError):
+                tuner.hypotest_optimizers(design='plackett-burman', **kwargs)
+
+    def test_discover_breakpoints(self):
+        executable = os.path.join(self.tmp.name, 'program')
+
+        def call_compile(optimizers, parameters, additional, **_):
+            # the program changes at 37 and 1000 only
+            level = sum(parameters['p'] >= x for x in (37, 1000))
+            with open(executable, 'w', encoding='utf-8') as file:
+                file.write(f'level {level}')
+
+        tuner = self._tuner(call_compile, executable=executable)
+        self._select(['-fa'], ['p'])
+
+        tuner.discover_breakpoints()
+        self.assertEqual(tuner.breakpoints, {'p': [0, 37, 1000]})
+
+    def test_pipeline(self):
+        tuner = self._tuner(pipeline=True)
+        self.assertIsNotNone(tuner.pool)
+        self.assertTrue(tuner.pool.pipeline)
+        tuner.pool.shutdown()
+
+    def test_linUCB_without_hardware_counters(self):
+        perf = lambda **_: {'task-clock': 1.0, 'duration_time': 1e6}
+        tuner = self._tuner(call_perf=perf)
+        self._select(['-fa'], ['p'])
+
+        tuner.optimize_linUCB(num_epochs=4, num_bins=2, baseline_every=2)
+        trials = tuner.trials.load()
+        self.assertEqual(len(trials[trials['kind'] == 'trial']), 4)
+        self.assertTrue((trials['result'] == 1000).all())
+
+    def test_concurrent_cores(self):
+        cores = yatuner.parallel.fetch_cpus()
+        with self.assertRaises(ValueError):
+            self._tuner(concurrent_cores=cores + [max(cores) + 1])
+
+    def test_top_trials(self):
+        tuner = self._tuner()
+        tuner.selected_optimizers = ['-fa']
+        # linUCB counts events, far from seconds of the other stages
+        results = [('optimize', 2.0, 1), ('optimize', 1.0, 2),
+                   ('linUCB', 5000.0, 3), ('linUCB', 4000.0, 4),
+                   ('hyperband', 1.5, 5)]
+        for epoch, (stage, result, p) in enumerate(results):
+            tuner.trials.append(stage, epoch, result, config={'p': p})
+
+        configs = tuner._fetch_top_trials(3)
+        self.assertEqual(sorted(config[1]['p'] for _, config in configs),
+                         ['2', '4', '5'])
+
+    def test_racing(self):
+        compiled = []
+
+        def call_compile(optimizers, parameters, additional, build_dir):
+            compiled.append(build_dir)
+            with open(os.path.join(build_dir, 'level'), 'w') as file:
+                file.write('50' if additional == '-O3' else '100')
+
+        def call_running(build_dir):
+            with open(os.path.join(build_dir, 'level')) as file:
+                return float(file.read())
+
+        tuner = self._tuner(call_compile, call_running)
+        self._select(['-fa'], ['p'])
+        self._optimized({'p': 10})
+
+        tuner.run(num_samples=4, racing=True)
+        # built once each, however many rounds
+        self.assertEqual(len(compiled), 8)
+        self.assertEqual(len(set(compiled)), 8)
+        self.assertTrue(os.path.exists(self.workspace + '/result.csv'))
+
+    def test_racing_single_candidate(self):
+
+        def call_compile(optimizers, parameters, additional, **_):
+            if additional != '-O3':
+                raise RuntimeError('broken compiler')
+
+        tuner = self._tuner(call_compile)
+        self._select(['-fa'], ['p'])
+        self._optimized({'p': 10})
+        tuner.run(num_samples=4, racing=True)
+        result = pd.read_csv(self.workspace + '/result.csv')
+        self.assertEqual(list(result.columns), ['-O3'])
+        self.assertEqual(list(result['-O3']), [100.0] * 4)
+
+    def test_racing_without_candidates(self):
+
+        def call_compile(optimizers, parameters, additional, **_):
+            raise RuntimeError('broken compiler')
+
+        tuner = self._tuner(call_compile)
+        self._select(['-fa'], ['p'])
+        self._optimized({'p': 10})
+        tuner.run(num_samples=4, racing=True)
+        self.assertFalse(os.path.exists(self.workspace + '/result.csv'))
+
+    def test_optimize_batch(self):
+        program = os.path.join(self.tmp.name, 'program')
+
+        def call_compile(optimizers, parameters, additional, **_):
+            with open(program, 'w', encoding='utf-8') as file:
+                file.write(str(parameters['p'] if parameters else 1000))
+
+        def call_running(**_):
+            with open(program, encoding='utf-8') as file:
+                return 100 + abs(int(file.read()) - 500) / 10
+
+        for evaluator in ['thompson_sampling', 'local_penalization']:
+            with self.subTest(evaluator=evaluator):
+                self.workspace = os.path.join(self.tmp.name, evaluator)
+                tuner = self._tuner(call_compile, call_running)
+                self._select(['-fa'], ['p'])
+
+                # local_penalization falls back where GPyOpt breaks
+                tuner.optimize(num_samples=2,
+                               num_epochs=4,
+                               baseline_every=0,
+                               batch_size=2,
+                               evaluator=evaluator)
+                self.assertTrue(
+                    os.path.exists(self.workspace +
+                                   '/optimized_parameters.txt'))
+                # initial design of 5 and 2 batches of 2
+                self.assertEqual(len(tuner.trials.load()), 9)
+
+    def test_optimize_compile_timeout(self):
+
+        def call_compile(optimizers, parameters, additional, **_):
+            raise subprocess.TimeoutExpired('gcc', 1)
+
+        tuner = self._tuner(call_compile)
+        self._select(['-fa'], ['p'])
+        tuner.optimize(num_samples=2, num_epochs=2)
+        self.assertFalse(
+            os.path.exists(self.workspace + '/optimized_parameters.txt'))
+
+
+if __name__ == '__main__':
+    unittest.main()
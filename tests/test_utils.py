@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2022 Synodic Month, Juni May
+# yaTuner is licensed under Mulan PSL v2.
+# You can use this software according to the terms and conditions of the Mulan PSL v2.
+# You may obtain a copy of Mulan PSL v2 at:
+#          http://license.coscl.org.cn/MulanPSL2
+# THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import yatuner
+
+
+class TestUtils(unittest.TestCase):
+
+    def test_fetch_fingerprint(self):
+        src = 'tests/src/euler.c'
+
+        with tempfile.TemporaryDirectory() as build_dir:
+
+            def fingerprint(options):
+                out = os.path.join(build_dir, 'euler')
+                res = yatuner.utils.execute(f'gcc {options} {src} -o {out}')
+                self.assertEqual(res['returncode'], 0, res['stderr'])
+                return yatuner.utils.fetch_fingerprint(out)
+
+            base = fingerprint('-O2')
+            self.assertEqual(base, fingerprint('-O2 -g'))
+            self.assertEqual(base, fingerprint('-O2 -Wl,--build-id=sha1'))
+            self.assertNotEqual(base, fingerprint('-O0'))
+
+    def test_spawn(self):
+        res = yatuner.utils.spawn(
+            ['sh', '-c', 'echo out; echo err >&2; exit 3'], capture=True)
+        self.assertEqual(res['returncode'], 3)
+        self.assertEqual(res['stdout'], 'out\n')
+        self.assertEqual(res['stderr'], 'err\n')
+        self.assertGreater(res['duration_time'], 0)
+
+        res = yatuner.utils.spawn('true')
+        self.assertEqual(res['returncode'], 0)
+        self.assertNotIn('stdout', res)
+
+        with self.assertRaises(subprocess.TimeoutExpired):
+            yatuner.utils.spawn(['sleep', '10'], timeout=0.1)
+
+    def test_spawn_repeat(self):
+        samples = yatuner.utils.spawn_repeat(['true'], 3)
+        self.assertEqual(len(samples), 3)
+        self.assertTrue(all(x > 0 for x in samples))
+
+        with self.assertRaises(RuntimeError):
+            yatuner.utils.spawn_repeat(['false'], 3)
+
+    def test_memory_dir(self):
+        tmpfs = yatuner.utils.fetch_tmpfs_dir()
+        if tmpfs is None:
+            self.skipTest("tmpfs is not available")
+
+        # built in another process, whose memory directory goes at exit
+        script = ('import os, yatuner\n'
+                  "gcc = yatuner.compiler.Gcc('tests/src/hello_world.c', "
+                  "'hello', cc='gcc', in_memory=True)\n"
+                  "gcc.compile('-O2')\n"
+                  "tuner = yatuner.Tuner(None, lambda **_: 0, [], {}, "
+                  "workspace='yatuner.db', in_memory=True)\n"
+                  'print(gcc.memory_dir, os.path.isfile(gcc.out), '
+                  'tuner.pool.build_root)\n')
+        res = subprocess.run([sys.executable, '-c', script],
+                             capture_output=True,
+                             text=True,
+                             check=True)
+        memory_dir, built, build_root = res.stdout.split()
+        self.assertEqual(built, 'True')
+        for path in (memory_dir, build_root):
+            self.assertEqual(os.path.dirname(path), tmpfs)
+            self.assertFalse(os.path.exists(path))
+
+    def test_fetch_argv(self):
+        self.assertEqual(yatuner.utils.fetch_argv('./a.out 5'),
+                         ['./a.out', '5'])
+        self.assertEqual(yatuner.utils.fetch_argv(['a b']), ['a b'])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, 'out')
+            argv = yatuner.utils.fetch_argv(
+                f'FOO=bar sh -c \'echo $FOO\' > {out}')
+            self.assertEqual(yatuner.utils.spawn(argv)['returncode'], 0)
+            with open(out, 'r', encoding='utf-8') as f:
+                self.assertEqual(f.read(), 'bar\n')
@@ -12,7 +12,10 @@
 
 from yatuner.compiler import Compiler, Gcc
 from yatuner.tuner import Tuner
+from yatuner.cache import ArtifactCache
+from yatuner.harness import Harness
 from yatuner import utils
+from yatuner import perf
 from yatuner.autogen import generate
 
 __doc__ = 'yaTuner -- Yet another auto tuner for compilers'
\ No newline at end of file
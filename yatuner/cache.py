@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2022 Synodic Month, Juni May
+# yaTuner is licensed under Mulan PSL v2.
+# You can use this software according to the terms and conditions of the Mulan PSL v2.
+# You may obtain a copy of Mulan PSL v2 at:
+#          http://license.coscl.org.cn/MulanPSL2
+# THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import threading
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+
+
+def hash_file(filename: str, digest=None) -> str:
+    """Hash contents of a file with sha256.
+
+    Args:
+        filename (str): Path to file.
+        digest (optional): Existing hash object to update, a new one is used if None.
+
+    Returns:
+        str: Hex digest.
+    """
+    if digest is None:
+        digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fetch_compiler_identity(cc='gcc') -> str:
+    """Fetch an identity of the compiler from its binary and version.
+
+    Args:
+        cc (str, optional): Specified compiler binary. Defaults to 'gcc'.
+
+    Returns:
+        str: Hex digest identifying the compiler.
+    """
+    digest = hashlib.sha256()
+    path = shutil.which(cc)
+    if path is not None:
+        path = os.path.realpath(path)
+        digest.update(path.encode())
+        hash_file(path, digest)
+    else:
+        digest.update(cc.encode())
+    digest.update(subprocess.check_output([cc, '--version']))
+    return digest.hexdigest()
+
+
+def fetch_tree_size(path: str) -> int:
+    """Fetch total size of files under `path`."""
+    size = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            size += os.path.getsize(os.path.join(dirpath, filename))
+    return size
+
+
+def canonicalize(optimizers: Optional[Sequence[str]],
+                 parameters: Optional[Mapping],
+                 additional: Optional[str]) -> str:
+    """Canonical text of a configuration.
+
+    Parameters are order independent. Optimizers keep their order, as the
+    last of conflicting flags such as `-fx` and `-fno-x` wins, and only the
+    last occurrence of a repeated one is kept. The additional options keep
+    their order.
+    """
+    if optimizers is not None:
+        optimizers = list(reversed(dict.fromkeys(reversed(optimizers))))
+    return json.dumps({
+        'optimizers':
+        optimizers,
+        'parameters':
+        sorted((str(k), str(v)) for k, v in parameters.items())
+        if parameters is not None else None,
+        'additional':
+        additional.split() if additional is not None else None,
+    })
+
+
+class ArtifactCache:
+
+    def __init__(self,
+                 cc: str,
+                 sources: Sequence[str],
+                 artifacts: Sequence[str] = (),
+                 root: str = None,
+                 max_size: int = 1 << 30) -> None:
+        """A content-addressed cache of compiled artifacts with LRU eviction.
+
+        Keys cover the compiler binary and version, contents of `sources` and
+        the canonicalized configuration. In parallel mode the whole build
+        directory is cached, otherwise the files in `artifacts`.
+
+        Args:
+            cc (str): Compiler binary used by `call_compile`.
+            sources (Sequence[str]): Files the build depends on.
+            artifacts (Sequence[str], optional): Files produced by `call_compile` when no build directory is used. Defaults to ().
+            root (str, optional): Cache directory. Defaults to `<workspace>/cache` when used by a tuner.
+            max_size (int, optional): Maximum size in bytes before least recently used entries are evicted. Defaults to 1 GiB.
+        """
+        self.cc = cc
+        self.sources = list(sources)
+        self.artifacts = list(artifacts)
+        self.root = root
+        self.max_size = max_size
+
+        self.prefix = None
+        self.entries: Dict[str, Tuple[int, float]] = None
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _prefix(self) -> str:
+        if self.prefix is None:
+            digest = hashlib.sha256()
+            digest.update(fetch_compiler_identity(self.cc).encode())
+            for src in self.sources:
+                digest.update(src.encode())
+                hash_file(src, digest)
+            self.prefix = digest.hexdigest()
+        return self.prefix
+
+    def key(self,
+            optimizers: Optional[Sequence[str]],
+            parameters: Optional[Mapping],
+            additional: Optional[str],
+            extra: str = '') -> str:
+        """Key of a configuration.
+
+        Args:
+            optimizers (Sequence[str], optional): On/off options.
+            parameters (Mapping, optional): Parameters.
+            additional (str, optional): Additional options.
+            extra (str, optional): Anything else affecting the build. Defaults to ''.
+
+        Returns:
+            str: Hex digest.
+        """
+        digest = hashlib.sha256(self._prefix().encode())
+        digest.update(
+            canonicalize(optimizers, parameters, additional).encode())
+        digest.update(extra.encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def _load(self) -> None:
+        if self.entries is not None:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        self.entries = {}
+        for key in os.listdir(self.root):
+            path = self._path(key)
+            if '.tmp' in key or not os.path.isdir(path):
+                continue
+            self.entries[key] = (fetch_tree_size(path), os.path.getmtime(path))
+
+    def fetch(self, key: str, build_dir: str = None) -> bool:
+        """Restore artifacts of `key`.
+
+        Args:
+            key (str): Key of the configuration.
+            build_dir (str, optional): Build directory to restore into, `artifacts` are restored if None.
+
+        Returns:
+            bool: True if hit.
+        """
+        with self.lock:
+            self._load()
+            if key not in self.entries:
+                self.misses += 1
+                return False
+            path = self._path(key)
+            os.utime(path)
+            self.entries[key] = (self.entries[key][0], os.path.getmtime(path))
+            self.hits += 1
+
+            # copied under the lock so that the entry can not be evicted
+            # in the middle of restoring
+            if build_dir is not None:
+                shutil.copytree(path, build_dir, dirs_exist_ok=True)
+            else:
+                for i, artifact in enumerate(self.artifacts):
+                    shutil.copy2(os.path.join(path, str(i)), artifact)
+
+        return True
+
+    def store(self, key: str, build_dir: str = None) -> None:
+        """Store artifacts of `key`.
+
+        Args:
+            key (str): Key of the configuration.
+            build_dir (str, optional): Build directory to store, `artifacts` are stored if None.
+        """
+        with self.lock:
+            self._load()
+            if key in self.entries:
+                return
+
+        path = self._path(key)
+        tmp = f'{path}.tmp{os.getpid()}-{threading.get_ident()}'
+        if build_dir is not None:
+            shutil.copytree(build_dir, tmp)
+        else:
+            os.makedirs(tmp)
+            for i, artifact in enumerate(self.artifacts):
+                shutil.copy2(artifact, os.path.join(tmp, str(i)))
+
+        with self.lock:
+            if key in self.entries:
+                shutil.rmtree(tmp)
+                return
+            os.replace(tmp, path)
+            self.entries[key] = (fetch_tree_size(path), os.path.getmtime(path))
+            self._evict()
+
+    def _evict(self) -> None:
+        total = sum(size for size, _ in self.entries.values())
+        for key in sorted(self.entries, key=lambda k: self.entries[k][1]):
+            if total <= self.max_size:
+                break
+            total -= self.entries.pop(key)[0]
+            shutil.rmtree(self._path(key), ignore_errors=True)
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2022 Synodic Month, Juni May
+# yaTuner is licensed under Mulan PSL v2.
+# You can use this software according to the terms and conditions of the Mulan PSL v2.
+# You may obtain a copy of Mulan PSL v2 at:
+#          http://license.coscl.org.cn/MulanPSL2
+# THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+from typing import Dict, Sequence, Tuple, Union
+
+import numpy as np
+from scipy import stats
+
+# elements of a resampled block, bounding memory of a bootstrap
+MAX_ELEMENTS = 1 << 23
+
+STATISTICS = {'mean': np.nanmean, 'median': np.nanmedian}
+
+Samples = Union[np.ndarray, Sequence[Sequence[float]]]
+
+
+def pad(samples: Samples) -> Tuple[np.ndarray, np.ndarray]:
+    """Stack sample sets of different sizes into rows padded with nan.
+
+    Args:
+        samples (Samples): Sample sets.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Padded rows and size of each set.
+    """
+    lengths = np.array([len(x) for x in samples], dtype=int)
+    padded = np.full((len(samples), max(lengths.max(initial=0), 1)), np.nan)
+    for idx, x in enumerate(samples):
+        padded[idx, :len(x)] = x
+    return padded, lengths
+
+
+def _shared(baseline: Samples) -> bool:
+    """Check if `baseline` is a single sample set."""
+    return len(baseline) > 0 and np.ndim(baseline[0]) == 0
+
+
+def _broadcast(samples: Samples, baseline: Samples) -> Tuple[list, list]:
+    """Pair every sample set with its own baseline or a shared one."""
+    samples = [np.asarray(x, dtype=float) for x in samples]
+    if _shared(baseline):
+        baseline = [np.asarray(baseline, dtype=float)] * len(samples)
+    else:
+        baseline = [np.asarray(x, dtype=float) for x in baseline]
+    if len(baseline) != len(samples):
+        raise ValueError(f"{len(baseline)} baselines given "
+                         f"for {len(samples)} sample sets")
+    return samples, baseline
+
+
+def resample(samples: Samples,
+             num_resamples=1000,
+             statistic='median',
+             rng: np.random.Generator = None) -> np.ndarray:
+    """Bootstrap a statistic of every sample set at once.
+
+    Args:
+        samples (Samples): Sample sets, may differ in size.
+        num_resamples (int, optional): Resamples of each set. Defaults to 1000.
+        statistic (str, optional): 'median' or 'mean'. Defaults to 'median'.
+        rng (np.random.Generator, optional): Random generator. Defaults to a fresh one.
+
+    Returns:
+        np.ndarray: Statistic of each resample, in shape of (sets, resamples).
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    reduce = STATISTICS[statistic]
+
+    padded, lengths = pad(samples)
+    num_sets, width = padded.shape
+    results = np.empty((num_sets, num_resamples))
+    block = max(1, MAX_ELEMENTS // (num_resamples * width))
+    for begin in range(0, num_sets, block):
+        rows = slice(begin, begin + block)
+        sizes = lengths[rows, None, None]
+        shape = (len(sizes), num_resamples, width)
+        idx = (rng.random(shape) * sizes).astype(int)
+        values = np.take_along_axis(padded[rows, None, :], idx, axis=2)
+        # positions past the size of a set are padding
+        values = np.where(np.arange(width) < sizes, values, np.nan)
+        results[rows] = reduce(values, axis=2)
+    return results
+
+
+def bootstrap_ci(samples: Samples,
+                 baseline: Samples,
+                 alpha=0.05,
+                 num_resamples=1000,
+                 statistic='median',
+                 seed=None) -> Dict[str, np.ndarray]:
+    """Confidence intervals of relative change of every sample set to baseline.
+
+    Args:
+        samples (Samples): Sample sets.
+        baseline (Samples): One sample set shared by all, or one for each.
+        alpha (float, optional): Two-sided level of intervals. Defaults to 0.05.
+        num_resamples (int, optional): Resamples of each set. Defaults to 1000.
+        statistic (str, optional): 'median' or 'mean'. Defaults to 'median'.
+        seed (int, optional): Seed of resampling. Defaults to None.
+
+    Returns:
+        Dict[str, np.ndarray]: `effect`, `low` and `high` of `statistic(samples) / statistic(baseline) - 1`.
+    """
+    shared = _shared(baseline)
+    samples, baseline = _broadcast(samples, baseline)
+    rng = np.random.default_rng(seed)
+    reduce = STATISTICS[statistic]
+
+    boot = resample(samples, num_resamples, statistic, rng)
+    # a shared baseline is resampled once for all
+    boot_base = resample(baseline[:1] if shared else baseline, num_resamples,
+                         statistic, rng)
+    ratios = boot / boot_base - 1
+
+    center = np.array([reduce(x) for x in samples])
+    center_base = np.array([reduce(x) for x in baseline])
+    effect = center / center_base - 1
+    low, high = np.percentile(ratios, [50 * alpha, 100 - 50 * alpha], axis=1)
+    return {'effect': effect, 'low': low, 'high': high}
+
+
+def rank_test(samples: Samples, baseline: Samples) -> np.ndarray:
+    """Two-sided Mann-Whitney U test of every sample set against baseline.
+
+    Args:
+        samples (Samples): Sample sets.
+        baseline (Samples): One sample set shared by all, or one for each.
+
+    Returns:
+        np.ndarray: P-values.
+    """
+    samples, baseline = _broadcast(samples, baseline)
+    padded, _ = pad(samples)
+    padded_base, _ = pad(baseline)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pvalues = stats.mannwhitneyu(padded,
+                                     padded_base,
+                                     axis=1,
+                                     nan_policy='omit').pvalue
+    return np.nan_to_num(np.asarray(pvalues, dtype=float), nan=1.0)
+
+
+def fdr(pvalues: Sequence[float], q=0.05) -> np.ndarray:
+    """Benjamini-Hochberg procedure controlling false discovery rate.
+
+    Args:
+        pvalues (Sequence[float]): P-values of simultaneous tests, nan taken as 1.
+        q (float, optional): Expected ratio of false discoveries. Defaults to 0.05.
+
+    Returns:
+        np.ndarray: True where the null hypothesis is rejected.
+    """
+    pvalues = np.nan_to_num(np.asarray(pvalues, dtype=float), nan=1.0)
+    num_tests = len(pvalues)
+    order = np.argsort(pvalues)
+    below = pvalues[order] <= q * np.arange(1, num_tests + 1) / num_tests
+    rejected = np.zeros(num_tests, dtype=bool)
+    if below.any():
+        rejected[order[:np.nonzero(below)[0][-1] + 1]] = True
+    return rejected
+
+
+def compare(samples: Samples,
+            baseline: Samples,
+            q=0.05,
+            num_resamples=1000,
+            statistic='median',
+            seed=None) -> Dict[str, np.ndarray]:
+    """Compare every sample set with baseline in one batch.
+
+    Differences are found by Mann-Whitney U tests under false discovery rate
+    `q`, and sized by bootstrap confidence intervals of the relative change
+    of `statistic`. Neither assumes normal distribution.
+
+    Args:
+        samples (Samples): Sample sets, e.g. one for each flag.
+        baseline (Samples): One sample set shared by all, or one for each.
+        q (float, optional): False discovery rate, also the level of intervals. Defaults to 0.05.
+        num_resamples (int, optional): Resamples of each set. Defaults to 1000.
+        statistic (str, optional): 'median' or 'mean'. Defaults to 'median'.
+        seed (int, optional): Seed of resampling. Defaults to None.
+
+    Returns:
+        Dict[str, np.ndarray]: `effect`, `low`, `high`, `pvalue` and `rejected` of each set.
+    """
+    res = bootstrap_ci(samples, baseline, q, num_resamples, statistic, seed)
+    res['pvalue'] = rank_test(samples, baseline)
+    res['rejected'] = fdr(res['pvalue'], q)
+    return res
@@ -13,10 +13,23 @@
 from typing import Dict, List, Tuple
 from abc import abstractmethod
 import re
+import os
+import json
+import shlex
+import hashlib
+import threading
 import subprocess
 import yatuner
 import ast
 
+from yatuner.cache import hash_file
+
+# options which may change the result of preprocessing, in addition to
+# predefined macros
+PREPROCESSOR_OPTIONS = ('-D', '-U', '-I', '-include', '-imacros', '-isystem',
+                        '-iquote', '-idirafter', '-iprefix', '-nostdinc',
+                        '-std=', '-ansi', '--sysroot', '-isysroot')
+
 
 class Compiler(object):
 
@@ -52,12 +65,39 @@ class Gcc(Compiler):
                  out: str,
                  cc='gcc-9',
                  params_def_path='params.def',
-                 template='{cc} {options}  -o {out} {src}') -> None:
+                 template='{cc} {options}  -o {out} {src}',
+                 preprocess=False,
+                 preprocess_dir=None,
+                 in_memory=False,
+                 shared=False) -> None:
+        """Gcc compiler.
+
+        Args:
+            src (str): Source file.
+            out (str): Output file.
+            cc (str, optional): Specified gcc binary. Defaults to 'gcc-9'.
+            params_def_path (str, optional): `params.def` of gcc source for version earlier then 10. Defaults to 'params.def'.
+            template (str, optional): Template of compiling command. Defaults to '{cc} {options}  -o {out} {src}'.
+            preprocess (bool, optional): Preprocess the source once and compile the preprocessed file afterwards. Defaults to False.
+            preprocess_dir (str, optional): Directory of preprocessed files. Defaults to `.preprocessed` beside `out`.
+            in_memory (bool, optional): Place `out` on tmpfs under its own absolute path, use `fetch_execute_cmd` to get the path. Keeps `out` if tmpfs is not available. Defaults to False.
+            shared (bool, optional): Build `out` as a shared object for `yatuner.harness.Harness`, `src` is expected to define its entry symbol. Defaults to False.
+        """
         self.src = src
         self.out = out
         self.cc = cc
         self.template = template
         self.params_def_path = params_def_path
+        self.preprocess = preprocess
+        self.preprocess_dir = preprocess_dir
+        self.preprocess_lock = threading.Lock()
+        self.shared = shared
+
+        self.memory_dir = None
+        if in_memory:
+            self.memory_dir = yatuner.utils.make_memory_dir()
+            if self.memory_dir is not None:
+                self.out = self.fetch_memory_path(out)
 
         self.version = None
         self.params = None
@@ -141,18 +181,124 @@ class Gcc(Compiler):
 
         return self.params
 
+    def fetch_preprocessed(self, options='') -> str:
+        """Preprocess the source if necessary and get the preprocessed file.
+
+        The preprocessed file is reused as long as the source, the headers it
+        includes, preprocessor options and predefined macros under `options`
+        are unchanged.
+
+        Args:
+            options (str, optional): Compiling options. Defaults to ''.
+
+        Returns:
+            str: Path to the preprocessed file.
+        """
+        preprocess_dir = self.preprocess_dir
+        if preprocess_dir is None:
+            preprocess_dir = os.path.join(os.path.dirname(self.out),
+                                          '.preprocessed')
+        os.makedirs(preprocess_dir, exist_ok=True)
+
+        args = shlex.split(options)
+        if self.src.endswith('.c'):
+            lang, ext = 'c', '.i'
+        else:
+            lang, ext = 'c++', '.ii'
+
+        # optimization options change predefined macros such as
+        # `__OPTIMIZE__` or `__FAST_MATH__`, so they are part of the key
+        macros = subprocess.check_output(
+            [self.cc, *args, '-dM', '-E', '-x', lang, os.devnull])
+
+        digest = hashlib.sha256()
+        digest.update(os.path.abspath(self.src).encode())
+        hash_file(self.src, digest)
+        for i, arg in enumerate(args):
+            if arg.startswith(PREPROCESSOR_OPTIONS):
+                digest.update(arg.encode() + b'\0')
+                # separated argument such as `-I dir`
+                if arg in PREPROCESSOR_OPTIONS and i + 1 < len(args):
+                    digest.update(args[i + 1].encode() + b'\0')
+        digest.update(macros)
+
+        preprocessed = os.path.join(preprocess_dir, digest.hexdigest() + ext)
+        deps_path = preprocessed + '.deps'
+
+        with self.preprocess_lock:
+            if os.path.exists(preprocessed) and os.path.exists(deps_path):
+                with open(deps_path, 'r', encoding='utf-8') as f:
+                    deps = json.load(f)
+                if all(
+                        os.path.exists(dep) and os.path.getmtime(dep) == mtime
+                        for dep, mtime in deps.items()):
+                    return preprocessed
+
+            tmp = preprocessed + '.tmp'
+            res = yatuner.utils.execute(' '.join([
+                shlex.quote(self.cc), options, '-E', '-MD', '-MF',
+                shlex.quote(tmp + '.d'), '-o',
+                shlex.quote(tmp),
+                shlex.quote(self.src)
+            ]))
+            if res['returncode'] != 0:
+                raise RuntimeError(res['stderr'])
+
+            with open(tmp + '.d', 'r', encoding='utf-8') as f:
+                rule = f.read().replace('\\\n', ' ')
+            os.remove(tmp + '.d')
+            deps = {
+                dep: os.path.getmtime(dep)
+                for dep in rule.split(':', 1)[1].split()
+            }
+            with open(deps_path, 'w', encoding='utf-8') as f:
+                json.dump(deps, f)
+            os.replace(tmp, preprocessed)
+
+        return preprocessed
+
+    def fetch_memory_path(self, out: str) -> str:
+        """Path on tmpfs standing for `out`.
+
+        The absolute path of `out` is kept under the memory directory, so
+        outputs of the same name in different build directories do not
+        overwrite each other.
+
+        Args:
+            out (str): Output file.
+
+        Returns:
+            str: Path to the output file on tmpfs.
+        """
+        return os.path.join(self.memory_dir,
+                            os.path.abspath(out).lstrip(os.sep))
+
     def compile(self, options='', src=None, out=None) -> None:
 
         if src is not None:
             self.src = src
 
         if out is not None:
+            if self.memory_dir is not None:
+                out = self.fetch_memory_path(out)
             self.out = out
+        else:
+            out = self.out
+        if self.memory_dir is not None:
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+
+        # `-fPIC` changes predefined macros, so it goes before preprocessing
+        if self.shared:
+            options = f'{options} -shared -fPIC'
+
+        src = self.src
+        if self.preprocess:
+            src = self.fetch_preprocessed(options)
 
         command = self.template.format(cc=self.cc,
                                        options=options,
-                                       out=self.out,
-                                       src=self.src)
+                                       out=out,
+                                       src=src)
         # print(command)
         res = yatuner.utils.execute(command)
 
@@ -0,0 +1,89 @@
+/*
+ * Copyright (c) 2022 Synodic Month, Juni May
+ * yaTuner is licensed under Mulan PSL v2.
+ * You can use this software according to the terms and conditions of the Mulan PSL v2.
+ * You may obtain a copy of Mulan PSL v2 at:
+ *          http://license.coscl.org.cn/MulanPSL2
+ * THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+ * EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+ * MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+ * See the Mulan PSL v2 for more details.
+ */
+
+/*
+ * harness.c: in-process kernel runner of `yatuner.harness.Harness`.
+ *
+ * Requests are read line by line from stdin:
+ *
+ *   <shared object> <symbol> <num_samples> <num_calls> <warmup>
+ *
+ * The shared object is loaded, `void <symbol>(void)` is called `warmup`
+ * times, then `num_samples` times `num_calls` calls are timed, and the
+ * object is unloaded. Each request is answered with one line on stdout:
+ *
+ *   ok <ns per call> ...
+ *   error <message>
+ */
+
+#define _GNU_SOURCE
+#include <dlfcn.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+
+static long long now(void) {
+  struct timespec ts;
+  clock_gettime(CLOCK_MONOTONIC, &ts);
+  return (long long)ts.tv_sec * 1000000000LL + ts.tv_nsec;
+}
+
+int main(void) {
+  char line[8192], path[4096], symbol[256];
+  long num_samples, num_calls, warmup, i, j;
+  void *handle;
+  void (*kernel)(void);
+  long long start;
+
+  while (fgets(line, sizeof(line), stdin) != NULL) {
+    if (sscanf(line, "%4095s %255s %ld %ld %ld", path, symbol, &num_samples,
+               &num_calls, &warmup) != 5 ||
+        num_calls < 1) {
+      printf("error bad request\n");
+      fflush(stdout);
+      continue;
+    }
+
+    handle = dlopen(path, RTLD_NOW | RTLD_LOCAL);
+    if (handle == NULL) {
+      printf("error %s\n", dlerror());
+      fflush(stdout);
+      continue;
+    }
+
+    *(void **)(&kernel) = dlsym(handle, symbol);
+    if (kernel == NULL) {
+      printf("error %s\n", dlerror());
+      fflush(stdout);
+      dlclose(handle);
+      continue;
+    }
+
+    for (i = 0; i < warmup; i++)
+      kernel();
+
+    printf("ok");
+    for (i = 0; i < num_samples; i++) {
+      start = now();
+      for (j = 0; j < num_calls; j++)
+        kernel();
+      printf(" %.3f", (double)(now() - start) / num_calls);
+    }
+    printf("\n");
+    fflush(stdout);
+
+    dlclose(handle);
+  }
+
+  return 0;
+}
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2022 Synodic Month, Juni May
+# yaTuner is licensed under Mulan PSL v2.
+# You can use this software according to the terms and conditions of the Mulan PSL v2.
+# You may obtain a copy of Mulan PSL v2 at:
+#          http://license.coscl.org.cn/MulanPSL2
+# THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from typing import Callable
+
+import numpy as np
+
+from yatuner import utils
+
+
+class Harness:
+
+    def __init__(self,
+                 cc='gcc',
+                 symbol='yatuner_kernel',
+                 num_calls=1000,
+                 warmup=10,
+                 core: int = None) -> None:
+        """A long-lived process timing kernels built as shared objects.
+
+        Every measured shared object is copied to a fresh path, loaded with
+        `dlopen`, and `void <symbol>(void)` is timed in-process with
+        `clock_gettime`, then unloaded. A sample is the mean time of
+        `num_calls` calls in ns. Build kernels with `Gcc(..., shared=True)`.
+
+        Args:
+            cc (str, optional): C compiler building the harness. Defaults to 'gcc'.
+            symbol (str, optional): Entry symbol of kernels. Defaults to 'yatuner_kernel'.
+            num_calls (int, optional): Calls timed together as one sample. Defaults to 1000.
+            warmup (int, optional): Calls before timing. Defaults to 10.
+            core (int, optional): Cpu to pin the harness to. Defaults to None.
+        """
+        self.cc = cc
+        self.symbol = symbol
+        self.num_calls = num_calls
+        self.warmup = warmup
+        self.core = core
+
+        self.work_dir = None
+        self.process = None
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def start(self) -> None:
+        """Build the harness if necessary and start it."""
+        if self.work_dir is None:
+            self.work_dir = tempfile.mkdtemp(prefix='yatuner-harness-')
+
+        harness = os.path.join(self.work_dir, 'harness')
+        if not os.path.exists(harness):
+            src = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               'harness.c')
+            res = utils.execute(f'{self.cc} -O2 {src} -o {harness} -ldl')
+            if res['returncode'] != 0:
+                raise RuntimeError(res['stderr'])
+
+        self.process = subprocess.Popen([harness],
+                                        stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE,
+                                        text=True)
+        if self.core is not None and hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(self.process.pid, {self.core})
+
+    def measure(self, shared_object: str, num_samples: int) -> np.ndarray:
+        """Time the kernel in `shared_object`.
+
+        Args:
+            shared_object (str): Path to the kernel.
+            num_samples (int): Number of samples.
+
+        Returns:
+            np.ndarray: Mean ns per call of each sample.
+        """
+        with self.lock:
+            if self.process is None or self.process.poll() is not None:
+                self.start()
+
+            # a fresh path, so that a rebuilt kernel is never taken for
+            # the one loaded before
+            self.count += 1
+            path = os.path.join(self.work_dir, f'kernel-{self.count}.so')
+            shutil.copy(shared_object, path)
+            try:
+                self.process.stdin.write(f'{path} {self.symbol} '
+                                         f'{num_samples} {self.num_calls} '
+                                         f'{self.warmup}\n')
+                self.process.stdin.flush()
+                line = self.process.stdout.readline()
+            except BrokenPipeError:
+                line = ''
+            finally:
+                os.remove(path)
+
+            if not line:
+                returncode = self.process.wait()
+                self.process = None
+                raise RuntimeError(f"harness exited with {returncode} "
+                                   f"running {shared_object}")
+
+            status, *values = line.split(' ', 1)
+            if status.strip() != 'ok':
+                raise RuntimeError(values[0].strip() if values else line)
+
+            return np.array(values[0].split() if values else [], dtype=float)
+
+    def runner(self, shared_object: str) -> Callable[..., np.ndarray]:
+        """Adapt `measure` to `call_running_batch` of `Tuner`.
+
+        Args:
+            shared_object (str): Path to the kernel, relative to `build_dir` if the tuner passes one.
+
+        Returns:
+            (int, build_dir=None) -> np.ndarray: A function taking given number of samples.
+        """
+
+        def call_running_batch(num_runs, build_dir=None, **kwargs):
+            path = shared_object
+            if build_dir is not None:
+                path = os.path.join(build_dir, shared_object)
+            return self.measure(path, num_runs)
+
+        return call_running_batch
+
+    def close(self) -> None:
+        """Stop the harness and remove its files."""
+        with self.lock:
+            if self.process is not None:
+                self.process.stdin.close()
+                self.process.wait()
+                self.process = None
+            if self.work_dir is not None:
+                shutil.rmtree(self.work_dir, ignore_errors=True)
+                self.work_dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2022 Synodic Month, Juni May
+# yaTuner is licensed under Mulan PSL v2.
+# You can use this software according to the terms and conditions of the Mulan PSL v2.
+# You may obtain a copy of Mulan PSL v2 at:
+#          http://license.coscl.org.cn/MulanPSL2
+# THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import logging
+from math import ceil
+from typing import Callable, List, Sequence, Tuple
+
+import numpy as np
+
+
+def _bandwidth(points: np.ndarray) -> np.ndarray:
+    """Bandwidth of each dimension by Scott's rule."""
+    num_points, num_dims = points.shape
+    return np.maximum(
+        np.std(points, axis=0) * num_points**(-1 / (num_dims + 4)), 1e-3)
+
+
+def _log_density(x: np.ndarray, points: np.ndarray,
+                 bandwidth: np.ndarray) -> np.ndarray:
+    """Log density of a product Gaussian kernel estimate at each row of `x`."""
+    z = (x[:, None, :] - points[None, :, :]) / bandwidth
+    log_kernel = -0.5 * np.sum(z**2, axis=2) - np.sum(np.log(bandwidth))
+    top = log_kernel.max(axis=1, keepdims=True)
+    return top[:, 0] + np.log(np.mean(np.exp(log_kernel - top), axis=1))
+
+
+def propose(points: np.ndarray,
+            losses: np.ndarray,
+            rng: np.random.Generator,
+            top_fraction=0.15,
+            num_candidates=64,
+            bandwidth_factor=3.0) -> np.ndarray:
+    """Propose a point in the unit cube from observations, like BOHB.
+
+    Observations are split into good and bad ones by loss, and a kernel
+    density is fitted to each. Candidates are drawn around good points with
+    widened bandwidth, and the one maximizing the ratio of good density to
+    bad density is proposed (tree-structured Parzen estimator).
+
+    Args:
+        points (np.ndarray): Observed points, a row for each.
+        losses (np.ndarray): Loss of each point, inf for failures.
+        rng (np.random.Generator): Random generator.
+        top_fraction (float, optional): Ratio of points taken as good. Defaults to 0.15.
+        num_candidates (int, optional): Candidates drawn. Defaults to 64.
+        bandwidth_factor (float, optional): Widening of bandwidth to draw candidates. Defaults to 3.0.
+
+    Returns:
+        np.ndarray: Proposed point.
+    """
+    num_points, num_dims = points.shape
+    order = np.argsort(losses, kind='stable')
+    num_good = max(num_dims + 1, int(top_fraction * num_points))
+    num_bad = max(num_dims + 1, num_points - num_good)
+    good, bad = points[order[:num_good]], points[order[-num_bad:]]
+
+    good_bw, bad_bw = _bandwidth(good), _bandwidth(bad)
+    centers = good[rng.integers(len(good), size=num_candidates)]
+    candidates = np.clip(
+        centers + rng.normal(size=centers.shape) * good_bw * bandwidth_factor,
+        0, 1)
+    score = _log_density(candidates, good, good_bw) - _log_density(
+        candidates, bad, bad_bw)
+    return candidates[np.argmax(score)]
+
+
+def hyperband(num_dims: int,
+              evaluate: Callable[[int, np.ndarray], Sequence[float]],
+              num_fidelities: int,
+              eta=3,
+              num_iterations=1,
+              model=True,
+              random_fraction=1 / 3,
+              seed=None,
+              logger=None) -> List[Tuple[int, np.ndarray, float]]:
+    """Minimize a loss over the unit cube with cheap fidelities first.
+
+    Each iteration runs brackets of successive halving. A bracket starts
+    many points at a low fidelity and promotes the best `1 / eta` of them
+    to the next one, up to the highest fidelity, and brackets differ in how
+    low they start so that a misleading cheap fidelity costs little
+    (Hyperband). With `model`, new points are proposed by `propose` from
+    observations of the highest fidelity having enough of them, except for
+    a `random_fraction` drawn uniformly (BOHB).
+
+    Args:
+        num_dims (int): Dimensions of the unit cube.
+        evaluate ((int, np.ndarray) -> Sequence[float]): A function taking a fidelity index and points in rows, returning their losses, inf for failures.
+        num_fidelities (int): Number of fidelities, indexed cheapest first.
+        eta (int, optional): Ratio of points cut at each promotion. Defaults to 3.
+        num_iterations (int, optional): Iterations of all brackets. Defaults to 1.
+        model (bool, optional): Propose points by a model instead of at random. Defaults to True.
+        random_fraction (float, optional): Ratio of points drawn at random with `model`. Defaults to 1/3.
+        seed (int, optional): Seed of sampling. Defaults to None.
+        logger (optional): Logger. Defaults to `yatuner` logger.
+
+    Returns:
+        List[Tuple[int, np.ndarray, float]]: Fidelity index, point and loss of every evaluation.
+    """
+    if logger is None:
+        logger = logging.getLogger('yatuner')
+    rng = np.random.default_rng(seed)
+    s_max = num_fidelities - 1
+    history = []
+
+    def sample_points(num_points) -> np.ndarray:
+        points = rng.random((num_points, num_dims))
+        if not model:
+            return points
+        for fidelity in reversed(range(num_fidelities)):
+            observed = [(x, loss) for f, x, loss in history if f == fidelity]
+            if len(observed) >= num_dims + 2:
+                break
+        else:
+            return points
+
+        xs = np.array([x for x, _ in observed])
+        losses = np.array([loss for _, loss in observed])
+        for idx in range(num_points):
+            if rng.random() >= random_fraction:
+                points[idx] = propose(xs, losses, rng)
+        return points
+
+    for iteration in range(num_iterations):
+        for s in reversed(range(s_max + 1)):
+            num_points = ceil((s_max + 1) / (s + 1) * eta**s)
+            points = sample_points(num_points)
+            for rung in range(s + 1):
+                fidelity = s_max - s + rung
+                losses = np.asarray(evaluate(fidelity, points), dtype=float)
+                history.extend(
+                    (fidelity, x, loss) for x, loss in zip(points, losses))
+                logger.debug(f"iteration {iteration} bracket {s}: "
+                             f"{len(points)} points at fidelity {fidelity}, "
+                             f"best {losses.min():.2f}")
+
+                num_kept = max(1, len(points) // eta)
+                points = points[np.argsort(losses, kind='stable')[:num_kept]]
+
+    return history
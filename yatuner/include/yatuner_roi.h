@@ -0,0 +1,78 @@
+/*
+ * Copyright (c) 2022 Synodic Month, Juni May
+ * yaTuner is licensed under Mulan PSL v2.
+ * You can use this software according to the terms and conditions of the Mulan PSL v2.
+ * You may obtain a copy of Mulan PSL v2 at:
+ *          http://license.coscl.org.cn/MulanPSL2
+ * THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+ * EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+ * MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+ * See the Mulan PSL v2 for more details.
+ */
+
+/*
+ * yatuner_roi.h: region of interest for yaTuner.
+ *
+ * Wrap the code under tuning with `yatuner_roi_begin()` and
+ * `yatuner_roi_end()`, and count it with `fetch_perf_stat(..., roi=True)`
+ * of `yatuner.perf` or `yatuner.utils`. Counters are enabled and disabled
+ * through the same protocol as `perf stat --control`, and elapsed time of
+ * each region is reported separately. Outside yaTuner both are no-ops.
+ *
+ * Compile with `-I <yatuner.utils.fetch_include_dir()>`.
+ */
+
+#ifndef YATUNER_ROI_H
+#define YATUNER_ROI_H
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+#include <unistd.h>
+
+static struct timespec yatuner_roi_start;
+
+static int yatuner_roi_fd(const char *name) {
+  const char *val = getenv(name);
+  return val != NULL ? atoi(val) : -1;
+}
+
+static void yatuner_roi_send(const char *msg) {
+  int ctl = yatuner_roi_fd("YATUNER_CTL_FD");
+  int ack = yatuner_roi_fd("YATUNER_ACK_FD");
+  char buf[8];
+
+  if (ctl < 0 || ack < 0)
+    return;
+  if (write(ctl, msg, strlen(msg)) < 0)
+    return;
+  if (read(ack, buf, sizeof(buf)) < 0)
+    return;
+}
+
+static void yatuner_roi_begin(void) {
+  yatuner_roi_send("enable\n");
+  clock_gettime(CLOCK_MONOTONIC, &yatuner_roi_start);
+}
+
+static void yatuner_roi_end(void) {
+  struct timespec end;
+  char buf[32];
+  int fd, len;
+
+  clock_gettime(CLOCK_MONOTONIC, &end);
+  yatuner_roi_send("disable\n");
+
+  fd = yatuner_roi_fd("YATUNER_ROI_TIME_FD");
+  if (fd < 0)
+    return;
+  len = snprintf(buf, sizeof(buf), "%lld\n",
+                 (long long)(end.tv_sec - yatuner_roi_start.tv_sec) *
+                         1000000000LL +
+                     (end.tv_nsec - yatuner_roi_start.tv_nsec));
+  if (write(fd, buf, len) < 0)
+    return;
+}
+
+#endif
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2022 Synodic Month, Juni May
+# yaTuner is licensed under Mulan PSL v2.
+# You can use this software according to the terms and conditions of the Mulan PSL v2.
+# You may obtain a copy of Mulan PSL v2 at:
+#          http://license.coscl.org.cn/MulanPSL2
+# THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import os
+import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from subprocess import TimeoutExpired
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+Config = Tuple[Optional[List[str]], Optional[dict], Optional[str]]
+
+
+def fetch_cpus() -> List[int]:
+    """Fetch cpus available to current process.
+
+    Returns:
+        List[int]: Ids of available cpus.
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+@contextmanager
+def pinned(core: Optional[int]):
+    """Pin the calling thread to `core` within the context.
+
+    Args:
+        core (int, optional): Cpu to pin to, nothing is done if None.
+    """
+    if core is None or not hasattr(os, 'sched_setaffinity'):
+        yield
+        return
+
+    prev = os.sched_getaffinity(0)
+    os.sched_setaffinity(0, {core})
+    try:
+        yield
+    finally:
+        os.sched_setaffinity(0, prev)
+
+
+class BuildPool:
+
+    def __init__(self,
+                 call_compile: Callable,
+                 build_root: str,
+                 num_workers: int,
+                 measure_core: Optional[int] = None,
+                 pipeline: bool = False) -> None:
+        """A pool compiling several configurations at once.
+
+        Every configuration is compiled into its own slot directory under
+        `build_root`, and `call_compile` receives it as `build_dir`. Threads
+        are used instead of processes since `call_compile` is usually a
+        closure and the real work is done by compiler subprocesses anyway.
+
+        Args:
+            call_compile (Callable): Compilation callback of the tuner.
+            build_root (str): Directory holding the slot directories.
+            num_workers (int): Number of concurrent compilations.
+            measure_core (int, optional): Cpu reserved for measurement, compile workers avoid it. Defaults to None.
+            pipeline (bool, optional): Keep compiling following configurations while the current one is measured. Defaults to False.
+        """
+        self.call_compile = call_compile
+        self.build_root = build_root
+        self.num_workers = num_workers
+        self.measure_core = measure_core
+        self.pipeline = pipeline
+        self.main_dir = os.path.join(build_root, 'main')
+        self.executor = ThreadPoolExecutor(max_workers=num_workers,
+                                           initializer=self._init_worker)
+
+    def _init_worker(self) -> None:
+        if self.measure_core is None or not hasattr(os, 'sched_setaffinity'):
+            return
+        cpus = set(fetch_cpus()).difference({self.measure_core})
+        if cpus:
+            os.sched_setaffinity(0, cpus)
+
+    def slot_dir(self, slot: int) -> str:
+        return os.path.join(self.build_root, f'slot-{slot}')
+
+    def _compile_into(self, config: Config, build_dir: str):
+        if os.path.isdir(build_dir):
+            shutil.rmtree(build_dir)
+        os.makedirs(build_dir)
+
+        optimizers, parameters, additional = config
+        try:
+            self.call_compile(optimizers,
+                              parameters,
+                              additional,
+                              build_dir=build_dir)
+        except (RuntimeError, TimeoutExpired) as err:
+            return err
+
+        return None
+
+    def compile(self, configs: Iterable[Config],
+                build_dirs: Iterable[str]) -> List[Optional[Exception]]:
+        """Compile configurations concurrently.
+
+        Args:
+            configs (Iterable[Config]): `(optimizers, parameters, additional)` triples.
+            build_dirs (Iterable[str]): Target directory of each configuration.
+
+        Returns:
+            List[Optional[Exception]]: Compile error of each configuration, None if succeeded.
+        """
+        futures = [
+            self.executor.submit(self._compile_into, config, build_dir)
+            for config, build_dir in zip(configs, build_dirs)
+        ]
+        return [future.result() for future in futures]
+
+    def imap(self,
+             configs: Iterable[Config]) -> Iterator[Tuple[str, Exception]]:
+        """Compile configurations concurrently and yield them in order.
+
+        Without pipelining, a chunk of `num_workers` configurations is
+        compiled at once and the next chunk starts after the consumer moves
+        past it. With pipelining, `num_workers` compilations are always in
+        flight, so the following configurations are being compiled while
+        the consumer measures the current one.
+
+        Args:
+            configs (Iterable[Config]): `(optimizers, parameters, additional)` triples.
+
+        Yields:
+            Tuple[str, Exception]: Build directory and compile error (None if succeeded).
+        """
+        if not self.pipeline:
+            configs = list(configs)
+            for begin in range(0, len(configs), self.num_workers):
+                chunk = configs[begin:begin + self.num_workers]
+                build_dirs = [
+                    self.slot_dir(slot) for slot in range(len(chunk))
+                ]
+                errors = self.compile(chunk, build_dirs)
+                for build_dir, err in zip(build_dirs, errors):
+                    yield build_dir, err
+            return
+
+        # one more slot than compilations in flight, held by the consumer
+        free = list(range(self.num_workers + 1))
+        configs = iter(configs)
+        in_flight = deque()
+
+        def submit() -> None:
+            while len(in_flight) < self.num_workers:
+                config = next(configs, None)
+                if config is None:
+                    return
+                slot = free.pop()
+                in_flight.append((slot,
+                                  self.executor.submit(self._compile_into,
+                                                       config,
+                                                       self.slot_dir(slot))))
+
+        submit()
+        while in_flight:
+            slot, future = in_flight.popleft()
+            err = future.result()
+            submit()
+            yield self.slot_dir(slot), err
+            free.append(slot)
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True)
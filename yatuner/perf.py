@@ -0,0 +1,537 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2022 Synodic Month, Juni May
+# yaTuner is licensed under Mulan PSL v2.
+# You can use this software according to the terms and conditions of the Mulan PSL v2.
+# You may obtain a copy of Mulan PSL v2 at:
+#          http://license.coscl.org.cn/MulanPSL2
+# THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import ctypes
+import errno
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import platform
+import shlex
+import signal
+import struct
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Sequence, Union
+
+from yatuner import utils
+
+PERF_TYPE_HARDWARE = 0
+PERF_TYPE_SOFTWARE = 1
+
+EVENTS = {
+    'cpu-cycles': (PERF_TYPE_HARDWARE, 0),
+    'instructions': (PERF_TYPE_HARDWARE, 1),
+    'cache-references': (PERF_TYPE_HARDWARE, 2),
+    'cache-misses': (PERF_TYPE_HARDWARE, 3),
+    'branch-instructions': (PERF_TYPE_HARDWARE, 4),
+    'branch-misses': (PERF_TYPE_HARDWARE, 5),
+    'bus-cycles': (PERF_TYPE_HARDWARE, 6),
+    'stalled-cycles-frontend': (PERF_TYPE_HARDWARE, 7),
+    'stalled-cycles-backend': (PERF_TYPE_HARDWARE, 8),
+    'ref-cycles': (PERF_TYPE_HARDWARE, 9),
+    'cpu-clock': (PERF_TYPE_SOFTWARE, 0),
+    'task-clock': (PERF_TYPE_SOFTWARE, 1),
+    'page-faults': (PERF_TYPE_SOFTWARE, 2),
+    'context-switches': (PERF_TYPE_SOFTWARE, 3),
+    'cpu-migrations': (PERF_TYPE_SOFTWARE, 4),
+    'minor-faults': (PERF_TYPE_SOFTWARE, 5),
+    'major-faults': (PERF_TYPE_SOFTWARE, 6),
+    'alignment-faults': (PERF_TYPE_SOFTWARE, 7),
+    'emulation-faults': (PERF_TYPE_SOFTWARE, 8),
+}
+
+# `perf stat` reports clocks in msec
+MSEC_EVENTS = {'cpu-clock', 'task-clock'}
+
+DEFAULT_EVENTS = [
+    'branch-instructions',
+    'branch-misses',
+    'bus-cycles',
+    'cache-misses',
+    'cache-references',
+    'cpu-cycles',
+    'instructions',
+    'ref-cycles',
+    'alignment-faults',
+    'context-switches',
+    'cpu-clock',
+    'cpu-migrations',
+    'major-faults',
+    'minor-faults',
+    'page-faults',
+    'task-clock',
+]
+
+SYSCALL_NUMBERS = {
+    'x86_64': 298,
+    'i386': 336,
+    'i686': 336,
+    'aarch64': 241,
+    'riscv64': 241,
+    'armv7l': 364,
+    'ppc64le': 319,
+    'ppc64': 319,
+    's390x': 331,
+}
+
+PERF_ATTR_SIZE = 112
+
+PERF_FORMAT_TOTAL_TIME_ENABLED = 1 << 0
+PERF_FORMAT_TOTAL_TIME_RUNNING = 1 << 1
+PERF_FORMAT_GROUP = 1 << 3
+
+ATTR_DISABLED = 1 << 0
+ATTR_INHERIT = 1 << 1
+ATTR_EXCLUDE_KERNEL = 1 << 5
+ATTR_EXCLUDE_HV = 1 << 6
+ATTR_ENABLE_ON_EXEC = 1 << 12
+
+PERF_EVENT_IOC_ENABLE = 0x2400
+PERF_EVENT_IOC_DISABLE = 0x2401
+PERF_IOC_FLAG_GROUP = 1
+
+# holds the program until counters are attached to it
+TRAMPOLINE = 'read _ <&3; exec 3<&-; exec "$@"'
+
+_libc = None
+_available = None
+_schedulers = {}
+
+
+def perf_event_open(event: str,
+                    pid: int,
+                    group_fd=-1,
+                    leader=False,
+                    on_exec=True) -> int:
+    """Open a counting event on `pid` with the `perf_event_open` syscall.
+
+    The group leader is opened disabled and enabled on exec of `pid` unless
+    `on_exec` is False, other members follow the leader. Kernel and hypervisor are excluded so that
+    no privilege beyond `perf_event_paranoid` 2 is needed.
+
+    Args:
+        event (str): Event name as in `perf list`.
+        pid (int): Process to count.
+        group_fd (int, optional): Fd of group leader, -1 for a new group. Defaults to -1.
+        leader (bool, optional): Open as group leader. Defaults to False.
+        on_exec (bool, optional): Enable the group on exec of `pid`. Defaults to True.
+
+    Returns:
+        int: The fd, `OSError` is raised on failure.
+    """
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(None, use_errno=True)
+
+    number = SYSCALL_NUMBERS.get(platform.machine())
+    if number is None:
+        raise OSError(errno.ENOSYS, 'perf_event_open is unknown on '
+                      f'{platform.machine()}')
+
+    if event not in EVENTS:
+        raise OSError(errno.ENOENT, f'{event} is not a generic event')
+    kind, config = EVENTS[event]
+    flags = ATTR_INHERIT | ATTR_EXCLUDE_KERNEL | ATTR_EXCLUDE_HV
+    if leader:
+        flags |= ATTR_DISABLED
+        if on_exec:
+            flags |= ATTR_ENABLE_ON_EXEC
+
+    attr = ctypes.create_string_buffer(PERF_ATTR_SIZE)
+    struct.pack_into(
+        'IIQQQQQ', attr, 0, kind, PERF_ATTR_SIZE, config, 0, 0,
+        PERF_FORMAT_GROUP | PERF_FORMAT_TOTAL_TIME_ENABLED
+        | PERF_FORMAT_TOTAL_TIME_RUNNING, flags)
+
+    fd = _libc.syscall(number, attr, pid, -1, group_fd, 0)
+    if fd < 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err))
+
+    return fd
+
+
+def read_group(fd: int, num_events: int) -> List[float]:
+    """Read values of a group, scaled if the group was multiplexed."""
+    data = os.read(fd, 8 * (3 + num_events))
+    nr, enabled, running = struct.unpack_from('QQQ', data)
+    values = struct.unpack_from(f'{nr}Q', data, 24)
+    if running == 0:
+        return [0.0] * nr
+    return [x * enabled / running for x in values]
+
+
+def fetch_probe_file() -> str:
+    """Fetch the file caching probe results of current host."""
+    digest = hashlib.sha256()
+    digest.update(platform.node().encode())
+    digest.update(platform.release().encode())
+    try:
+        with open('/proc/cpuinfo', 'rb') as f:
+            for line in f:
+                if line.startswith((b'model name', b'cpu model', b'CPU part')):
+                    digest.update(line)
+                    break
+    except OSError:
+        pass
+
+    cache_dir = os.environ.get('XDG_CACHE_HOME',
+                               os.path.expanduser('~/.cache'))
+    return os.path.join(
+        cache_dir, 'yatuner',
+        f'perf-{platform.node()}-{digest.hexdigest()[:12]}.json')
+
+
+def _fits(group: Sequence[str]) -> bool:
+    """Check if `group` is counted on current thread without multiplexing."""
+    fds = []
+    try:
+        for event in group:
+            fds.append(
+                perf_event_open(event, 0, fds[0] if fds else -1, not fds))
+        fcntl.ioctl(fds[0], PERF_EVENT_IOC_ENABLE, PERF_IOC_FLAG_GROUP)
+        deadline = time.perf_counter() + 0.002
+        while time.perf_counter() < deadline:
+            pass
+        fcntl.ioctl(fds[0], PERF_EVENT_IOC_DISABLE, PERF_IOC_FLAG_GROUP)
+
+        data = os.read(fds[0], 8 * (3 + len(group)))
+        _, enabled, running = struct.unpack_from('QQQ', data)
+        return running > 0 and running == enabled
+    except OSError as err:
+        if err.errno in (errno.EACCES, errno.EPERM, errno.ENOSYS):
+            raise
+        return False
+    finally:
+        for fd in fds:
+            os.close(fd)
+
+
+def _probe(events: Sequence[str]) -> List[List[str]]:
+    supported = [event for event in events if _fits([event])]
+
+    # software events are never multiplexed
+    groups = []
+    software = [x for x in supported if EVENTS[x][0] == PERF_TYPE_SOFTWARE]
+    if software:
+        groups.append(software)
+
+    group = []
+    for event in supported:
+        if EVENTS[event][0] == PERF_TYPE_SOFTWARE:
+            continue
+        if _fits(group + [event]):
+            group.append(event)
+        else:
+            groups.append(group)
+            group = [event]
+    if group:
+        groups.append(group)
+
+    return groups
+
+
+def probe_events(events: Sequence[str] = None) -> List[List[str]]:
+    """Pack supported events into groups counted without multiplexing.
+
+    Every event is tried alone first, unsupported ones are left out. Hardware
+    events are then packed greedily into groups which the PMU counts all the
+    time, software events go into a group of their own. Results are cached
+    per host under `~/.cache/yatuner`.
+
+    Args:
+        events (Sequence[str], optional): Events to probe. Defaults to `DEFAULT_EVENTS`.
+
+    Returns:
+        List[List[str]]: Groups of supported events.
+    """
+    if events is None:
+        events = DEFAULT_EVENTS
+    events = list(dict.fromkeys(events))
+    key = ','.join(events)
+
+    filename = fetch_probe_file()
+    probed = {}
+    if os.path.exists(filename):
+        with open(filename, 'r', encoding='utf-8') as f:
+            probed = json.load(f)
+        if key in probed:
+            return probed[key]
+
+    groups = _probe(events)
+
+    supported = {event for group in groups for event in group}
+    unsupported = [event for event in events if event not in supported]
+    if unsupported:
+        logging.getLogger('yatuner').warning(
+            f"[red]events not supported: {', '.join(unsupported)}[/]")
+
+    probed[key] = groups
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    tmp = f'{filename}.tmp{os.getpid()}'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(probed, f, indent=2)
+    os.replace(tmp, filename)
+
+    return groups
+
+
+class EventScheduler:
+
+    def __init__(self, events: Sequence[str] = None) -> None:
+        """A schedule of event groups over runs of one measurement.
+
+        Software events are counted in every run. When hardware events do
+        not fit into one group, the program is run once for each group, so
+        every event is counted without multiplexing and all values of a
+        measurement come from the same program.
+
+        Args:
+            events (Sequence[str], optional): Events to count. Defaults to `DEFAULT_EVENTS`.
+        """
+        groups = probe_events(events)
+        self.software = [
+            x for x in groups if EVENTS[x[0]][0] == PERF_TYPE_SOFTWARE
+        ]
+        self.hardware = [
+            x for x in groups if EVENTS[x[0]][0] != PERF_TYPE_SOFTWARE
+        ]
+        self.events = [event for group in groups for event in group]
+
+    def runs(self) -> List[List[List[str]]]:
+        """Groups to count in each run of a measurement."""
+        if not self.hardware:
+            return [list(self.software)]
+        return [list(self.software) + [group] for group in self.hardware]
+
+    @staticmethod
+    def merge(runs: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+        """Merge counters of the runs of a measurement, the first run wins."""
+        counters = {}
+        for run in runs:
+            for event, value in run.items():
+                counters.setdefault(event, value)
+        return counters
+
+
+def _serve_roi(channel: utils.RoiChannel, leaders: Sequence[int]) -> None:
+    """Serve `enable`/`disable` requests of a program until it exits."""
+    buf = b''
+    try:
+        for chunk in iter(lambda: os.read(channel.ctl_r, 4096), b''):
+            buf += chunk
+            *lines, buf = buf.split(b'\n')
+            for line in lines:
+                if line.strip() == b'enable':
+                    request = PERF_EVENT_IOC_ENABLE
+                elif line.strip() == b'disable':
+                    request = PERF_EVENT_IOC_DISABLE
+                else:
+                    continue
+                for leader in leaders:
+                    fcntl.ioctl(leader, request, PERF_IOC_FLAG_GROUP)
+                os.write(channel.ack_w, b'ack\n\0')
+    except OSError:
+        # the program is gone
+        return
+
+
+def fetch_counters(command: Union[str, Sequence[str]],
+                   groups: Sequence[Sequence[str]] = None,
+                   timeout: float = None,
+                   roi=False) -> Dict[str, Any]:
+    """Count events of a program with `perf_event_open`.
+
+    The program is spawned through a shell trampoline which waits until the
+    counters are attached and then execs into it, counting starts at that
+    exec. Each group is read at once after the program exits.
+
+    With `roi`, counting starts disabled and a thread enables and disables
+    the groups on requests of `yatuner_roi.h` in the program.
+
+    Args:
+        command (str | Sequence[str]): Argv, or a command line split with `shlex`.
+        groups (Sequence[Sequence[str]], optional): Groups of events counted together. Defaults to hardware and software events of `DEFAULT_EVENTS` in two groups.
+        timeout (float, optional): Seconds before the program is killed. Defaults to None.
+        roi (bool, optional): Count only regions of interest, `duration_time` becomes the total time of regions. Defaults to False.
+
+    Returns:
+        Dict[str, Any]: Counters in the shape of `fetch_perf_stat`, unsupported events are left out.
+    """
+    if groups is None:
+        groups = [[x for x in DEFAULT_EVENTS if EVENTS[x][0] == kind]
+                  for kind in (PERF_TYPE_HARDWARE, PERF_TYPE_SOFTWARE)]
+
+    argv = shlex.split(command) if isinstance(command, str) else list(command)
+    r, w = os.pipe()
+    stderr = tempfile.TemporaryFile()
+    channel = utils.RoiChannel() if roi else None
+    env = channel.env() if roi else os.environ
+    actions, dups = utils.fetch_pass_fds_actions(
+        channel.child_fds() if roi else None)
+    fds = []
+    pid = None
+    server = None
+    try:
+        pid = os.posix_spawnp(
+            'sh', ['sh', '-c', TRAMPOLINE, 'sh'] + argv,
+            env,
+            file_actions=[
+                (os.POSIX_SPAWN_DUP2, r, 3),
+                (os.POSIX_SPAWN_OPEN, 1, os.devnull, os.O_WRONLY, 0),
+                (os.POSIX_SPAWN_DUP2, stderr.fileno(), 2),
+            ] + actions)
+        os.close(r)
+        r = None
+        for fd in dups:
+            os.close(fd)
+        dups = []
+
+        opened = []
+        for group in groups:
+            leader = -1
+            members = []
+            for event in group:
+                try:
+                    fd = perf_event_open(event, pid, leader, leader == -1,
+                                         not roi)
+                except OSError as err:
+                    if err.errno in (errno.EACCES, errno.EPERM, errno.ENOSYS):
+                        raise
+                    # not supported by this machine
+                    continue
+                fds.append(fd)
+                if leader == -1:
+                    leader = fd
+                members.append(event)
+            if members:
+                opened.append((leader, members))
+
+        if roi:
+            channel.close_child_ends()
+            server = threading.Thread(target=_serve_roi,
+                                      args=(channel, [x for x, _ in opened]))
+            server.start()
+
+        start = time.perf_counter_ns()
+        os.write(w, b'\n')
+        os.close(w)
+        w = None
+
+        timer = None
+        killed = threading.Event()
+        if timeout is not None:
+
+            def kill():
+                killed.set()
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+            timer = threading.Timer(timeout, kill)
+            timer.start()
+
+        _, status, _ = os.wait4(pid, 0)
+        duration = time.perf_counter_ns() - start
+        pid = None
+
+        if timer is not None:
+            timer.cancel()
+            if killed.is_set():
+                raise subprocess.TimeoutExpired(argv, timeout)
+
+        if os.waitstatus_to_exitcode(status) != 0:
+            stderr.seek(0)
+            raise RuntimeError(stderr.read().decode(errors='replace'))
+
+        if roi:
+            server.join()
+            server = None
+            duration = channel.fetch_time()
+            if duration is None:
+                raise RuntimeError("no region of interest reported")
+
+        counters = {}
+        for leader, members in opened:
+            for event, value in zip(members, read_group(leader, len(members))):
+                if event in MSEC_EVENTS:
+                    value /= 1e6
+                counters[event] = value
+        counters['duration_time'] = duration
+
+        return counters
+    finally:
+        if pid is not None:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        if channel is not None:
+            # ends the server at the latest
+            channel.close_child_ends()
+            if server is not None:
+                server.join()
+            channel.close()
+        for fd in [r, w] + fds + dups:
+            if fd is not None:
+                os.close(fd)
+        stderr.close()
+
+
+def fetch_perf_stat(command: Union[str, Sequence[str]],
+                    events: Sequence[str] = None,
+                    timeout: float = None,
+                    roi=False) -> Dict[str, Any]:
+    """Count events of a program, with `perf_event_open` if permitted, otherwise with `perf stat`.
+
+    Args:
+        command (str | Sequence[str]): Argv, or a command line, see `yatuner.utils.fetch_argv`.
+        events (Sequence[str], optional): Events to count, see `EventScheduler`. Names not in `EVENTS` are passed to `perf stat`. Defaults to `DEFAULT_EVENTS`.
+        timeout (float, optional): Seconds before the program is killed. Defaults to None.
+        roi (bool, optional): Count only regions marked with `yatuner_roi.h`, `duration_time` becomes the total time of regions. Defaults to False.
+
+    Returns:
+        Dict[str, Any]: Counters.
+    """
+    global _available
+    if events is None:
+        events = DEFAULT_EVENTS
+    command = utils.fetch_argv(command)
+
+    # events without a generic id are left to `perf stat`
+    if _available is not False and all(x in EVENTS for x in events):
+        try:
+            key = tuple(events)
+            if key not in _schedulers:
+                _schedulers[key] = EventScheduler(events)
+            scheduler = _schedulers[key]
+            runs = [
+                fetch_counters(command,
+                               groups=groups,
+                               timeout=timeout,
+                               roi=roi) for groups in scheduler.runs()
+            ]
+            _available = True
+            return scheduler.merge(runs)
+        except OSError as err:
+            if _available:
+                raise
+            _available = False
+
+    return utils.fetch_perf_stat(command,
+                                 events=events,
+                                 timeout=timeout,
+                                 roi=roi)
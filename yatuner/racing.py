@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2022 Synodic Month, Juni May
+# yaTuner is licensed under Mulan PSL v2.
+# You can use this software according to the terms and conditions of the Mulan PSL v2.
+# You may obtain a copy of Mulan PSL v2 at:
+#          http://license.coscl.org.cn/MulanPSL2
+# THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import logging
+from math import ceil
+from typing import Callable, List, Sequence, Tuple
+
+import numpy as np
+from scipy import stats
+
+from yatuner.compare import fdr
+
+
+def race(num_candidates: int,
+         sample: Callable[[List[int], int], Sequence[np.ndarray]],
+         budget: int,
+         step=2,
+         alpha=0.05,
+         eta: float = None,
+         logger=None) -> Tuple[List[np.ndarray], List[int]]:
+    """Race candidates, dropping clearly inferior ones early.
+
+    In every round each surviving candidate takes `step` more samples.
+    Survivors slower than the one of the lowest median by a one-sided
+    Mann-Whitney U test are dropped under false discovery rate `alpha`
+    (F-race). With `eta`, no more than `1 / eta` of survivors are kept by
+    median as well (successive halving). The race ends when the budget is
+    spent or one candidate is left, so the budget goes to close contenders.
+    A single candidate takes the whole budget.
+
+    Args:
+        num_candidates (int): Number of candidates.
+        sample ((List[int], int) -> Sequence[np.ndarray]): A function taking given number of new samples of each candidate in a list of indices.
+        budget (int): Samples of all candidates in total.
+        step (int, optional): Samples of each survivor in a round. Defaults to 2.
+        alpha (float, optional): False discovery rate of dropping. Defaults to 0.05.
+        eta (float, optional): Ratio of survivors cut in each round, None keeps all not dropped. Defaults to None.
+        logger (optional): Logger. Defaults to `yatuner` logger.
+
+    Returns:
+        Tuple[List[np.ndarray], List[int]]: Samples of each candidate and indices of survivors, best first.
+    """
+    if logger is None:
+        logger = logging.getLogger('yatuner')
+
+    samples = [np.zeros(0) for _ in range(num_candidates)]
+    alive = list(range(num_candidates))
+    used = 0
+    num_rounds = 0
+    if num_candidates == 1 and budget > 0:
+        samples[0] = np.concatenate([samples[0], sample(alive, budget)[0]])
+
+    while len(alive) > 1:
+        num_samples = min(step, (budget - used) // len(alive))
+        if num_samples < 1:
+            break
+
+        for idx, new in zip(alive, sample(alive, num_samples)):
+            samples[idx] = np.concatenate([samples[idx], new])
+        used += num_samples * len(alive)
+        num_rounds += 1
+
+        alive.sort(key=lambda idx: np.median(samples[idx]))
+        best, rest = alive[0], alive[1:]
+        pvalues = [
+            stats.mannwhitneyu(samples[idx],
+                               samples[best],
+                               alternative='greater').pvalue for idx in rest
+        ]
+        dropped = {idx for idx, x in zip(rest, fdr(pvalues, alpha)) if x}
+        alive = [idx for idx in alive if idx not in dropped]
+        if eta is not None:
+            alive = alive[:max(1, ceil(len(alive) / eta))]
+
+        logger.debug(f"round {num_rounds}: {len(alive)} survivors, "
+                     f"{used}/{budget} samples")
+
+    alive.sort(key=lambda idx: np.median(samples[idx]))
+    return samples, alive
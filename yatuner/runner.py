@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2022 Synodic Month, Juni May
+# yaTuner is licensed under Mulan PSL v2.
+# You can use this software according to the terms and conditions of the Mulan PSL v2.
+# You may obtain a copy of Mulan PSL v2 at:
+#          http://license.coscl.org.cn/MulanPSL2
+# THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from yatuner.parallel import fetch_cpus, pinned
+
+
+def fetch_physical_cores() -> List[int]:
+    """Fetch one cpu of every physical core available to current process.
+
+    Returns:
+        List[int]: Ids of cpus, hyper-threading siblings are left out.
+    """
+    cores = {}
+    for cpu in fetch_cpus():
+        topology = f'/sys/devices/system/cpu/cpu{cpu}/topology/'
+        try:
+            with open(topology + 'physical_package_id') as f:
+                package = int(f.read())
+            with open(topology + 'core_id') as f:
+                core = int(f.read())
+        except (OSError, ValueError):
+            package, core = 0, cpu
+        cores.setdefault((package, core), cpu)
+
+    return sorted(cores.values())
+
+
+def fetch_miss_ratio(counters: Dict[str, Any]) -> float:
+    """Fetch cache miss ratio from counters of `fetch_perf_stat`."""
+    references = counters.get('cache-references', 0)
+    if not references:
+        return None
+    return counters.get('cache-misses', 0) / references
+
+
+class ConcurrentRunner:
+
+    def __init__(self,
+                 call_running: Callable[..., float],
+                 cores: Sequence[int],
+                 call_perf: Callable[..., Dict[str, Any]] = None,
+                 num_solo=2,
+                 tolerance=0.05,
+                 logger=None) -> None:
+        """A runner measuring several programs at once, each on its own core.
+
+        Every program is first run `num_solo` times alone as a reference.
+        The remaining samples are taken in rounds running all programs
+        together. If a program runs slower together than alone by more than
+        `tolerance`, or its cache miss ratio grows by more than `tolerance`
+        (checked once per batch when `call_perf` is given), the batch is
+        taken as interfered, its concurrent samples are re-taken serially
+        and the runner stays serial afterwards.
+
+        Args:
+            call_running ((build_dir) -> float): A function fetching result of program in `build_dir`.
+            cores (Sequence[int]): Cpus to run on, one program per cpu.
+            call_perf ((build_dir) -> Dict[str, Any], optional): A function fetching counters including `cache-misses` and `cache-references`. Defaults to None.
+            num_solo (int, optional): Samples taken alone for each program. Defaults to 2.
+            tolerance (float, optional): Relative slowdown/miss ratio growth taken as interference. Defaults to 0.05.
+            logger (optional): Logger. Defaults to `yatuner` logger.
+        """
+        self.call_running = call_running
+        self.call_perf = call_perf
+        self.cores = list(cores)
+        self.num_solo = num_solo
+        self.tolerance = tolerance
+        self.logger = logger if logger is not None else logging.getLogger(
+            'yatuner')
+        self.serial = len(self.cores) < 2
+        self.executor = ThreadPoolExecutor(max_workers=max(len(self.cores), 1))
+
+    def _run_serial(self, build_dir: str, core: int) -> float:
+        with pinned(core):
+            return self.call_running(build_dir=build_dir)
+
+    def _run_rounds(self, build_dirs, num_rounds, call) -> List[List[Any]]:
+        barrier = threading.Barrier(len(build_dirs))
+
+        def worker(build_dir, core):
+            results = []
+            with pinned(core):
+                for _ in range(num_rounds):
+                    barrier.wait()
+                    results.append(call(build_dir=build_dir))
+            return results
+
+        futures = [
+            self.executor.submit(worker, build_dir, core)
+            for build_dir, core in zip(build_dirs, self.cores)
+        ]
+        return [future.result() for future in futures]
+
+    def _interfered(self, build_dirs, solo, concurrent) -> bool:
+        for build_dir, solo_samples, samples in zip(build_dirs, solo,
+                                                    concurrent):
+            slowdown = np.median(samples) / np.median(solo_samples) - 1
+            if slowdown > self.tolerance:
+                self.logger.warning(f"[red]{build_dir} runs "
+                                    f"{slowdown * 100:.1f}% slower "
+                                    f"concurrently[/]")
+                return True
+
+        if self.call_perf is None:
+            return False
+
+        solo_ratios = [
+            fetch_miss_ratio(self._perf_serial(build_dir, core))
+            for build_dir, core in zip(build_dirs, self.cores)
+        ]
+        ratios = [
+            fetch_miss_ratio(x[0])
+            for x in self._run_rounds(build_dirs, 1, self.call_perf)
+        ]
+        for core, solo_ratio, ratio in zip(self.cores, solo_ratios, ratios):
+            if solo_ratio is None or ratio is None:
+                continue
+            self.logger.debug(f"cpu {core} cache miss ratio "
+                              f"{solo_ratio:.4f} -> {ratio:.4f}")
+            if ratio > solo_ratio * (1 + self.tolerance):
+                self.logger.warning(f"[red]cache miss ratio on cpu {core} "
+                                    f"grows concurrently[/]")
+                return True
+
+        return False
+
+    def _perf_serial(self, build_dir: str, core: int) -> Dict[str, Any]:
+        with pinned(core):
+            return self.call_perf(build_dir=build_dir)
+
+    def measure(self, build_dirs: Sequence[str],
+                num_samples: int) -> List[np.ndarray]:
+        """Take `num_samples` results of every program.
+
+        Args:
+            build_dirs (Sequence[str]): Build directories, no more than cores.
+            num_samples (int): Samples for each program.
+
+        Returns:
+            List[np.ndarray]: Samples of each program.
+        """
+        build_dirs = list(build_dirs)
+        assert len(build_dirs) <= len(self.cores), "more programs than cores"
+
+        num_solo = min(self.num_solo, num_samples)
+        if self.serial or len(build_dirs) < 2:
+            num_solo = num_samples
+
+        solo = [[self._run_serial(build_dir, core) for _ in range(num_solo)]
+                for build_dir, core in zip(build_dirs, self.cores)]
+
+        if num_solo == num_samples:
+            return [np.array(x) for x in solo]
+
+        concurrent = self._run_rounds(build_dirs, num_samples - num_solo,
+                                      self.call_running)
+
+        if (num_solo > 0 and self._interfered(build_dirs, solo, concurrent)):
+            self.logger.warning("[red]interference detected, "
+                                "measuring serially from now on[/]")
+            self.serial = True
+            concurrent = [[
+                self._run_serial(build_dir, core)
+                for _ in range(num_samples - num_solo)
+            ] for build_dir, core in zip(build_dirs, self.cores)]
+
+        return [np.array(x + y) for x, y in zip(solo, concurrent)]
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True)
+
+
+class InterleavedRunner:
+
+    def __init__(self, call_running: Callable[..., float], seed=None) -> None:
+        """A runner measuring several programs in randomized round-robin.
+
+        Every round runs each program, and the baseline if given, once in a
+        fresh random order, so that slow drift such as thermal throttling or
+        background load hits all of them alike instead of whichever is
+        measured at the time. Samples of one round can then be paired.
+
+        Args:
+            call_running ((build_dir) -> float): A function fetching result of program in `build_dir`.
+            seed (int, optional): Seed of the order of runs. Defaults to None.
+        """
+        self.call_running = call_running
+        self.rng = np.random.default_rng(seed)
+
+    def measure(self,
+                build_dirs: Sequence[str],
+                num_rounds: int,
+                baseline_dir=None) -> Tuple[np.ndarray, List[np.ndarray]]:
+        """Take `num_rounds` results of every program, interleaved.
+
+        Args:
+            build_dirs (Sequence[str]): Build directories of candidates.
+            num_rounds (int): Samples for each program.
+            baseline_dir (str, optional): Build directory of baseline. Defaults to None.
+
+        Returns:
+            Tuple[np.ndarray, List[np.ndarray]]: Samples of baseline (empty without it) and of each candidate, the i-th sample of all taken in round i.
+        """
+        build_dirs = list(build_dirs)
+        if baseline_dir is not None:
+            build_dirs.append(baseline_dir)
+
+        samples = [[] for _ in build_dirs]
+        for _ in range(num_rounds):
+            for k in self.rng.permutation(len(build_dirs)):
+                samples[k].append(self.call_running(build_dir=build_dirs[k]))
+
+        samples = [np.array(x, dtype=float) for x in samples]
+        if baseline_dir is None:
+            return np.zeros(0), samples
+        return samples[-1], samples[:-1]
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2022 Synodic Month, Juni May
+# yaTuner is licensed under Mulan PSL v2.
+# You can use this software according to the terms and conditions of the Mulan PSL v2.
+# You may obtain a copy of Mulan PSL v2 at:
+#          http://license.coscl.org.cn/MulanPSL2
+# THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from scipy import stats
+
+FIELDS = ('effect', 'stderr', 'pvalue')
+
+
+def _is_prime(n: int) -> bool:
+    return n > 1 and all(n % k for k in range(2, int(n**0.5) + 1))
+
+
+def _paley(q: int) -> np.ndarray:
+    """Hadamard matrix of order `q + 1` for prime `q` of 4k + 3."""
+    residues = {(x * x) % q for x in range(1, q)}
+    chi = np.array([0] + [1 if x in residues else -1 for x in range(1, q)])
+    jacobsthal = chi[(np.arange(q)[None, :] - np.arange(q)[:, None]) % q]
+
+    skew = np.zeros((q + 1, q + 1), dtype=int)
+    skew[0, 1:] = 1
+    skew[1:, 0] = -1
+    skew[1:, 1:] = jacobsthal
+    return np.eye(q + 1, dtype=int) + skew
+
+
+def hadamard(order: int) -> Optional[np.ndarray]:
+    """Hadamard matrix by Sylvester and Paley constructions.
+
+    Args:
+        order (int): Order of the matrix, a multiple of 4 or 1, 2.
+
+    Returns:
+        Optional[np.ndarray]: Matrix of +1/-1, None if not constructible here.
+    """
+    power = 1
+    while order % (2 * power) == 0:
+        power *= 2
+
+    # order = 2^a * (q + 1) with prime q of 4k + 3, or a power of 2
+    for base in range(order // power, order + 1):
+        if order % base or (order // base) & (order // base - 1):
+            continue
+        if base == 1:
+            core = np.ones((1, 1), dtype=int)
+        elif _is_prime(base - 1) and (base - 1) % 4 == 3:
+            core = _paley(base - 1)
+        else:
+            continue
+
+        matrix = core
+        while len(matrix) < order:
+            matrix = np.block([[matrix, matrix], [matrix, -matrix]])
+        return matrix
+
+    return None
+
+
+def plackett_burman(num_factors: int) -> np.ndarray:
+    """Two-level screening design with fewest runs constructible.
+
+    Every column is balanced and orthogonal to the others, so main effects
+    of all factors are estimated from about `num_factors + 1` runs.
+
+    Args:
+        num_factors (int): Number of factors.
+
+    Returns:
+        np.ndarray: Design of +1 (high) and -1 (low), a row for each run.
+    """
+    num_runs = 4
+    while True:
+        if num_runs > num_factors:
+            matrix = hadamard(num_runs)
+            if matrix is not None:
+                # first column all +1 and dropped as the intercept
+                matrix = matrix * matrix[:, :1]
+                return matrix[:, 1:num_factors + 1]
+        num_runs += 4
+
+
+def estimate_effects(design: np.ndarray,
+                     samples: Sequence) -> Dict[str, np.ndarray]:
+    """Estimate main effects of a two-level design by least squares.
+
+    Runs without samples (e.g. failed to compile) are left out, factors
+    kept at one level by the remaining runs are not estimated and get nan,
+    e.g. an option failing every build it is in. Noise is pooled from
+    repeated samples of runs, or from residuals if the design leaves
+    degrees of freedom, otherwise `stderr` and `pvalue` are nan.
+
+    Args:
+        design (np.ndarray): Design of +1/-1, a row for each run.
+        samples (Sequence[Sequence[float]]): Samples of each run.
+
+    Returns:
+        Dict[str, np.ndarray]: `effect` (mean of high minus mean of low), `stderr` and two-sided `pvalue` of each factor.
+    """
+    design = np.asarray(design, dtype=float)
+    kept = [i for i, x in enumerate(samples) if x is not None and len(x)]
+    counts = np.array([len(samples[i]) for i in kept], dtype=float)
+    means = np.array([np.mean(samples[i]) for i in kept])
+    if not kept:
+        return {key: np.full(design.shape[1], np.nan) for key in FIELDS}
+
+    varied = np.ptp(design[kept], axis=0) > 0
+    x = np.hstack([np.ones((len(kept), 1)), design[kept][:, varied]])
+
+    # weighted by samples of each run
+    weights = np.sqrt(counts)[:, None]
+    coef, _, rank, _ = np.linalg.lstsq(x * weights,
+                                       means * weights[:, 0],
+                                       rcond=None)
+    effect = np.full(design.shape[1], np.nan)
+    effect[varied] = 2 * coef[1:]
+
+    dof = int(np.sum(counts - 1))
+    if dof > 0:
+        variance = sum(
+            np.sum((np.asarray(samples[i]) - np.mean(samples[i]))**2)
+            for i in kept) / dof
+    else:
+        dof = len(kept) - rank
+        residuals = means - x @ coef
+        variance = np.sum(counts * residuals**2) / dof if dof > 0 else np.nan
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scale = np.diag(np.linalg.pinv((x * weights).T @ (x * weights)))
+        stderr = np.full(design.shape[1], np.nan)
+        if rank == x.shape[1]:
+            # otherwise factors are aliased through left out runs
+            stderr[varied] = 2 * np.sqrt(variance * scale[1:])
+        pvalue = 2 * stats.t.sf(np.abs(effect / stderr), max(dof, 1))
+
+    return dict(zip(FIELDS, (effect, stderr, pvalue)))
+
+
+def group_screen(factors: Sequence,
+                 test: Callable[[List[list]], Sequence[bool]],
+                 group_size: int = None) -> list:
+    """Find factors with an effect by adaptive group testing.
+
+    Factors start in groups of `group_size`. A group is tested as a whole,
+    and dropped with all its factors if it shows no effect, otherwise it is
+    split in halves tested in the next round, down to single factors. All
+    groups of a round are tested in one call so they can be built together.
+    Few active factors take about `log2(len(factors))` rounds, but effects
+    of opposite signs in one group may cancel out.
+
+    Args:
+        factors (Sequence): Factors to screen.
+        test ((List[list]) -> Sequence[bool]): A function telling if each group has an effect.
+        group_size (int, optional): Size of the first groups. Defaults to all factors in one group.
+
+    Returns:
+        list: Factors with an effect, in their original order.
+    """
+    factors = list(factors)
+    if group_size is None:
+        group_size = max(len(factors), 1)
+    groups = [
+        factors[begin:begin + group_size]
+        for begin in range(0, len(factors), group_size)
+    ]
+
+    active = set()
+    while groups:
+        splits = []
+        for group, decision in zip(groups, test(groups)):
+            if not decision:
+                continue
+            if len(group) == 1:
+                active.add(group[0])
+            else:
+                half = len(group) // 2
+                splits.extend([group[:half], group[half:]])
+        groups = splits
+
+    return [factor for factor in factors if factor in active]
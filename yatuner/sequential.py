@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2022 Synodic Month, Juni May
+# yaTuner is licensed under Mulan PSL v2.
+# You can use this software according to the terms and conditions of the Mulan PSL v2.
+# You may obtain a copy of Mulan PSL v2 at:
+#          http://license.coscl.org.cn/MulanPSL2
+# THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+from math import ceil, log
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import stats
+
+
+class SPRT:
+
+    def __init__(self, mu0, mu1, sigma, alpha=0.05, beta=0.2) -> None:
+        """Wald's sequential probability ratio test of a normal mean with known sigma.
+
+        Args:
+            mu0 (float): Mean under H0.
+            mu1 (float): Mean under H1.
+            sigma (float): Standard deviation of a sample.
+            alpha (float, optional): Probability of accepting H1 under H0. Defaults to 0.05.
+            beta (float, optional): Probability of accepting H0 under H1. Defaults to 0.2.
+        """
+        self.mu0 = mu0
+        self.mu1 = mu1
+        self.sigma = sigma
+        self.upper = log((1 - beta) / alpha)
+        self.lower = log(beta / (1 - alpha))
+
+    def llr(self, samples: Sequence[float]) -> float:
+        """Log likelihood ratio of H1 to H0."""
+        samples = np.asarray(samples, dtype=float)
+        slope = (self.mu1 - self.mu0) / self.sigma**2
+        return slope * np.sum(samples - (self.mu0 + self.mu1) / 2)
+
+    def decide(self, samples: Sequence[float]) -> Optional[bool]:
+        """Decide on samples so far.
+
+        Returns:
+            Optional[bool]: True if H1 is accepted, False if H0 is accepted, None to continue sampling.
+        """
+        llr = self.llr(samples)
+        if llr >= self.upper:
+            return True
+        if llr <= self.lower:
+            return False
+        return None
+
+
+class TwoSidedSPRT:
+
+    def __init__(self, mu0, delta, sigma, alpha=0.05, beta=0.2) -> None:
+        """Two one-sided SPRTs of `mu0` against `mu0 + delta` and `mu0 - delta`.
+
+        H1 is accepted as soon as either side accepts it, H0 once both sides
+        accept H0. Each side is tested at `alpha / 2`.
+
+        Args:
+            mu0 (float): Mean under H0.
+            delta (float): Smallest shift of mean worth detecting.
+            sigma (float): Standard deviation of a sample.
+            alpha (float, optional): Probability of accepting H1 under H0. Defaults to 0.05.
+            beta (float, optional): Probability of accepting H0 under H1. Defaults to 0.2.
+        """
+        self.tests = [
+            SPRT(mu0, mu0 + delta, sigma, alpha / 2, beta),
+            SPRT(mu0, mu0 - delta, sigma, alpha / 2, beta)
+        ]
+
+    def decide(self, samples: Sequence[float]) -> Optional[bool]:
+        """Decide on samples so far, see `SPRT.decide`."""
+        decisions = [test.decide(samples) for test in self.tests]
+        if True in decisions:
+            return True
+        if all(decision is False for decision in decisions):
+            return False
+        return None
+
+
+def plan_samples(sigma, delta, alpha=0.05, power=0.8, two_sample=False) -> int:
+    """Samples needed to detect a shift of mean by `delta` with a z test.
+
+    Args:
+        sigma (float): Standard deviation of a sample.
+        delta (float): Smallest shift of mean worth detecting.
+        alpha (float, optional): Two-sided significance level. Defaults to 0.05.
+        power (float, optional): Probability of detecting a shift of `delta`. Defaults to 0.8.
+        two_sample (bool, optional): Compare two groups of samples instead of one against a known mean. Defaults to False.
+
+    Returns:
+        int: Samples of each group, at least 2.
+    """
+    z = stats.norm.ppf(1 - alpha / 2) + stats.norm.ppf(power)
+    num_samples = (z * sigma / delta)**2
+    if two_sample:
+        num_samples *= 2
+    return max(2, ceil(num_samples))
+
+
+def confidence_interval(samples: Sequence[float],
+                        sigma,
+                        alpha=0.05) -> Tuple[float, float]:
+    """Confidence interval of the mean of samples with known sigma."""
+    mean = np.mean(samples)
+    half = stats.norm.ppf(1 - alpha / 2) * sigma / np.sqrt(len(samples))
+    return mean - half, mean + half
+
+
+def straddles(samples: Sequence[float], boundary, sigma, alpha=0.05) -> bool:
+    """Check if the confidence interval of the mean still contains `boundary`."""
+    low, high = confidence_interval(samples, sigma, alpha)
+    return low <= boundary <= high
+
+
+def steady_state(samples: Sequence[float], alpha=0.05) -> bool:
+    """Check if a window of consecutive samples shows no warmup effect.
+
+    The window is steady if its two halves are not told apart by a
+    Mann-Whitney U test and it has no monotonic trend by a Kendall tau test.
+
+    Args:
+        samples (Sequence[float]): Latest samples in the order taken, at least 4.
+        alpha (float, optional): Significance level of both tests. Defaults to 0.05.
+
+    Returns:
+        bool: True if steady.
+    """
+    samples = np.asarray(samples, dtype=float)
+    half = len(samples) // 2
+    if np.ptp(samples) == 0:
+        return True
+
+    shift = stats.mannwhitneyu(samples[:half], samples[half:]).pvalue
+    trend = stats.kendalltau(np.arange(len(samples)), samples).pvalue
+    return shift > alpha and trend > alpha
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2022 Synodic Month, Juni May
+# yaTuner is licensed under Mulan PSL v2.
+# You can use this software according to the terms and conditions of the Mulan PSL v2.
+# You may obtain a copy of Mulan PSL v2 at:
+#          http://license.coscl.org.cn/MulanPSL2
+# THIS SOFTWARE IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import csv
+import logging
+import os
+import threading
+from typing import Any, Mapping
+
+import pandas as pd
+
+FIELDS = ['stage', 'epoch', 'kind', 'result', 'drift', 'normalized', 'config']
+
+
+class TrialStore:
+
+    def __init__(self, path: str) -> None:
+        """A csv file recording every trial of optimization.
+
+        Each row holds the stage, the epoch, the kind of trial (`trial` or
+        `baseline`), the raw result, the drift of baseline at that time, the
+        result normalized to the starting baseline and the configuration.
+
+        Args:
+            path (str): Path to the csv file, usually `<workspace>/trials.csv`.
+        """
+        self.path = path
+        self.lock = threading.Lock()
+
+    def append(self,
+               stage: str,
+               epoch: int,
+               result: float,
+               kind='trial',
+               drift=1.0,
+               normalized: float = None,
+               config: Mapping[str, Any] = None) -> None:
+        """Append a trial.
+
+        Args:
+            stage (str): Name of the stage, e.g. `optimize`.
+            epoch (int): Epoch of the trial.
+            result (float): Raw result.
+            kind (str, optional): `trial`, `baseline`, or the fidelity of a trial below the target one. Defaults to 'trial'.
+            drift (float, optional): Ratio of baseline to the starting one. Defaults to 1.0.
+            normalized (float, optional): Result normalized to the starting baseline. Defaults to `result / drift`.
+            config (Mapping[str, Any], optional): Configuration of the trial. Defaults to None.
+        """
+        if normalized is None:
+            normalized = result / drift
+        config = '' if config is None else ' '.join(
+            f'{key}={val}' for key, val in config.items())
+
+        with self.lock:
+            new = not os.path.exists(self.path)
+            with open(self.path, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                if new:
+                    writer.writerow(FIELDS)
+                writer.writerow(
+                    [stage, epoch, kind, result, drift, normalized, config])
+
+    def load(self) -> pd.DataFrame:
+        """Load all trials, empty if none is recorded."""
+        if not os.path.exists(self.path):
+            return pd.DataFrame(columns=FIELDS)
+        return pd.read_csv(self.path, keep_default_na=False)
+
+
+class DriftTracker:
+
+    def __init__(self,
+                 reference: float,
+                 smoothing=0.5,
+                 tolerance=0.02,
+                 logger=None) -> None:
+        """An online model of baseline drift.
+
+        The level of baseline is an exponentially weighted mean of its
+        re-measurements, and a trial is normalized by the ratio of that level
+        to `reference` at the time it runs.
+
+        Args:
+            reference (float): Baseline measured before optimization.
+            smoothing (float, optional): Weight of the newest re-measurement. Defaults to 0.5.
+            tolerance (float, optional): Relative drift reported as a warning. Defaults to 0.02.
+            logger (optional): Logger. Defaults to `yatuner` logger.
+        """
+        self.reference = reference
+        self.level = reference
+        self.smoothing = smoothing
+        self.tolerance = tolerance
+        self.logger = logger if logger is not None else logging.getLogger(
+            'yatuner')
+
+    @property
+    def drift(self) -> float:
+        """Ratio of current baseline to the reference."""
+        return self.level / self.reference
+
+    def update(self, value: float) -> float:
+        """Feed a re-measurement of baseline.
+
+        Args:
+            value (float): Result of baseline.
+
+        Returns:
+            float: Drift after the update.
+        """
+        self.level += self.smoothing * (value - self.level)
+        if abs(self.drift - 1) > self.tolerance:
+            self.logger.warning(f"[red]baseline drifted by "
+                                f"{(self.drift - 1) * 100:+.1f}%[/]")
+        else:
+            self.logger.debug(f"baseline drift "
+                              f"{(self.drift - 1) * 100:+.1f}%")
+        return self.drift
+
+    def normalize(self, value: float) -> float:
+        """Normalize a result to the reference baseline."""
+        return value / self.drift
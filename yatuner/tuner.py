@@ -10,10 +10,10 @@
 # MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
 # See the Mulan PSL v2 for more details.
 
-from math import inf, log10
+from math import ceil, inf, log10
 import os
 from subprocess import TimeoutExpired
-from typing import Callable, Dict, Mapping, Sequence, Tuple, Any
+from typing import Callable, Dict, List, Mapping, Sequence, Tuple, Any
 
 import seaborn as sns
 import pandas as pd
@@ -21,9 +21,20 @@ import numpy as np
 
 import yatuner
 import logging
+import threading
 import GPyOpt
 
 from yatuner import LinUCB
+from yatuner import compare
+from yatuner import screening
+from yatuner.hyperband import hyperband
+from yatuner.racing import race
+from yatuner.cache import ArtifactCache
+from yatuner.parallel import BuildPool, fetch_cpus, pinned
+from yatuner.runner import ConcurrentRunner, InterleavedRunner
+from yatuner.sequential import (SPRT, TwoSidedSPRT, plan_samples, steady_state,
+                                straddles)
+from yatuner.trials import DriftTracker, TrialStore
 from rich.logging import RichHandler
 from rich.table import Table
 from rich.console import Console
@@ -44,12 +55,22 @@ class Tuner:
                  workspace='yatuner.db',
                  log_level=logging.DEBUG,
                  norm_range=None,
-                 deterministic=False) -> None:
+                 deterministic=False,
+                 num_workers=1,
+                 build_root=None,
+                 measure_core=None,
+                 cache: ArtifactCache = None,
+                 executable: str = None,
+                 in_memory=False,
+                 pipeline=False,
+                 concurrent_cores: Sequence[int] = None,
+                 call_running_batch: Callable = None,
+                 interleave=0) -> None:
         """A tuner.
 
         Args:
             call_compile ((Sequence[str], Mapping, str) -> None): A function runing compilation process.
-            call_running (() -> float): A function fetching result of target program.
+            call_running (() -> float): A function fetching result of target program, may be None if `call_running_batch` is given.
             optimizers (Sequence[str]): List of on/of options.
             parameters (Mapping[str, Tuple]): List of parameters, in format of `param: (min, max, default)`
             call_perf (() -> Dict[str, Any], optional): Fectch feature of given program, used in linUCB. Defaults to None.
@@ -57,6 +78,16 @@ class Tuner:
             log_level (optional): Log level. Defaults to logging.DEBUG.
             norm_range (float, optional): Cut the data of test run to get more accurate result, None if doing a symmetrization. Defaults to None.
             deterministic (bool): False if the result of `call_compile` is random to a certain extent, otherwise True. Defaults to False.
+            num_workers (int, optional): Concurrent compilations, if larger than 1 every build gets its own directory and `call_compile`, `call_running` and `call_perf` receive it as keyword `build_dir`. Defaults to 1.
+            build_root (str, optional): Directory holding build directories in parallel mode. Defaults to `<workspace>/builds`.
+            measure_core (int, optional): Cpu to pin measurement to, compilations avoid it. Defaults to None.
+            cache (ArtifactCache, optional): Cache of compiled artifacts, `call_compile` is skipped on hit. Defaults to None.
+            executable (str, optional): Path to the produced program (relative to `build_dir` in parallel mode), if given, configurations producing an identical program reuse earlier samples. Defaults to None.
+            in_memory (bool, optional): Keep build directories on tmpfs, implies build directories as in parallel mode. Falls back to `build_root` if tmpfs is not available. Defaults to False.
+            pipeline (bool, optional): Compile following configurations while measuring the current one, implies build directories as in parallel mode. Defaults to False.
+            concurrent_cores (Sequence[int], optional): Cpus to measure candidates on at once during hypothesis tests and final run, see `yatuner.runner.fetch_physical_cores`. Implies build directories as in parallel mode, falls back to serial runs on interference. Defaults to None.
+            call_running_batch ((int) -> Sequence[float], optional): A function fetching given number of results of target program in one call, used instead of `call_running` for sampling. Defaults to None.
+            interleave (int, optional): Candidates kept built at once and measured with a baseline in randomized round-robin during hypothesis tests, optimization and final run, significance is then computed on differences paired by round. Implies build directories as in parallel mode, 0 measures candidates one after another. Defaults to 0.
         """
 
         logging.basicConfig(format='[ %(name)s ] %(message)s',
@@ -68,8 +99,13 @@ class Tuner:
         self.logger = logging.getLogger('yatuner')
         self.logger.setLevel(log_level)
 
+        if call_running is None and call_running_batch is None:
+            raise ValueError("either call_running or call_running_batch "
+                             "must be given")
+
         self.call_compile = call_compile
         self.call_running = call_running
+        self.call_running_batch = call_running_batch
         self.call_perf = call_perf
         self.optimizers = optimizers
         self.parameters = parameters
@@ -81,19 +117,547 @@ class Tuner:
             self.symmetrization = False
             self.norm_range = norm_range
         self.deterministic = deterministic
+        self.measure_core = measure_core
+        self.measure_lock = threading.Lock()
+
+        if concurrent_cores:
+            unavailable = set(concurrent_cores).difference(fetch_cpus())
+            if unavailable:
+                raise ValueError(f"concurrent_cores {sorted(unavailable)} "
+                                 f"are not available, only {fetch_cpus()}")
+
+        if in_memory:
+            memory_dir = yatuner.utils.make_memory_dir()
+            if memory_dir is not None:
+                build_root = memory_dir
+            else:
+                self.logger.warning("tmpfs is not available, "
+                                    "building on disk instead.")
+
+        if (num_workers > 1 or in_memory or concurrent_cores or interleave
+                or pipeline):
+            if build_root is None:
+                build_root = self.workspace + '/builds'
+            self.pool = BuildPool(self._call_compile, build_root, num_workers,
+                                  measure_core, pipeline)
+        else:
+            self.pool = None
+
+        self.cache = cache
+        if cache is not None:
+            if cache.root is None:
+                cache.root = self.workspace + '/cache'
+            if self.pool is None and not cache.artifacts:
+                raise ValueError("artifacts of cache must be given "
+                                 "when build directories are not used")
+
+        if concurrent_cores:
+            call_running = self.call_running
+            if call_running is None:
+                call_running = lambda build_dir: self.call_running_batch(
+                    1, build_dir=build_dir)[0]
+            self.runner = ConcurrentRunner(call_running,
+                                           concurrent_cores,
+                                           call_perf=self.call_perf,
+                                           logger=self.logger)
+        else:
+            self.runner = None
+
+        self.interleave = interleave
+        if interleave:
+            self.interleaver = InterleavedRunner(self._run)
+        else:
+            self.interleaver = None
+        self.baseline = None
+        self.fidelity = None
+
+        self.executable = executable
+        self.measurements: Dict[str, np.ndarray] = {}
+        self.trials = TrialStore(self.workspace + '/trials.csv')
+        self.breakpoints: Dict[str, List[int]] = {}
 
     def initialize(self):
         if not os.path.isdir(self.workspace):
             self.logger.info("workspace is not detected, creating one.")
             os.mkdir(self.workspace)
 
-    def test_run(self, num_samples=200, warmup=50):
+        if self.pool is not None:
+            os.makedirs(self.pool.build_root, exist_ok=True)
+
+    def _call_compile(self,
+                      optimizers,
+                      parameters,
+                      additional,
+                      build_dir=None) -> None:
+        """Call `call_compile` unless artifacts are found in cache."""
+        kwargs = {} if build_dir is None else {'build_dir': build_dir}
+        if self.fidelity is not None:
+            kwargs['fidelity'] = self.fidelity
+
+        if self.cache is None:
+            self.call_compile(optimizers, parameters, additional, **kwargs)
+            return
+
+        extra = '' if self.fidelity is None else f'fidelity={self.fidelity}'
+        key = self.cache.key(optimizers, parameters, additional, extra)
+        if self.cache.fetch(key, build_dir):
+            self.logger.debug(f"cache hit {key[:12]}")
+            return
+
+        self.call_compile(optimizers, parameters, additional, **kwargs)
+        self.cache.store(key, build_dir)
+
+    def _compile(self, optimizers, parameters, additional, build_dir=None):
+        """Compile with `call_compile`, returning the build directory used."""
+        if self.pool is None:
+            self._call_compile(optimizers, parameters, additional)
+            return None
+
+        if build_dir is None:
+            build_dir = self.pool.main_dir
+        err = self.pool.compile([(optimizers, parameters, additional)],
+                                [build_dir])[0]
+        if err is not None:
+            raise err
+
+        return build_dir
+
+    def _compile_all(self, configs):
+        """Compile configurations one after another, or concurrently in parallel mode.
+
+        Yields:
+            Tuple[str, Exception]: Build directory and compile error (None if succeeded).
+        """
+        if self.pool is not None:
+            yield from self.pool.imap(configs)
+            return
+
+        for optimizers, parameters, additional in configs:
+            try:
+                self._call_compile(optimizers, parameters, additional)
+            except (RuntimeError, TimeoutExpired) as err:
+                yield None, err
+                continue
+            yield None, None
+
+    def _run(self, build_dir=None) -> float:
+        """Run `call_running` serialized and pinned to `measure_core`."""
+        if self.call_running is None:
+            return self._run_batch(1, build_dir)[0]
+
+        kwargs = {} if self.fidelity is None else {'fidelity': self.fidelity}
+        with self.measure_lock, pinned(self.measure_core):
+            if self.pool is None:
+                return self.call_running(**kwargs)
+            if build_dir is None:
+                build_dir = self.pool.main_dir
+            return self.call_running(build_dir=build_dir, **kwargs)
+
+    def _run_batch(self, num_runs, build_dir=None) -> np.ndarray:
+        """Run `call_running_batch` serialized and pinned to `measure_core`."""
+        kwargs = {} if self.fidelity is None else {'fidelity': self.fidelity}
+        with self.measure_lock, pinned(self.measure_core):
+            if self.pool is None:
+                samples = self.call_running_batch(num_runs, **kwargs)
+            else:
+                if build_dir is None:
+                    build_dir = self.pool.main_dir
+                samples = self.call_running_batch(num_runs,
+                                                  build_dir=build_dir,
+                                                  **kwargs)
+
+        samples = np.asarray(samples, dtype=float)
+        if len(samples) != num_runs:
+            raise RuntimeError(f"call_running_batch returned {len(samples)} "
+                               f"samples, {num_runs} expected")
+        return samples
+
+    def _fingerprint(self, build_dir=None) -> str:
+        """Fingerprint of the program in `build_dir`, None if unknown."""
+        if self.executable is None:
+            return None
+        if self.pool is not None:
+            if build_dir is None:
+                build_dir = self.pool.main_dir
+            return yatuner.utils.fetch_fingerprint(
+                os.path.join(build_dir, self.executable))
+        return yatuner.utils.fetch_fingerprint(self.executable)
+
+    def _sample(self,
+                num_samples,
+                build_dir=None,
+                description=None,
+                samples=None) -> np.ndarray:
+        """Take `num_samples` results of the program in `build_dir`.
+
+        Samples of an identical program are reused, only the missing ones
+        are taken. Without `executable`, samples already taken by the caller
+        can be passed as `samples` to be extended.
+        """
+        fingerprint = self._fingerprint(build_dir)
+        if fingerprint is not None or samples is None:
+            samples = self.measurements.get(fingerprint, np.zeros(0))
+
+        if len(samples) >= num_samples:
+            if fingerprint is not None:
+                self.logger.debug(f"reusing samples of {fingerprint[:12]}")
+            return samples[:num_samples]
+
+        if self.call_running_batch is not None:
+            if description is not None:
+                self.logger.debug(f"{description.strip()}: "
+                                  f"{num_samples - len(samples)} samples")
+            new_samples = self._run_batch(num_samples - len(samples),
+                                          build_dir)
+        else:
+            todo = range(num_samples - len(samples))
+            if description is not None:
+                todo = track(todo, description=description)
+            new_samples = [self._run(build_dir) for _ in todo]
+        samples = np.concatenate([samples, new_samples])
+
+        if fingerprint is not None:
+            self.measurements[fingerprint] = samples
+
+        return samples
+
+    def _sample_concurrently(self, build_dirs,
+                             num_samples) -> List[np.ndarray]:
+        """Take `num_samples` results of programs in `build_dirs` at once."""
+        fingerprints = [self._fingerprint(x) for x in build_dirs]
+        results = [None] * len(build_dirs)
+        todo = {}
+        for idx, fingerprint in enumerate(fingerprints):
+            samples = self.measurements.get(fingerprint, np.zeros(0))
+            if len(samples) >= num_samples:
+                self.logger.debug(f"reusing samples of {fingerprint[:12]}")
+                results[idx] = samples[:num_samples]
+            elif fingerprint is None:
+                todo[idx] = [idx]
+            else:
+                # identical programs in a batch are measured once
+                todo.setdefault(fingerprint, []).append(idx)
+
+        groups = list(todo.values())
+        with self.measure_lock:
+            measured = self.runner.measure(
+                [build_dirs[group[0]] for group in groups], num_samples)
+
+        for group, samples in zip(groups, measured):
+            fingerprint = fingerprints[group[0]]
+            if fingerprint is not None:
+                self.measurements[fingerprint] = np.concatenate(
+                    [self.measurements.get(fingerprint, np.zeros(0)), samples])
+            for idx in group:
+                results[idx] = samples
+
+        return results
+
+    def _evaluate_all(self,
+                      configs,
+                      num_samples,
+                      descriptions=None,
+                      stop=None,
+                      step=2):
+        """Compile and measure configurations, concurrently if `concurrent_cores` is given.
+
+        With `stop`, each configuration is sampled `step` at a time until
+        `stop(index, samples)` is True or `num_samples` are taken, which is
+        always done one configuration after another.
+
+        Yields:
+            Tuple[np.ndarray, Exception]: Samples and compile or runtime error (None if succeeded).
+        """
+        configs = list(configs)
+        if descriptions is None:
+            descriptions = [None] * len(configs)
+
+        if self.runner is None or self.runner.serial or stop is not None:
+            for idx, (description, (build_dir, err)) in enumerate(
+                    zip(descriptions, self._compile_all(configs))):
+                if err is not None:
+                    yield None, err
+                    continue
+                try:
+                    if stop is None:
+                        samples = self._sample(num_samples, build_dir,
+                                               description)
+                    else:
+                        samples = self._sample(min(step, num_samples),
+                                               build_dir, description)
+                        while (len(samples) < num_samples
+                               and not stop(idx, samples)):
+                            more = min(len(samples) + step, num_samples)
+                            samples = self._sample(more,
+                                                   build_dir,
+                                                   samples=samples)
+                except RuntimeError as err:
+                    yield None, err
+                    continue
+                yield samples, None
+            return
+
+        size = len(self.runner.cores)
+        for begin in range(0, len(configs), size):
+            chunk = configs[begin:begin + size]
+            build_dirs = [
+                os.path.join(self.pool.build_root, f'run-{k}')
+                for k in range(len(chunk))
+            ]
+            errors = self.pool.compile(chunk, build_dirs)
+            built = [k for k, err in enumerate(errors) if err is None]
+
+            results = [(None, err) for err in errors]
+            try:
+                measured = self._sample_concurrently(
+                    [build_dirs[k] for k in built], num_samples)
+                for k, samples in zip(built, measured):
+                    results[k] = (samples, None)
+            except RuntimeError:
+                # find out which one fails
+                for k in built:
+                    try:
+                        results[k] = (self._sample(num_samples,
+                                                   build_dirs[k]), None)
+                    except RuntimeError as err:
+                        results[k] = (None, err)
+
+            yield from results
+
+    def _compile_baseline(self, baseline) -> str:
+        """Compile `baseline` into its own build directory, returning it.
+
+        The directory is kept while `baseline` is unchanged. Without build
+        directories it is compiled in place every time.
+        """
+        if self.pool is None:
+            return self._compile(*baseline)
+
+        build_dir = os.path.join(self.pool.build_root, 'baseline')
+        if self.baseline != baseline:
+            self.baseline = None
+            self._compile(*baseline, build_dir=build_dir)
+            self.baseline = baseline
+        return build_dir
+
+    def _sample_fresh(self, num_samples, build_dir=None) -> np.ndarray:
+        """Take `num_samples` new results, never reusing earlier ones."""
+        if self.call_running_batch is not None:
+            return self._run_batch(num_samples, build_dir)
+        return np.array([self._run(build_dir) for _ in range(num_samples)])
+
+    def _evaluate_paired(self,
+                         configs,
+                         baseline,
+                         num_samples,
+                         descriptions=None):
+        """Compile and measure configurations interleaved with `baseline`.
+
+        `interleave` configurations at a time are built in their own
+        directories and run together with the baseline in randomized
+        round-robin, so samples of one round can be paired.
+
+        Yields:
+            Tuple[np.ndarray, np.ndarray, Exception]: Samples, samples of baseline from the same rounds (empty without baseline) and compile or runtime error (None if succeeded).
+        """
+        configs = list(configs)
+        if descriptions is None:
+            descriptions = [None] * len(configs)
+
+        baseline_dir = None
+        if baseline is not None:
+            baseline_dir = self._compile_baseline(baseline)
+
+        size = self.interleave
+        for begin in range(0, len(configs), size):
+            chunk = configs[begin:begin + size]
+            build_dirs = [
+                os.path.join(self.pool.build_root, f'run-{k}')
+                for k in range(len(chunk))
+            ]
+            errors = self.pool.compile(chunk, build_dirs)
+            built = [k for k, err in enumerate(errors) if err is None]
+
+            names = [x.strip() for x in descriptions[begin:begin + size] if x]
+            if names:
+                self.logger.debug(f"interleaving {', '.join(names)}")
+
+            results = [(None, None, err) for err in errors]
+            try:
+                base, measured = self.interleaver.measure(
+                    [build_dirs[k] for k in built], num_samples, baseline_dir)
+                for k, samples in zip(built, measured):
+                    results[k] = (samples, base, None)
+            except RuntimeError:
+                # find out which one fails
+                for k in built:
+                    try:
+                        base, (samples, ) = self.interleaver.measure(
+                            [build_dirs[k]], num_samples, baseline_dir)
+                        results[k] = (samples, base, None)
+                    except RuntimeError as err:
+                        results[k] = (None, None, err)
+
+            yield from results
+
+    def _optimize_batch(self,
+                        step,
+                        bounds,
+                        num_epochs,
+                        batch_size,
+                        evaluator='thompson_sampling',
+                        initial_design_numdata=5,
+                        **kwargs) -> Tuple[np.ndarray, ...]:
+        """Bayesian optimization proposing `batch_size` points at a time.
+
+        A batch is passed to `step` as a whole, so it is compiled by the
+        build pool (and measured on `concurrent_cores`) at once, and the
+        model is updated with all results before the next batch. Keyword
+        arguments go to `GPyOpt.methods.BayesianOptimization`.
+
+        Returns:
+            Tuple[np.ndarray, ...]: All points, their results, the best point and its result.
+        """
+
+        def suggest(X, Y, evaluator):
+            return GPyOpt.methods.BayesianOptimization(
+                None,
+                domain=bounds,
+                X=X,
+                Y=Y,
+                evaluator_type=evaluator,
+                batch_size=batch_size,
+                de_duplication=True,
+                **kwargs).suggest_next_locations()
+
+        space = GPyOpt.Design_space(bounds)
+        X = GPyOpt.experiment_design.initial_design('random', space,
+                                                    initial_design_numdata)
+        Y = step(X)
+        for _ in range(ceil(num_epochs / batch_size)):
+            try:
+                try:
+                    new = suggest(X, Y, evaluator)
+                except TypeError:
+                    # local penalization of GPyOpt breaks with recent SciPy
+                    if evaluator != 'local_penalization':
+                        raise
+                    self.logger.warning("[red]local_penalization failed, "
+                                        "using thompson_sampling instead[/]")
+                    evaluator = 'thompson_sampling'
+                    new = suggest(X, Y, evaluator)
+            except GPyOpt.core.errors.FullyExploredOptimizationDomainError:
+                self.logger.info("search space is fully explored")
+                break
+            X = np.vstack([X, new])
+            Y = np.vstack([Y, step(new)])
+
+        best = np.argmin(Y[:, 0])
+        return X, Y, X[best], Y[best, 0]
+
+    def _fingerprint_all(self, configs) -> List[str]:
+        """Compile configurations and fetch fingerprints, None if failed."""
+        fingerprints = []
+        for build_dir, err in self._compile_all(configs):
+            fingerprints.append(
+                self._fingerprint(build_dir) if err is None else None)
+        return fingerprints
+
+    def _load_breakpoints(self) -> None:
+        if os.path.exists(self.workspace + '/breakpoints.txt'):
+            self.breakpoints = {}
+            with open(self.workspace + '/breakpoints.txt',
+                      'r',
+                      encoding='utf-8') as file:
+                for line in file.readlines():
+                    parameter, *vals = line.split()
+                    self.breakpoints[parameter] = [int(x) for x in vals]
+
+            self.logger.info(
+                f"loaded breakpoints of {len(self.breakpoints)} parameters")
+
+    def _decode_parameter(self, parameter, val) -> int:
+        """Map a value in search space to the value of `parameter`."""
+        if parameter in self.breakpoints:
+            return self.breakpoints[parameter][int(val)]
+        r_min, r_max, _ = self.parameters[parameter]
+        return int(round(val * (r_max - r_min) + r_min))
+
+    def _perf(self, build_dir=None) -> Dict[str, Any]:
+        with self.measure_lock, pinned(self.measure_core):
+            if self.pool is None:
+                return self.call_perf()
+            if build_dir is None:
+                build_dir = self.pool.main_dir
+            return self.call_perf(build_dir=build_dir)
+
+    def _plan_samples(self,
+                      num_samples,
+                      min_effect,
+                      alpha=0.05,
+                      two_sample=False) -> int:
+        """Resolve `num_samples` of 'auto' with the noise of test run.
+
+        Args:
+            num_samples (int | str): Samples, or 'auto' to plan them.
+            min_effect (float): Relative change of result worth detecting.
+            alpha (float, optional): Significance level. Defaults to 0.05.
+            two_sample (bool, optional): Compare two groups of samples instead of one against test run. Defaults to False.
+
+        Returns:
+            int: Samples for each configuration.
+        """
+        if num_samples != 'auto':
+            return num_samples
+        if self.deterministic:
+            return 1
+        if getattr(self, 'std', None) is None:
+            raise ValueError("num_samples of 'auto' needs test run first")
+
+        num_samples = plan_samples(self.std,
+                                   self.u * min_effect,
+                                   alpha,
+                                   two_sample=two_sample)
+        self.logger.info(f"planned {num_samples} samples for "
+                         f"{min_effect * 100:.1f}% effect "
+                         f"at std {self.std:.2f}")
+        return num_samples
+
+    def _detect_warmup(self, build_dir, window=10, max_warmup=500) -> int:
+        """Run until the latest `2 * window` results are steady.
+
+        Returns:
+            int: Runs taken before steady state.
+        """
+        history = []
+        while len(history) < max_warmup:
+            if self.call_running_batch is not None:
+                history.extend(self._run_batch(window, build_dir))
+            else:
+                history.extend(self._run(build_dir) for _ in range(window))
+
+            if (len(history) >= 2 * window
+                    and steady_state(history[-2 * window:])):
+                self.logger.info(f"steady after {len(history)} runs")
+                return len(history)
+
+        self.logger.warning(f"[red]not steady after {len(history)} "
+                            f"runs of warmup[/]")
+        return len(history)
+
+    def test_run(self, num_samples=200, warmup=50, max_warmup=500):
         """Doing a test run with no options indicated.
 
         Args:
             num_samples (int, optional): Times to run. Defaults to 200.
-            warmup (int, optional): Times to warmup. Defaults to 50.
+            warmup (int | str, optional): Times to warmup, or 'auto' to run until results are steady. The detected length is stored in `warmup.txt` of workspace and reused. Defaults to 50.
+            max_warmup (int, optional): Most times to warmup in 'auto' mode. Defaults to 500.
         """
+        if warmup == 'auto' and os.path.exists(self.workspace + '/warmup.txt'):
+            with open(self.workspace + '/warmup.txt', 'r',
+                      encoding='utf-8') as file:
+                warmup = int(file.read())
+            self.logger.info(f"using existing warmup of {warmup} runs.")
 
         if self.deterministic and num_samples != 1:
             self.logger.warning(f"num_samples of {num_samples} "
@@ -105,25 +669,36 @@ class Tuner:
             pd_data = pd.read_csv(self.workspace + '/test_run.csv')
             self.exec_data = pd_data.to_numpy().transpose()[0].tolist()
 
-        else:
-            self.call_compile(None, None, None)
-            self.exec_data = []
+            if self.executable is not None:
+                build_dir = self._compile(None, None, None)
+                self.measurements[self._fingerprint(build_dir)] = np.array(
+                    self.exec_data)
 
-            if self.deterministic:
-                res = self.call_running()
-                self.exec_data.append(res)
-            else:
+        else:
+            build_dir = self._compile(None, None, None)
+
+            if not self.deterministic and warmup == 'auto':
+                warmup = self._detect_warmup(build_dir, max_warmup=max_warmup)
+                with open(self.workspace + '/warmup.txt',
+                          'w',
+                          encoding='utf-8') as file:
+                    file.write(f'{warmup}\n')
+            elif not self.deterministic and self.call_running_batch is not None:
+                self._run_batch(warmup, build_dir)
+            elif not self.deterministic:
                 for i in track(range(warmup), description='  warmup'):
-                    res = self.call_running()
+                    res = self._run(build_dir)
                     self.logger.debug(f"warmup {i}/{warmup} result: {res}")
 
-                for _ in track(range(num_samples), description='test run'):
-                    res = self.call_running()
-                    self.exec_data.append(res)
+            self.exec_data = self._sample(num_samples, build_dir,
+                                          'test run').tolist()
 
             pd_data = pd.DataFrame({'test_run': self.exec_data})
             pd_data.to_csv(self.workspace + '/test_run.csv', index=0)
 
+        # kept apart from symmetrization for nonparametric tests
+        self.test_samples = np.array(self.exec_data)
+
         if not self.deterministic:
             if self.symmetrization:
                 self.exec_data.sort()
@@ -162,126 +737,259 @@ class Tuner:
             self.logger.info(
                 f"teste run finished with res: {self.exec_data[0]:.2f}")
 
+    def _select_nonparametric(self,
+                              names,
+                              samples,
+                              baseline,
+                              q,
+                              selected,
+                              faster=False) -> None:
+        """Compare all sample sets with baseline at once by `yatuner.compare`.
+
+        Args:
+            names (Sequence[str]): Names of sample sets.
+            samples (Sequence[np.ndarray]): Sample sets.
+            baseline: One sample set shared by all, or one for each.
+            q (float): False discovery rate.
+            selected (List[str]): Names of different sets are appended to it.
+            faster (bool, optional): Only select sets faster than baseline. Defaults to False.
+        """
+        res = compare.compare(samples, baseline, q)
+        for i, name in enumerate(names):
+            self.logger.debug(f"{i}/{len(names)} {name} "
+                              f"effect: {res['effect'][i] * 100:+.2f}% "
+                              f"[{res['low'][i] * 100:+.2f}%, "
+                              f"{res['high'][i] * 100:+.2f}%], "
+                              f"p: {res['pvalue'][i]:.2f}, "
+                              f"n: {len(samples[i])}")
+            if res['rejected'][i] and (not faster or res['effect'][i] < 0):
+                selected.append(name)
+                self.logger.info(f"[green]{name} is selected[/]")
+
+    def _screen_optimizers(self, num_samples, q) -> List[float]:
+        """Select optimizers with a Plackett-Burman design.
+
+        Each build turns on half of the optimizers, so about one build per
+        optimizer estimates main effects of all of them. Optimizers with a
+        significant speedup under false discovery rate `q` are selected.
+        Builds failing to compile are left out of the regression.
+
+        Returns:
+            List[float]: All samples taken.
+        """
+        design = screening.plackett_burman(len(self.optimizers))
+        configs = [([
+            optimizer for optimizer, level in zip(self.optimizers, row)
+            if level > 0
+        ], None, None) for row in design]
+        self.logger.info(f"screening {len(self.optimizers)} optimizers "
+                         f"with {len(design)} builds")
+
+        samples = []
+        results = self._evaluate_all(configs, num_samples)
+        for k, (res, err) in enumerate(results):
+            if err is not None:
+                self.logger.warning(f"[red]build {k} of design failed, "
+                                    f"left out[/]")
+                self.logger.debug(err)
+            samples.append(res)
+
+        effects = screening.estimate_effects(design, samples)
+        if self.deterministic:
+            selected = effects['effect'] < 0
+        else:
+            faster = effects['effect'] < 0
+            selected = compare.fdr(effects['pvalue'], q) & faster
+
+        for i, optimizer in enumerate(self.optimizers):
+            if np.isnan(effects['effect'][i]):
+                self.logger.warning(f"[red]{optimizer} is not estimable, "
+                                    f"builds with it failed[/]")
+                continue
+            self.logger.debug(
+                f"{i}/{len(self.optimizers)} {optimizer} "
+                f"effect: {effects['effect'][i]:+.2f} "
+                f"({effects['effect'][i] / self.u * 100:+.2f}%), "
+                f"p: {effects['pvalue'][i]:.2f}")
+            if selected[i]:
+                self.selected_optimizers.append(optimizer)
+                self.logger.info(f"[green]{optimizer} is selected[/]")
+
+        return [x for res in samples if res is not None for x in res]
+
     def hypotest_optimizers(self,
                             num_samples=10,
                             z_threshold=0.05,
                             t_threshold=0.05,
-                            num_epochs=30):
+                            num_epochs=30,
+                            sequential=False,
+                            min_effect=0.01,
+                            beta=0.2,
+                            method='parametric',
+                            design='one-at-a-time',
+                            batch_size=1,
+                            evaluator='thompson_sampling'):
         """Hypothesis test for on/of options.
 
         Args:
-            num_samples (int, optional): Sampling times for each option. Defaults to 10.
+            num_samples (int | str, optional): Sampling times for each option, or 'auto' to plan them from test run for `min_effect` and take more only while the confidence interval of an option contains test run mean. Defaults to 10.
             z_threshold (float, optional): Z threshold. Defaults to 0.05.
             t_threshold (float, optional): T threshold. Defaults to 0.05.
             num_epochs (int, optional): optimization epoches after selection. Defaults to 30.
+            sequential (bool, optional): Stop sampling an option once a SPRT of a `min_effect` speedup decides, `num_samples` becomes the cap. Undecided options fall back to z and t tests. Defaults to False.
+            min_effect (float, optional): Relative speedup worth detecting in sequential or 'auto' mode. Defaults to 0.01.
+            beta (float, optional): Probability of missing a `min_effect` speedup in sequential mode, `z_threshold` is taken as the other error. Defaults to 0.2.
+            method (str, optional): 'parametric' for z and t tests, or 'nonparametric' to decide all options at once by Mann-Whitney U tests against raw test run under false discovery rate `z_threshold`. Defaults to 'parametric'.
+            design (str, optional): 'one-at-a-time' builds each option alone, 'plackett-burman' toggles many options in each build and estimates their main effects by regression, see `_screen_optimizers`, with a fixed `num_samples` and parametric method only. Defaults to 'one-at-a-time'.
+            batch_size (int, optional): Points proposed at a time and compiled concurrently in optimization after selection, usually `num_workers`, and `num_epochs` still counts points. Defaults to 1.
+            evaluator (str, optional): GPyOpt evaluator of batches, 'thompson_sampling' or 'local_penalization'. Defaults to 'thompson_sampling'.
         """
+        if design == 'plackett-burman' and (sequential
+                                            or method != 'parametric'
+                                            or num_samples == 'auto'):
+            raise ValueError("plackett-burman design takes neither "
+                             "sequential, nonparametric nor 'auto' sampling")
+
+        if os.path.exists(self.workspace + '/selected_optimizers.txt'):
+            self.logger.info("using existing selected optimizers.")
+            return
+
+        adaptive = num_samples == 'auto'
+        num_samples = self._plan_samples(num_samples, min_effect, z_threshold)
 
         if self.deterministic and num_samples != 1:
             self.logger.warning(f"num_samples of {num_samples} "
                                 f"is not necessary for deterministic goal.")
             num_samples = 1
 
-        if os.path.exists(self.workspace + '/selected_optimizers.txt'):
-            self.logger.info("using existing selected optimizers.")
-            return
-
         self.selected_optimizers = []
 
         hypotest_exec_data = []
 
-        for i, optimizer in enumerate(self.optimizers):
-            try:
-                self.call_compile([optimizer], None, None)
-            except RuntimeError as err:
-                self.logger.error(f"[red]compile error with {optimizer}[/]")
-                self.logger.exception(err)
-                continue
-
-            samples = np.zeros(num_samples)
-            err = False
-            if self.deterministic:
-                try:
-                    res = self.call_running()
-                except RuntimeError as err:
-                    self.logger.error(f"[red]runtime error for {optimizer}[/]")
-                    self.logger.exception(err)
-                    err = True
-                    break
-
-                samples[0] = res
-                hypotest_exec_data.append(res)
-
-            else:
-                for j in range(num_samples):
-                    try:
-                        res = self.call_running()
-                    except RuntimeError as err:
-                        self.logger.error(
-                            f"[red]runtime error for {optimizer}[/]")
-                        self.logger.exception(err)
-                        err = True
-                        break
-
-                    samples[j] = res
-                    hypotest_exec_data.append(res)
-
-            if err:
-                continue
-
-            if not self.deterministic:
-                samples_mean = samples.mean()
-                z = (samples_mean - self.u) / (self.std /
-                                               np.sqrt(len(samples)))
-                p = 2 * stats.norm.sf(abs(z))
-                t = stats.ttest_1samp(samples, self.u).pvalue
-
-                self.logger.debug(f"{i}/{len(self.optimizers)} {optimizer} "
-                                  f"u: {self.u:.2f} -> {samples_mean:.2f}, "
-                                  f"p: {p:.2f}, t: {t:.2f}")
-
-                if (p < z_threshold or t < t_threshold) and z < 0:
-                    self.selected_optimizers.append(optimizer)
-                    self.logger.info(f"[green]{optimizer} is selected[/]")
+        if design == 'plackett-burman':
+            hypotest_exec_data = self._screen_optimizers(
+                num_samples, z_threshold)
+        else:
+            test = None
+            stop = None
+            if sequential and not self.deterministic:
+                test = SPRT(self.u, self.u * (1 - min_effect), self.std,
+                            z_threshold, beta)
+                stop = lambda _, samples: test.decide(samples) is not None
+            elif adaptive and not self.deterministic:
+                stop = lambda _, samples: not straddles(
+                    samples, self.u, self.std, z_threshold)
+
+            configs = [([optimizer], None, None)
+                       for optimizer in self.optimizers]
+            paired = self.interleaver is not None and not self.deterministic
+            if paired:
+                if stop is not None:
+                    self.logger.warning("early stopping is not used "
+                                        "with interleaved measurement")
+                    test = None
+                results = self._evaluate_paired(configs, (None, None, None),
+                                                num_samples)
             else:
-                self.logger.debug(f"{i}/{len(self.optimizers)} {optimizer} "
-                                  f"res: {samples[0]:.2f}")
-                if samples[0] < self.u:
-                    self.selected_optimizers.append(optimizer)
-                    self.logger.info(f"[green]{optimizer} is selected[/]")
+                results = ((samples, None, err) for samples, err in
+                           self._evaluate_all(configs, num_samples, stop=stop))
+            nonparametric = method == 'nonparametric' and not self.deterministic
+            measured = []
+            for i, optimizer in enumerate(self.optimizers):
+                samples, base, err = next(results)
+                if err is not None:
+                    self.logger.error(f"[red]error with {optimizer}[/]")
+                    self.logger.exception(err, exc_info=err)
+                    continue
+
+                hypotest_exec_data.extend(samples)
+
+                if nonparametric:
+                    measured.append((optimizer, samples, base))
+                elif not self.deterministic:
+                    if paired:
+                        # drift cancels out in differences within a round
+                        diffs = samples - base
+                        samples_mean = self.u + diffs.mean()
+                        z = diffs.mean() / (np.std(diffs, ddof=1) /
+                                            np.sqrt(len(diffs)))
+                        t = stats.ttest_rel(samples, base).pvalue
+                    else:
+                        samples_mean = samples.mean()
+                        z = (samples_mean - self.u) / (self.std /
+                                                       np.sqrt(len(samples)))
+                        t = stats.ttest_1samp(samples, self.u).pvalue
+                    p = 2 * stats.norm.sf(abs(z))
+
+                    self.logger.debug(
+                        f"{i}/{len(self.optimizers)} {optimizer} "
+                        f"u: {self.u:.2f} -> {samples_mean:.2f}, "
+                        f"p: {p:.2f}, t: {t:.2f}, "
+                        f"n: {len(samples)}")
+
+                    decision = None
+                    if test is not None:
+                        decision = test.decide(samples)
+                    if decision is None:
+                        decision = (p < z_threshold
+                                    or t < t_threshold) and z < 0
+
+                    if decision:
+                        self.selected_optimizers.append(optimizer)
+                        self.logger.info(f"[green]{optimizer} is selected[/]")
+                else:
+                    self.logger.debug(
+                        f"{i}/{len(self.optimizers)} {optimizer} "
+                        f"res: {samples[0]:.2f}")
+                    if samples[0] < self.u:
+                        self.selected_optimizers.append(optimizer)
+                        self.logger.info(f"[green]{optimizer} is selected[/]")
+
+            if measured:
+                baseline = self.test_samples
+                if paired:
+                    baseline = [base for _, _, base in measured]
+                self._select_nonparametric(
+                    [optimizer for optimizer, _, _ in measured],
+                    [samples for _, samples, _ in measured],
+                    baseline,
+                    z_threshold,
+                    self.selected_optimizers,
+                    faster=True)
 
         self.logger.info(
             f"{len(self.selected_optimizers)} optimizers selected")
         self.logger.info(f"optimizing optimizers")
         cnt = 0
 
-        def step(vals) -> float:
+        def step(vals) -> np.ndarray:
 
             nonlocal cnt
 
-            step_optimizers = []
-            for i, opt in enumerate(self.selected_optimizers):
-                if (vals[0][i]):
-                    step_optimizers.append(opt)
-            try:
-                self.call_compile(step_optimizers, None, None)
-            except RuntimeError as err:
-                self.logger.error("[red]compile error[/]")
-                self.logger.exception(err)
-                return inf
-
-            res = 0
-            if self.deterministic:
-                res = self.call_running()
-            else:
-                for _ in track(range(num_samples), f'epoch {cnt:<5}'):
-                    res += self.call_running()
-                res /= num_samples
-
-            self.logger.debug(f'{cnt}/{num_epochs} result: {res:.2f}')
-
-            cnt += 1
-
-            return res
+            configs = []
+            for row in vals:
+                step_optimizers = []
+                for i, opt in enumerate(self.selected_optimizers):
+                    if (row[i]):
+                        step_optimizers.append(opt)
+                configs.append((step_optimizers, None, None))
+
+            descriptions = [f'epoch {cnt + k:<5}' for k in range(len(vals))]
+            results = self._evaluate_all(configs, num_samples, descriptions)
+            losses = []
+            for samples, err in results:
+                if err is not None:
+                    self.logger.error("[red]compile error[/]")
+                    self.logger.exception(err, exc_info=err)
+                    losses.append(inf)
+                    continue
+
+                res = samples.mean()
+                self.logger.debug(f'{cnt}/{num_epochs} result: {res:.2f}')
+                losses.append(res)
+                cnt += 1
+
+            return np.array(losses)[:, None]
 
         bounds = [{
             'name': opt,
@@ -289,18 +997,31 @@ class Tuner:
             'domain': (0, 1)
         } for opt in self.selected_optimizers]
 
-        method = GPyOpt.methods.BayesianOptimization(step,
-                                                     domain=bounds,
-                                                     acquisition_type='EI',
-                                                     acquisition_weight=2,
-                                                     initial_design_numdata=10)
-        method.run_optimization(max_iter=num_epochs, eps=0.0)
-        # method.plot_convergence(self.workspace + '/convergence.png')
-
-        self.logger.info(f"best result: {method.fx_opt.flatten()[0]}")
-        self.logger.info(f"best option: {method.x_opt}")
+        if batch_size > 1:
+            _, _, x_opt, fx_opt = self._optimize_batch(
+                step,
+                bounds,
+                num_epochs,
+                batch_size,
+                evaluator,
+                acquisition_type='EI',
+                acquisition_weight=2,
+                initial_design_numdata=10)
+        else:
+            method = GPyOpt.methods.BayesianOptimization(
+                step,
+                domain=bounds,
+                acquisition_type='EI',
+                acquisition_weight=2,
+                initial_design_numdata=10)
+            method.run_optimization(max_iter=num_epochs, eps=0.0)
+            # method.plot_convergence(self.workspace + '/convergence.png')
+            x_opt, fx_opt = method.x_opt, method.fx_opt.flatten()[0]
+
+        self.logger.info(f"best result: {fx_opt}")
+        self.logger.info(f"best option: {x_opt}")
         new_optimizers = []
-        for idx, x in enumerate(method.x_opt):
+        for idx, x in enumerate(x_opt):
             if x:
                 new_optimizers.append(self.selected_optimizers[idx])
         self.selected_optimizers = new_optimizers
@@ -332,22 +1053,87 @@ class Tuner:
             plt.savefig(self.workspace +
                         "/hypotest_optimizers_distribution.png")
 
-    def hypotest_parameters(self, num_samples=10, t_threshold=0.05):
+    def _test_groups(self, groups, num_samples, t_threshold) -> List[bool]:
+        """Tell if pushing each group of parameters from min to max matters.
+
+        A group failing to build is taken as mattering so that it is split
+        until the failing parameter is found and dropped.
+        """
+        configs = []
+        for group in groups:
+            for end in (0, 1):
+                configs.append((self.selected_optimizers, {
+                    parameter: self.parameters[parameter][end]
+                    for parameter in group
+                }, None))
+        results = self._evaluate_all(configs, num_samples)
+
+        decisions = []
+        for group in groups:
+            name = group[0] if len(group) == 1 else f"{len(group)} parameters"
+            samples_min, err = next(results)
+            samples_max, err_max = next(results)
+            err = err if err is not None else err_max
+            if err is not None:
+                self.logger.warning(f"[red]error with {name}[/]")
+                self.logger.debug(err)
+                decisions.append(len(group) > 1)
+                continue
+
+            if self.deterministic:
+                decision = samples_min[0] != samples_max[0]
+            else:
+                l = stats.levene(samples_min, samples_max).pvalue
+                p = stats.ttest_ind(samples_min,
+                                    samples_max,
+                                    equal_var=(l > 0.05)).pvalue
+                decision = p < t_threshold
+
+            verdict = 'dropped'
+            if decision:
+                verdict = 'split' if len(group) > 1 else 'selected'
+            self.logger.debug(f"{name} min: {np.mean(samples_min):.2f}, "
+                              f"max: {np.mean(samples_max):.2f}, {verdict}")
+            decisions.append(decision)
+
+        return decisions
+
+    def hypotest_parameters(self,
+                            num_samples=10,
+                            t_threshold=0.05,
+                            sequential=False,
+                            min_effect=0.01,
+                            beta=0.2,
+                            method='parametric',
+                            design='one-at-a-time',
+                            group_size=16):
         """Hypothesis test for parameters.
 
         Args:
-            num_samples (int, optional): Sampling times for each parameter. Defaults to 10.
+            num_samples (int | str, optional): Sampling times for each parameter, or 'auto' to plan them from test run for `min_effect` and take more of the max only while its confidence interval contains the mean of the min. Defaults to 10.
             t_threshold (float, optional): T threshold. Defaults to 0.05.
+            sequential (bool, optional): Stop sampling the max of a parameter once a two-sided SPRT against the mean of its min decides, `num_samples` becomes the cap. Undecided parameters fall back to t test. Defaults to False.
+            min_effect (float, optional): Relative difference worth detecting in sequential or 'auto' mode. Defaults to 0.01.
+            beta (float, optional): Probability of missing a `min_effect` difference in sequential mode, `t_threshold` is taken as the other error. Defaults to 0.2.
+            method (str, optional): 'parametric' for t test, or 'nonparametric' to decide all parameters at once by Mann-Whitney U tests of max against min under false discovery rate `t_threshold`. Defaults to 'parametric'.
+            design (str, optional): 'one-at-a-time' tests each parameter alone, 'group' pushes groups of parameters to their extremes together and only splits groups making a difference, see `yatuner.screening.group_screen`. Defaults to 'one-at-a-time'.
+            group_size (int, optional): Size of the first groups in 'group' design. Defaults to 16.
         """
+        if os.path.exists(self.workspace + '/selected_parameters.txt'):
+            self.logger.info("using existing selected parameters")
+            return
+
+        adaptive = num_samples == 'auto'
+        num_samples = self._plan_samples(num_samples,
+                                         min_effect,
+                                         t_threshold,
+                                         two_sample=True)
+
         if self.deterministic and num_samples != 1:
             self.logger.warning(f"num_samples of {num_samples} "
                                 f"is not necessary for deterministic goal.")
             num_samples = 1
 
-        if os.path.exists(self.workspace + '/selected_parameters.txt'):
-            self.logger.info("using existing selected parameters")
-            return
-
         if os.path.exists(self.workspace + '/selected_optimizers.txt'):
             self.selected_optimizers = []
             with open(self.workspace + '/selected_optimizers.txt',
@@ -365,63 +1151,106 @@ class Tuner:
                 "please run hypothesis test for optimizers first.")
             return
 
-        self.selected_parameters = []
-        i = 0
+        opts = self.selected_optimizers
+        if design == 'group':
+            test = lambda groups: self._test_groups(groups, num_samples,
+                                                    t_threshold)
+            self.selected_parameters = screening.group_screen(
+                list(self.parameters), test, group_size)
+            for parameter in self.selected_parameters:
+                self.logger.info(f"[green]{parameter} is selected[/]")
+            with open(self.workspace + '/selected_parameters.txt',
+                      'w',
+                      encoding='utf-8') as f:
+                f.writelines([
+                    parameter + '\n' for parameter in self.selected_parameters
+                ])
+            return
+
+        configs = []
         for parameter, r in self.parameters.items():
             r_min, r_max, default = r
+            configs.append((opts, {parameter: r_min}, None))
+            configs.append((opts, {parameter: r_max}, None))
+        # min builds are sampled in full, max builds are tested against them
+        tests = {}
+        boundaries = {}
+        stop = None
+        if sequential and not self.deterministic:
+            stop = lambda idx, samples: (idx in tests and tests[idx].decide(
+                samples) is not None)
+        elif adaptive and not self.deterministic:
+            stop = lambda idx, samples: (idx in boundaries and not straddles(
+                samples, boundaries[idx],
+                self.std * np.sqrt(1 + 1 / num_samples), t_threshold))
+
+        paired = self.interleaver is not None and not self.deterministic
+        if paired:
+            if stop is not None:
+                self.logger.warning("early stopping is not used "
+                                    "with interleaved measurement")
+                sequential = False
+            results = self._evaluate_paired(configs, (opts, None, None),
+                                            num_samples)
+        else:
+            results = ((samples, None, err) for samples, err in
+                       self._evaluate_all(configs, num_samples, stop=stop))
 
-            samples_min = np.zeros(num_samples)
-            try:
-                self.call_compile(self.selected_optimizers, {parameter: r_min},
-                                  None)
-            except RuntimeError as err:
-                self.logger.error(f"[red]compile error with {parameter}[/]")
-                self.logger.exception(err)
-                continue
-            except TimeoutExpired:
+        self.selected_parameters = []
+        nonparametric = method == 'nonparametric' and not self.deterministic
+        measured = []
+        i = 0
+        for k, parameter in enumerate(self.parameters):
+            samples_min, base_min, err = next(results)
+            if adaptive and err is None:
+                boundaries[2 * k + 1] = np.mean(samples_min)
+            if sequential and stop is not None and err is None:
+                # the mean of min is itself uncertain
+                tests[2 * k + 1] = TwoSidedSPRT(
+                    np.mean(samples_min), self.u * min_effect,
+                    self.std * np.sqrt(1 + 1 / len(samples_min)), t_threshold,
+                    beta)
+            samples_max, base_max, err_max = next(results)
+            err = err if err is not None else err_max
+            if isinstance(err, TimeoutExpired):
                 self.logger.warning(
                     f"[red]compile timeout with {parameter}[/]")
-
-            if self.deterministic:
-                res = self.call_running()
-                samples_min[0] = res
-            else:
-                for j in range(num_samples):
-                    res = self.call_running()
-                    samples_min[j] = res
-
-            samples_max = np.zeros(num_samples)
-            try:
-                self.call_compile(self.selected_optimizers, {parameter: r_max},
-                                  None)
-            except RuntimeError as err:
-                self.logger.error(f"[red]compile error with {parameter}[/]")
-                self.logger.exception(err)
                 continue
-            except TimeoutExpired:
-                self.logger.warning(
-                    f"[red]compile timeout with {parameter}[/]")
-
-            if self.deterministic:
-                res = self.call_running()
-                samples_max[0] = res
-            else:
-                for j in range(num_samples):
-                    res = self.call_running()
-                    samples_max[j] = res
+            elif err is not None:
+                self.logger.error(f"[red]error with {parameter}[/]")
+                self.logger.exception(err, exc_info=err)
+                continue
 
-            if not self.deterministic:
-                l = stats.levene(samples_min, samples_max).pvalue
-                p = stats.ttest_ind(samples_min,
-                                    samples_max,
+            if nonparametric and paired:
+                # drift within rounds taken out, level of baseline kept
+                measured.append(
+                    (parameter, samples_max - base_max + base_max.mean(),
+                     samples_min - base_min + base_min.mean()))
+            elif nonparametric:
+                measured.append((parameter, samples_max, samples_min))
+            elif not self.deterministic:
+                diffs_min, diffs_max = samples_min, samples_max
+                if paired:
+                    # both are compared through baseline of their rounds
+                    diffs_min, diffs_max = (samples_min - base_min,
+                                            samples_max - base_max)
+                l = stats.levene(diffs_min, diffs_max).pvalue
+                p = stats.ttest_ind(diffs_min, diffs_max,
                                     equal_var=(l > 0.05)).pvalue
 
                 self.logger.debug(f"{i}/{len(self.parameters)} {parameter} "
                                   f"min: {np.mean(samples_min):.2f}, "
                                   f"max: {np.mean(samples_max):.2f} "
-                                  f"l: {l:.2f}, p: {p:.2f}")
+                                  f"l: {l:.2f}, p: {p:.2f}, "
+                                  f"n: {len(samples_max)}")
+
+                decision = None
+                if 2 * k + 1 in tests:
+                    decision = tests[2 * k + 1].decide(samples_max)
+                if decision is None:
+                    decision = p < t_threshold
 
-                if p < t_threshold:
+                if decision:
                     self.selected_parameters.append(parameter)
                     self.logger.info(f"[green]{parameter} is selected[/]")
             else:
@@ -434,20 +1263,151 @@ class Tuner:
 
             i += 1
 
+        if measured:
+            self._select_nonparametric(
+                [parameter for parameter, _, _ in measured],
+                [samples_max for _, samples_max, _ in measured],
+                [samples_min for _, _, samples_min in measured], t_threshold,
+                self.selected_parameters)
+
         with open(self.workspace + '/selected_parameters.txt',
                   'w',
                   encoding='utf-8') as f:
             f.writelines(
                 [parameter + '\n' for parameter in self.selected_parameters])
 
+    def discover_breakpoints(self, max_compiles=32) -> None:
+        """Collapse ranges of selected parameters into values changing the program.
+
+        Each range is bisected on fingerprints of the compiled program, values
+        between two probes producing the same program are assumed to produce
+        it as well. The first value of each class is handed to `optimize` and
+        `optimize_linUCB` instead of the whole range. `executable` is needed.
+
+        Args:
+            max_compiles (int, optional): Maximum compilations for each parameter. Defaults to 32.
+        """
+        if self.executable is None:
+            self.logger.error("executable is needed to discover breakpoints")
+            return
+
+        if os.path.exists(self.workspace + '/breakpoints.txt'):
+            self.logger.info("using existing breakpoints.")
+            return
+
+        if os.path.exists(self.workspace + '/selected_optimizers.txt'):
+            self.selected_optimizers = []
+            with open(self.workspace + '/selected_optimizers.txt',
+                      'r',
+                      encoding='utf-8') as file:
+                self.selected_optimizers = [
+                    x.strip() for x in file.readlines()
+                ]
+
+            self.logger.info(
+                f"loaded {len(self.selected_optimizers)} optimizers")
+
+        if os.path.exists(self.workspace + '/selected_parameters.txt'):
+            self.selected_parameters = []
+            with open(self.workspace + '/selected_parameters.txt',
+                      'r',
+                      encoding='utf-8') as file:
+                self.selected_parameters = [
+                    x.strip() for x in file.readlines()
+                ]
+
+            self.logger.info(
+                f"loaded {len(self.selected_parameters)} parameters")
+        else:
+            self.logger.error(
+                "no selected parameters detected, "
+                "please run hypothesis test for parameters first.")
+            return
+
+        opts = self.selected_optimizers
+        configs = []
+        for parameter in self.selected_parameters:
+            r_min, r_max, _ = self.parameters[parameter]
+            configs.append((opts, {parameter: r_min}, None))
+            configs.append((opts, {parameter: r_max}, None))
+        fingerprints = self._fingerprint_all(configs)
+
+        # starts of classes with their fingerprints, and intervals to bisect
+        classes = {}
+        pending = []
+        compiles = {}
+        for idx, parameter in enumerate(self.selected_parameters):
+            r_min, r_max, _ = self.parameters[parameter]
+            f_min, f_max = fingerprints[2 * idx], fingerprints[2 * idx + 1]
+            classes[parameter] = [(r_min, f_min)]
+            pending.append((parameter, r_min, f_min, r_max, f_max))
+            compiles[parameter] = 2
+
+        while pending:
+            todo = []
+            for parameter, lo, f_lo, hi, f_hi in pending:
+                if f_lo is not None and f_lo == f_hi:
+                    continue
+                if hi - lo <= 1 or compiles[parameter] >= max_compiles:
+                    classes[parameter].append((hi, f_hi))
+                    continue
+                compiles[parameter] += 1
+                todo.append((parameter, lo, f_lo, hi, f_hi, (lo + hi) // 2))
+
+            fingerprints = self._fingerprint_all([(opts, {
+                parameter: mid
+            }, None) for parameter, _, _, _, _, mid in todo])
+
+            pending = []
+            for (parameter, lo, f_lo, hi, f_hi,
+                 mid), f_mid in zip(todo, fingerprints):
+                pending.append((parameter, lo, f_lo, mid, f_mid))
+                pending.append((parameter, mid, f_mid, hi, f_hi))
+
+        self.breakpoints = {}
+        for parameter in self.selected_parameters:
+            vals = sorted(val for val, fingerprint in classes[parameter]
+                          if fingerprint is not None)
+            if not vals:
+                self.logger.warning(f"[red]no valid value of {parameter}[/]")
+                continue
+            self.breakpoints[parameter] = vals
+            r_min, r_max, _ = self.parameters[parameter]
+            self.logger.debug(f"{parameter} ({r_min}, {r_max}) -> {vals}")
+
+        self.logger.info(
+            f"{sum(len(x) for x in self.breakpoints.values())} values in "
+            f"{len(self.breakpoints)} parameters, "
+            f"{sum(compiles.values())} compilations")
+
+        with open(self.workspace + '/breakpoints.txt', 'w',
+                  encoding='utf-8') as file:
+            for parameter, vals in self.breakpoints.items():
+                file.write(' '.join([parameter] + [str(x)
+                                                   for x in vals]) + '\n')
+
     def optimize_linUCB(self,
                         alpha=0.5,
                         num_epochs=200,
                         num_samples=10,
                         num_bins=25,
                         nth_choice=3,
-                        metric='cpu-cycles') -> None:
-        """Optimize selected parameters with linUCB."""
+                        metric='cpu-cycles',
+                        min_effect=0.01,
+                        baseline_every=20) -> None:
+        """Optimize selected parameters with linUCB.
+
+        Every `baseline_every` epochs `metric` of the build before
+        optimization is counted again, and results are normalized to the
+        drift of it before computing rewards. Trials are recorded in
+        `trials.csv` of workspace. `duration_time` is used when `metric` is
+        not counted on the machine, e.g. without hardware counters.
+        """
+        if os.path.exists(self.workspace + '/optimized_parameters.txt'):
+            self.logger.info("using existing optimized parameters.")
+            return
+
+        num_samples = self._plan_samples(num_samples, min_effect)
         if self.deterministic and num_samples != 1:
             self.logger.warning(f"num_samples of {num_samples} "
                                 f"is not necessary for deterministic goal.")
@@ -466,10 +1426,6 @@ class Tuner:
             self.logger.error("num_epochs needs to be larger than num_bins")
             return
 
-        if os.path.exists(self.workspace + '/optimized_parameters.txt'):
-            self.logger.info("using existing optimized parameters.")
-            return
-
         if os.path.exists(self.workspace + '/selected_optimizers.txt'):
             self.selected_optimizers = []
             with open(self.workspace + '/selected_optimizers.txt',
@@ -483,16 +1439,14 @@ class Tuner:
                 f"loaded {len(self.selected_optimizers)} optimizers")
 
         try:
-            self.call_compile(self.selected_optimizers, None, None)
+            build_dir = self._compile(self.selected_optimizers, None, None)
         except RuntimeError as err:
             self.logger.error(f"[red]compile error[/]")
             self.logger.exception(err)
             return
 
-        baseline = 0
-        for _ in track(range(num_samples), "before optimization"):
-            baseline += self.call_running()
-        baseline /= num_samples
+        baseline = self._sample(num_samples, build_dir,
+                                "before optimization").mean()
         self.logger.info(f"execution result before optimize: {baseline}")
 
         if os.path.exists(self.workspace + '/selected_parameters.txt'):
@@ -507,26 +1461,53 @@ class Tuner:
             self.logger.info(
                 f"loaded {len(self.selected_parameters)} parameters")
 
-        dim = len(self.call_perf())
-        features = [log10(1 + x) for x in self.call_perf().values()]
-        ucbs = [
-            LinUCB.LinUCB(dim,
-                          np.linspace(self.parameters[param][0],
-                                      self.parameters[param][1],
-                                      num_bins,
-                                      endpoint=True,
-                                      dtype='int'),
-                          alpha=alpha,
-                          nth_choice=nth_choice)
-            for param in self.selected_parameters
-        ]
+        self._load_breakpoints()
+
+        counters = self._perf(build_dir)
+        if not counters.get(metric):
+            # e.g. no hardware counter in a virtual machine
+            self.logger.warning(f"[red]{metric} is not counted, "
+                                f"using duration_time instead[/]")
+            metric = 'duration_time'
+            if not counters.get(metric):
+                raise RuntimeError("call_perf reports neither "
+                                   "the metric nor duration_time")
+
+        dim = len(counters)
+        features = [log10(1 + x) for x in counters.values()]
+        ucbs = []
+        for param in self.selected_parameters:
+            if param in self.breakpoints:
+                arms = np.array(self.breakpoints[param])
+            else:
+                arms = np.linspace(self.parameters[param][0],
+                                   self.parameters[param][1],
+                                   num_bins,
+                                   endpoint=True,
+                                   dtype='int')
+            ucbs.append(
+                LinUCB.LinUCB(dim,
+                              arms,
+                              alpha=alpha,
+                              nth_choice=min(nth_choice, len(arms))))
         for ucb in ucbs:
             ucb.init()
         choices = np.zeros(len(self.selected_parameters), dtype=int)
         timearr = np.zeros(num_epochs)
         best_choices = np.zeros(len(self.selected_parameters), dtype=int)
         best_time = float('inf')
+        drift = DriftTracker(counters[metric] / 1000, logger=self.logger)
         for i in track(range(num_epochs), description='optimizing'):
+            if baseline_every and i > 0 and i % baseline_every == 0:
+                baseline_dir = self._compile_baseline(
+                    (self.selected_optimizers, None, None))
+                value = self._perf(baseline_dir)[metric] / 1000
+                self.trials.append('linUCB',
+                                   i,
+                                   value,
+                                   kind='baseline',
+                                   drift=drift.update(value))
+
             for idx, ucb in enumerate(ucbs):
                 choices[idx] = ucb.recommend(features)
             step_parameters = {}
@@ -534,14 +1515,21 @@ class Tuner:
                 step_parameters[param] = choices[idx]
             # print(step_parameters)
             try:
-                self.call_compile(self.selected_optimizers, step_parameters,
-                                  None)
-                new_perf = self.call_perf()
+                build_dir = self._compile(self.selected_optimizers,
+                                          step_parameters, None)
+                new_perf = self._perf(build_dir)
                 features = [log10(1 + x) for x in new_perf.values()]
-                new_time = new_perf[metric] / 1000
+                new_time = drift.normalize(new_perf[metric] / 1000)
                 reward = (baseline - new_time) / 100
                 self.logger.debug(
-                    f"r={reward:.2f} t={new_time:.2f} baseline={baseline:.2f}")
+                    f"r={reward:.2f} t={new_time:.2f} baseline={baseline:.2f} "
+                    f"drift={drift.drift:.3f}")
+                self.trials.append('linUCB',
+                                   i,
+                                   new_perf[metric] / 1000,
+                                   drift=drift.drift,
+                                   normalized=new_time,
+                                   config=step_parameters)
                 for ucb in ucbs:
                     ucb.update(reward)
                 timearr[i] = new_time
@@ -560,17 +1548,35 @@ class Tuner:
             for idx, param in enumerate(self.selected_parameters):
                 file.write(param + " " + str(best_choices[idx]) + '\n')
 
-    def optimize(self, num_samples=10, num_epochs=60) -> None:
-        """Optimize selected parameters with bayesian."""
-        if self.deterministic and num_samples != 1:
-            self.logger.warning(f"num_samples of {num_samples} "
-                                f"is not necessary for deterministic goal.")
-            num_samples = 1
+    def optimize(self,
+                 num_samples=10,
+                 num_epochs=60,
+                 min_effect=0.01,
+                 baseline_every=10,
+                 batch_size=1,
+                 evaluator='thompson_sampling') -> None:
+        """Optimize selected parameters with bayesian.
 
+        Trials are recorded in `trials.csv` of workspace.
+
+        Args:
+            num_samples (int | str, optional): Sampling times for each epoch, or 'auto' to plan them from test run for `min_effect`. Defaults to 10.
+            num_epochs (int, optional): Optimization epochs. Defaults to 60.
+            min_effect (float, optional): Relative speedup worth detecting in 'auto' mode. Defaults to 0.01.
+            baseline_every (int, optional): Epochs between re-measurements of the build before optimization, results are normalized to its drift. 0 never re-measures, neither does interleaved measurement which pairs every epoch with it. Defaults to 10.
+            batch_size (int, optional): Points proposed at a time and compiled concurrently, usually `num_workers`, and `num_epochs` still counts points. Defaults to 1.
+            evaluator (str, optional): GPyOpt evaluator of batches, 'thompson_sampling' or 'local_penalization'. Defaults to 'thompson_sampling'.
+        """
         if os.path.exists(self.workspace + '/optimized_parameters.txt'):
             self.logger.info("using existing optimized parameters.")
             return
 
+        num_samples = self._plan_samples(num_samples, min_effect)
+        if self.deterministic and num_samples != 1:
+            self.logger.warning(f"num_samples of {num_samples} "
+                                f"is not necessary for deterministic goal.")
+            num_samples = 1
+
         if os.path.exists(self.workspace + '/selected_optimizers.txt'):
             self.selected_optimizers = []
             with open(self.workspace + '/selected_optimizers.txt',
@@ -584,22 +1590,20 @@ class Tuner:
                 f"loaded {len(self.selected_optimizers)} optimizers")
 
         try:
-            self.call_compile(self.selected_optimizers, None, None)
+            build_dir = self._compile(self.selected_optimizers, None, None)
         except RuntimeError as err:
             self.logger.error(f"[red]compile error[/]")
             self.logger.exception(err)
             return
         except TimeoutExpired:
             self.logger.error(f"[red]compile timeout[/]")
+            return
 
-        res = 0
-        if self.deterministic:
-            res = self.call_running()
-        else:
-            for _ in track(range(num_samples), "before optimization"):
-                res += self.call_running()
-            res /= num_samples
+        res = self._sample(num_samples, build_dir,
+                           "before optimization").mean()
         self.logger.info(f"execution result before optimize: {res}")
+        before = res
+        drift = DriftTracker(before, logger=self.logger)
 
         if os.path.exists(self.workspace + '/selected_parameters.txt'):
             self.selected_parameters = []
@@ -614,145 +1618,280 @@ class Tuner:
                 f"loaded {len(self.selected_parameters)} parameters")
 
         cnt = 0
-
-        def step(vals) -> float:
-
-            nonlocal cnt
-
-            step_parameters = {}
-            for i, parameter in enumerate(self.selected_parameters):
-                v = round(vals[0][i] * (self.parameters[parameter][1] -
-                                        self.parameters[parameter][0]) +
-                          self.parameters[parameter][0])
-                step_parameters[parameter] = int(v)
-
-            try:
-                self.call_compile(self.selected_optimizers, step_parameters,
-                                  None)
-            except RuntimeError as err:
-                self.logger.error("[red]compile error[/]")
-                self.logger.exception(err)
-                return inf
-
-            res = 0
-            if self.deterministic:
-                res = self.call_running()
+        remeasured = 0
+        paired = self.interleaver is not None and not self.deterministic
+
+        def step(vals) -> np.ndarray:
+
+            nonlocal cnt, remeasured
+
+            configs = []
+            for row in vals:
+                step_parameters = {}
+                for i, parameter in enumerate(self.selected_parameters):
+                    step_parameters[parameter] = self._decode_parameter(
+                        parameter, row[i])
+                configs.append(
+                    (self.selected_optimizers, step_parameters, None))
+
+            if paired:
+                # measured against the build before optimization
+                results = self._evaluate_paired(
+                    configs, (self.selected_optimizers, None, None),
+                    num_samples)
             else:
-                for _ in track(range(num_samples), f'epoch {cnt:<5}'):
-                    res += self.call_running()
-                res /= num_samples
-
-            self.logger.debug(f'{cnt}/{num_epochs} result: {res:.2f}')
-
-            cnt += 1
-
-            return res
+                if baseline_every and cnt - remeasured >= baseline_every:
+                    remeasured = cnt
+                    try:
+                        baseline_dir = self._compile_baseline(
+                            (self.selected_optimizers, None, None))
+                        value = self._sample_fresh(num_samples,
+                                                   baseline_dir).mean()
+                        self.trials.append('optimize',
+                                           cnt,
+                                           value,
+                                           kind='baseline',
+                                           drift=drift.update(value))
+                    except RuntimeError as err:
+                        self.logger.error("[red]error with baseline[/]")
+                        self.logger.exception(err)
+                descriptions = [
+                    f'epoch {cnt + k:<5}' for k in range(len(configs))
+                ]
+                results = self._evaluate_all(configs, num_samples,
+                                             descriptions)
+
+            losses = []
+            for (_, step_parameters, _), result in zip(configs, results):
+                if result[-1] is not None:
+                    self.logger.error("[red]compile error[/]")
+                    self.logger.exception(result[-1], exc_info=result[-1])
+                    losses.append(inf)
+                    continue
+
+                if paired:
+                    samples, base, _ = result
+                    raw = res = before + (samples - base).mean()
+                else:
+                    raw = result[0].mean()
+                    res = drift.normalize(raw)
+
+                self.logger.debug(f'{cnt}/{num_epochs} result: {res:.2f}')
+                self.trials.append('optimize',
+                                   cnt,
+                                   raw,
+                                   drift=drift.drift,
+                                   normalized=res,
+                                   config=step_parameters)
+                losses.append(res)
+                cnt += 1
+
+            return np.array(losses)[:, None]
+
+        self._load_breakpoints()
 
         bounds = [{
+            'name': parameter,
+            'type': 'discrete',
+            'domain': tuple(range(len(self.breakpoints[parameter])))
+        } if parameter in self.breakpoints else {
             'name': parameter,
             'type': 'continuous',
             'domain': (0, 1)
         } for parameter in self.selected_parameters]
 
-        method = GPyOpt.methods.BayesianOptimization(step,
-                                                     domain=bounds,
-                                                     acquisition_type='LCB',
-                                                     acquisition_weight=0.2)
-        method.run_optimization(max_iter=num_epochs)
-        method.plot_convergence(self.workspace + '/convergence.png')
-
-        self.logger.info(f"best result: {method.fx_opt.flatten()[0]}")
-        self.logger.info(f"best option: {method.x_opt}")
+        if batch_size > 1:
+            X, Y, vals, fx_opt = self._optimize_batch(step,
+                                                      bounds,
+                                                      num_epochs,
+                                                      batch_size,
+                                                      evaluator,
+                                                      acquisition_type='LCB',
+                                                      acquisition_weight=0.2)
+            GPyOpt.plotting.plots_bo.plot_convergence(
+                X, np.minimum.accumulate(Y[:, 0]),
+                self.workspace + '/convergence.png')
+        else:
+            method = GPyOpt.methods.BayesianOptimization(
+                step,
+                domain=bounds,
+                acquisition_type='LCB',
+                acquisition_weight=0.2)
+            method.run_optimization(max_iter=num_epochs)
+            method.plot_convergence(self.workspace + '/convergence.png')
+            vals, fx_opt = method.x_opt, method.fx_opt.flatten()[0]
+
+        self.logger.info(f"best result: {fx_opt}")
+        self.logger.info(f"best option: {vals}")
 
-        vals = method.x_opt
         with open(self.workspace + '/optimized_parameters.txt',
                   'w',
                   encoding='utf-8') as file:
 
             for i, parameter in enumerate(self.selected_parameters):
-                v = round(vals[i] * (self.parameters[parameter][1] -
-                                     self.parameters[parameter][0]) +
-                          self.parameters[parameter][0])
-
-                file.write(f'{parameter} {int(v)}\n')
-
-    def run(self, num_samples=10):
-        """Run result and existing options to compare.
+                v = self._decode_parameter(parameter, vals[i])
+                file.write(f'{parameter} {v}\n')
+
+    def optimize_hyperband(self,
+                           fidelities: Sequence,
+                           num_samples=10,
+                           eta=3,
+                           num_iterations=1,
+                           model=True,
+                           min_effect=0.01,
+                           seed=None) -> None:
+        """Optimize selected parameters evaluating most trials at cheap fidelities.
+
+        `call_compile` and `call_running` (or `call_running_batch`) receive
+        keyword argument `fidelity` within this stage, e.g. a dataset size,
+        and should use the last of `fidelities` when it is not given. Trials
+        start at a cheap fidelity and only the best are promoted to the next
+        one (Hyperband), and new trials are proposed from earlier results
+        with `model` (BOHB), see `yatuner.hyperband.hyperband`.
+
+        Trials are recorded in `trials.csv` of workspace, with the fidelity
+        as kind of those below the target one.
 
         Args:
-            num_samples (int, optional): Sampling times. Defaults to 10.
+            fidelities (Sequence): Fidelities passed to callbacks, cheapest first and the target one last.
+            num_samples (int | str, optional): Sampling times for each trial, or 'auto' to plan them from test run for `min_effect`. Defaults to 10.
+            eta (int, optional): Ratio of trials cut at each promotion. Defaults to 3.
+            num_iterations (int, optional): Iterations of all Hyperband brackets. Defaults to 1.
+            model (bool, optional): Propose trials by a model instead of at random. Defaults to True.
+            min_effect (float, optional): Relative speedup worth detecting in 'auto' mode. Defaults to 0.01.
+            seed (int, optional): Seed of sampling. Defaults to None.
         """
+        if os.path.exists(self.workspace + '/optimized_parameters.txt'):
+            self.logger.info("using existing optimized parameters.")
+            return
+
+        num_samples = self._plan_samples(num_samples, min_effect)
         if self.deterministic and num_samples != 1:
             self.logger.warning(f"num_samples of {num_samples} "
                                 f"is not necessary for deterministic goal.")
             num_samples = 1
 
-        if os.path.exists(self.workspace + '/result.csv'):
-            self.logger.info("aready done.")
-            return
+        if os.path.exists(self.workspace + '/selected_optimizers.txt'):
+            with open(self.workspace + '/selected_optimizers.txt',
+                      'r',
+                      encoding='utf-8') as file:
+                self.selected_optimizers = [
+                    x.strip() for x in file.readlines()
+                ]
 
-        samples_ofast = np.zeros(num_samples)
-        samples_os = np.zeros(num_samples)
-        samples_o0 = np.zeros(num_samples)
-        samples_o1 = np.zeros(num_samples)
-        samples_o2 = np.zeros(num_samples)
-        samples_o3 = np.zeros(num_samples)
-        samples_optimizers = np.zeros(num_samples)
-        samples_parameters = np.zeros(num_samples)
+            self.logger.info(
+                f"loaded {len(self.selected_optimizers)} optimizers")
 
-        self.call_compile(None, None, '-Ofast')
-        if self.deterministic:
-            res = self.call_running()
-            samples_ofast[0] = res
-        else:
-            for i in track(range(num_samples), description='-Ofast'):
-                res = self.call_running()
-                samples_ofast[i] = res
+        if os.path.exists(self.workspace + '/selected_parameters.txt'):
+            with open(self.workspace + '/selected_parameters.txt',
+                      'r',
+                      encoding='utf-8') as file:
+                self.selected_parameters = [
+                    x.strip() for x in file.readlines()
+                ]
 
-        self.call_compile(None, None, '-Os')
-        if self.deterministic:
-            res = self.call_running()
-            samples_os[0] = res
-        else:
-            for i in track(range(num_samples), description='   -Os'):
-                res = self.call_running()
-                samples_os[i] = res
+            self.logger.info(
+                f"loaded {len(self.selected_parameters)} parameters")
 
-        self.call_compile(None, None, '-O0')
-        if self.deterministic:
-            res = self.call_running()
-            samples_o0[0] = res
-        else:
-            for i in track(range(num_samples), description='   -O0'):
-                res = self.call_running()
-                samples_o0[i] = res
+        self._load_breakpoints()
 
-        self.call_compile(None, None, '-O1')
-        if self.deterministic:
-            res = self.call_running()
-            samples_o1[0] = res
-        else:
-            for i in track(range(num_samples), description='   -O1'):
-                res = self.call_running()
-                samples_o1[i] = res
+        def decode(point) -> Dict[str, int]:
+            step_parameters = {}
+            for parameter, val in zip(self.selected_parameters, point):
+                if parameter in self.breakpoints:
+                    # unit interval split evenly among breakpoints
+                    num_choices = len(self.breakpoints[parameter])
+                    val = min(int(val * num_choices), num_choices - 1)
+                step_parameters[parameter] = self._decode_parameter(
+                    parameter, val)
+            return step_parameters
 
-        self.call_compile(None, None, '-O2')
-        if self.deterministic:
-            res = self.call_running()
-            samples_o2[0] = res
-        else:
-            for i in track(range(num_samples), description='   -O2'):
-                res = self.call_running()
-                samples_o2[i] = res
+        cnt = 0
 
-        self.call_compile(None, None, '-O3')
-        if self.deterministic:
-            res = self.call_running()
-            samples_o3[0] = res
-        else:
-            for i in track(range(num_samples), description='   -O3'):
-                res = self.call_running()
-                samples_o3[i] = res
+        def evaluate(fidelity, points) -> List[float]:
+            nonlocal cnt
+
+            self.fidelity = fidelities[fidelity]
+            configs = [(self.selected_optimizers, decode(point), None)
+                       for point in points]
+            losses = []
+            for config, (build_dir, err) in zip(configs,
+                                                self._compile_all(configs)):
+                if err is not None:
+                    self.logger.error("[red]compile error[/]")
+                    self.logger.exception(err, exc_info=err)
+                    losses.append(inf)
+                    continue
+
+                res = self._sample_fresh(num_samples, build_dir).mean()
+                self.logger.debug(f'{cnt} fidelity {self.fidelity} '
+                                  f'result: {res:.2f}')
+                kind = 'trial'
+                if fidelity < len(fidelities) - 1:
+                    kind = str(self.fidelity)
+                self.trials.append('hyperband',
+                                   cnt,
+                                   res,
+                                   kind=kind,
+                                   config=config[1])
+                losses.append(res)
+                cnt += 1
+
+            return losses
+
+        try:
+            history = hyperband(len(self.selected_parameters),
+                                evaluate,
+                                len(fidelities),
+                                eta=eta,
+                                num_iterations=num_iterations,
+                                model=model,
+                                seed=seed,
+                                logger=self.logger)
+        finally:
+            self.fidelity = None
+
+        target = [(loss, point) for fidelity, point, loss in history
+                  if fidelity == len(fidelities) - 1]
+        loss, point = min(target, key=lambda x: x[0])
+        self.logger.info(f"{len(history)} trials, "
+                         f"{len(target)} at target fidelity")
+        self.logger.info(f"best result: {loss}")
+
+        with open(self.workspace + '/optimized_parameters.txt',
+                  'w',
+                  encoding='utf-8') as file:
+            for parameter, v in decode(point).items():
+                file.write(f'{parameter} {v}\n')
+
+    def run(self,
+            num_samples=10,
+            min_effect=0.01,
+            racing=False,
+            candidates: Mapping[str, Tuple] = None,
+            top_k=3,
+            eta: float = None):
+        """Run result and existing options to compare.
+
+        Args:
+            num_samples (int | str, optional): Sampling times, or 'auto' to plan them from test run for `min_effect`. In racing mode the average budget of each candidate. Defaults to 10.
+            min_effect (float, optional): Relative difference worth detecting between two results in 'auto' mode. Defaults to 0.01.
+            racing (bool, optional): Race candidates in rounds and drop clearly slower ones early, see `yatuner.racing.race`. Candidates are built once into build directories as in parallel mode. Defaults to False.
+            candidates (Mapping[str, Tuple], optional): More candidates to race, in format of `name: (optimizers, parameters, additional)`. Defaults to None.
+            top_k (int, optional): Best distinct trials of `optimize`, `optimize_linUCB` and `optimize_hyperband` in `trials.csv` raced as well, ranked within each stage. Defaults to 3.
+            eta (float, optional): Also keep no more than `1 / eta` of candidates each round in racing mode (successive halving). Defaults to None.
+        """
+        if os.path.exists(self.workspace + '/result.csv'):
+            self.logger.info("aready done.")
+            return
+
+        num_samples = self._plan_samples(num_samples,
+                                         min_effect,
+                                         two_sample=True)
+        if self.deterministic and num_samples != 1:
+            self.logger.warning(f"num_samples of {num_samples} "
+                                f"is not necessary for deterministic goal.")
+            num_samples = 1
 
         if os.path.exists(self.workspace + '/selected_optimizers.txt'):
             self.selected_optimizers = []
@@ -768,15 +1907,6 @@ class Tuner:
         else:
             pass
 
-        self.call_compile(self.selected_optimizers, None, None)
-        if self.deterministic:
-            res = self.call_running()
-            samples_optimizers[0] = res
-        else:
-            for i in track(range(num_samples), description='optimizers'):
-                res = self.call_running()
-                samples_optimizers[i] = res
-
         if os.path.exists(self.workspace + '/optimized_parameters.txt'):
             self.optimized_parameters = {}
             with open(self.workspace + '/optimized_parameters.txt',
@@ -791,15 +1921,40 @@ class Tuner:
         else:
             pass
 
-        self.call_compile(self.selected_optimizers, self.optimized_parameters,
-                          None)
-        if self.deterministic:
-            res = self.call_running()
-            samples_parameters[0] = res
+        configs = [
+            ('-Ofast', (None, None, '-Ofast')),
+            ('   -Os', (None, None, '-Os')),
+            ('   -O0', (None, None, '-O0')),
+            ('   -O1', (None, None, '-O1')),
+            ('   -O2', (None, None, '-O2')),
+            ('   -O3', (None, None, '-O3')),
+            ('optimizers', (self.selected_optimizers, None, None)),
+            ('parameters', (self.selected_optimizers,
+                            self.optimized_parameters, None)),
+        ]
+        if racing:
+            configs.extend(self._fetch_top_trials(top_k))
+            if candidates is not None:
+                configs.extend(candidates.items())
+            self._race(configs, num_samples, eta)
+            return
+
+        samples = []
+        descriptions = [description for description, _ in configs]
+        configs = [config for _, config in configs]
+        if self.interleaver is not None and not self.deterministic:
+            results = ((samples_config, err)
+                       for samples_config, _, err in self._evaluate_paired(
+                           configs, None, num_samples, descriptions))
         else:
-            for i in track(range(num_samples), description='parameters'):
-                res = self.call_running()
-                samples_parameters[i] = res
+            results = self._evaluate_all(configs, num_samples, descriptions)
+        for samples_config, err in results:
+            if err is not None:
+                raise err
+            samples.append(samples_config)
+
+        (samples_ofast, samples_os, samples_o0, samples_o1, samples_o2,
+         samples_o3, samples_optimizers, samples_parameters) = samples
 
         if not self.deterministic:
             bin_min = min(np.min(samples_os), np.min(samples_o0),
@@ -915,6 +2070,99 @@ class Tuner:
         console = Console()
         console.print(table)
 
+    def _fetch_top_trials(self, top_k) -> List[Tuple[str, Tuple]]:
+        """Fetch configurations of best distinct trials in trial store.
+
+        Stages record results in their own units (`optimize_linUCB` counts
+        perf events), so trials are ranked within their stage, and the best
+        of each stage come first.
+        """
+        stages = ['optimize', 'linUCB', 'hyperband']
+        trials = self.trials.load()
+        trials = trials[(trials['kind'] == 'trial')
+                        & trials['stage'].isin(stages)]
+        ranks = trials.groupby('stage')['normalized'].rank(method='first')
+        trials = trials.assign(rank=ranks).sort_values('rank', kind='stable')
+
+        configs = []
+        for config in trials['config'].drop_duplicates()[:top_k]:
+            parameters = dict(x.split('=', 1) for x in config.split())
+            configs.append((f'top-{len(configs)}', (self.selected_optimizers,
+                                                    parameters, None)))
+        return configs
+
+    def _race(self, configs, num_samples, eta=None) -> None:
+        """Race configurations and save the result like `run`."""
+        names = [name.strip() for name, _ in configs]
+        configs = [config for _, config in configs]
+
+        if self.pool is None:
+            # every candidate is built once into its own directory instead
+            # of being rebuilt for each round
+            self.pool = BuildPool(self._call_compile,
+                                  self.workspace + '/builds', 1,
+                                  self.measure_core)
+            os.makedirs(self.pool.build_root, exist_ok=True)
+
+        build_dirs = [
+            os.path.join(self.pool.build_root, f'race-{k}')
+            for k in range(len(configs))
+        ]
+        errors = self.pool.compile(configs, build_dirs)
+
+        built = [k for k, err in enumerate(errors) if err is None]
+        for k, err in enumerate(errors):
+            if err is not None:
+                self.logger.error(f"[red]error with {names[k]}[/]")
+                self.logger.exception(err, exc_info=err)
+        if not built:
+            self.logger.error("[red]no candidate compiled, nothing to race[/]")
+            return
+
+        def sample(alive, num_runs):
+            alive = [built[idx] for idx in alive]
+            if self.interleaver is not None:
+                return self.interleaver.measure([build_dirs[k] for k in alive],
+                                                num_runs)[1]
+
+            return [self._sample_fresh(num_runs, build_dirs[k]) for k in alive]
+
+        self.logger.info(f"racing {len(built)} candidates")
+        samples, alive = race(len(built),
+                              sample,
+                              num_samples * len(built),
+                              eta=eta,
+                              logger=self.logger)
+
+        pd_data = pd.DataFrame({
+            names[k]: pd.Series(x)
+            for k, x in zip(built, samples)
+        })
+        pd_data.to_csv(self.workspace + "/result.csv", index=0)
+
+        means = [np.mean(x) for x in samples]
+        minimal = min(means)
+        reference = means[built.index(names.index('-O2'))] if (
+            '-O2' in names and names.index('-O2') in built) else None
+
+        table = Table(title="Result")
+        table.add_column("Method")
+        table.add_column(f"Result", style="cyan")
+        table.add_column("Score", style="green")
+        table.add_column("Delta", style="green")
+        table.add_column("Samples")
+        for idx in alive + [x for x in range(len(built)) if x not in alive]:
+            delta = ''
+            if reference is not None:
+                delta = f"{(reference / means[idx] - 1) * 100:.2f}%"
+            table.add_row(
+                names[built[idx]] + ('' if idx in alive else ' (dropped)'),
+                f"{means[idx]:.2f}", f"{100 * minimal / means[idx]:.2f}",
+                delta, f"{len(samples[idx])}")
+
+        console = Console()
+        console.print(table)
+
     def plot_data(self) -> None:
         """Plot result in violin graph."""
         if self.deterministic:
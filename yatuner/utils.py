@@ -13,10 +13,20 @@
 import subprocess
 import re
 import os
+import atexit
+import shutil
+import fcntl
+import struct
+import hashlib
+import tempfile
+import shlex
+import signal
+import threading
+import time
 import numpy as np
 import platform
 import ast
-from typing import List, Tuple
+from typing import List, Sequence, Tuple, Union
 from typing import Any, Dict
 
 
@@ -44,51 +54,307 @@ def execute(command) -> Dict[str, Any]:
     }
 
 
-def fetch_perf_stat(command) -> Dict[str, Any]:
+def fetch_pass_fds_actions(
+        pass_fds: Dict[int, int]) -> Tuple[List[tuple], List[int]]:
+    """Fetch `posix_spawn` file actions placing fds at given numbers.
+
+    Sources are duplicated above the targets first, so that no target
+    overwrites a source still to be placed.
+
+    Args:
+        pass_fds (Dict[int, int]): Mapping from fds in the child to fds of current process.
+
+    Returns:
+        Tuple[List[tuple], List[int]]: File actions, and duplicated fds to close after spawning.
+    """
+    if not pass_fds:
+        return [], []
+
+    lowest = max(pass_fds) + 1
+    dups = [
+        fcntl.fcntl(source, fcntl.F_DUPFD_CLOEXEC, lowest)
+        for source in pass_fds.values()
+    ]
+    actions = [(os.POSIX_SPAWN_DUP2, dup, target)
+               for target, dup in zip(pass_fds, dups)]
+    return actions, dups
+
+
+SHELL_CHARS = set('|&;<>()$`\\"\'*?[]{}#~=%!\n')
+
+ROI_FDS = {'YATUNER_CTL_FD': 4, 'YATUNER_ACK_FD': 5, 'YATUNER_ROI_TIME_FD': 6}
+
+
+def fetch_include_dir() -> str:
+    """Fetch the directory of headers shipped with yatuner, such as `yatuner_roi.h`."""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'include')
+
+
+class RoiChannel:
+
+    def __init__(self) -> None:
+        """Pipes between a program using `yatuner_roi.h` and its counter.
+
+        The program writes `enable`/`disable` lines to the control pipe and
+        waits for an ack on the other, as in `perf stat --control`. Elapsed
+        ns of each region are written to the time pipe.
+        """
+        self.ctl_r, self.ctl_w = os.pipe()
+        self.ack_r, self.ack_w = os.pipe()
+        self.time_r, self.time_w = os.pipe()
+
+    def child_fds(self) -> Dict[int, int]:
+        """Fds to pass to the program, see `spawn`."""
+        return {
+            ROI_FDS['YATUNER_CTL_FD']: self.ctl_w,
+            ROI_FDS['YATUNER_ACK_FD']: self.ack_r,
+            ROI_FDS['YATUNER_ROI_TIME_FD']: self.time_w,
+        }
+
+    def env(self, env: Dict[str, str] = None) -> Dict[str, str]:
+        """Environment telling the program where the pipes are."""
+        env = dict(os.environ if env is None else env)
+        env.update((name, str(fd)) for name, fd in ROI_FDS.items())
+        return env
+
+    def close_child_ends(self) -> None:
+        """Close ends used by the program, so that reads end at its exit."""
+        for name in ('ctl_w', 'ack_r', 'time_w'):
+            if getattr(self, name) is not None:
+                os.close(getattr(self, name))
+                setattr(self, name, None)
+
+    def fetch_time(self) -> int:
+        """Fetch total ns of regions after the program exits, None if no region is reported."""
+        data = b''
+        for chunk in iter(lambda: os.read(self.time_r, 1 << 16), b''):
+            data += chunk
+        lines = data.split()
+        if not lines:
+            return None
+        return sum(int(x) for x in lines)
+
+    def close(self) -> None:
+        self.close_child_ends()
+        for name in ('ctl_r', 'ack_w', 'time_r'):
+            if getattr(self, name) is not None:
+                os.close(getattr(self, name))
+                setattr(self, name, None)
+
+
+def spawn(command: Union[str, Sequence[str]],
+          capture=False,
+          timeout: float = None,
+          env: Dict[str, str] = None,
+          pass_fds: Dict[int, int] = None) -> Dict[str, Any]:
+    """Spawn given command without a shell and wait for it.
+
+    The program is started with `posix_spawn`, so no shell or python-side
+    pipes are involved. Output is discarded unless `capture` is set, in
+    which case it is collected in temporary files after exit. Times come
+    from `wait4` of the child, named after the events of `perf stat`. Note
+    that on Linux `maxrss` also covers the memory of current process shared
+    with the child before exec.
+
+    Args:
+        command (str | Sequence[str]): Argv, or a command line split with `shlex`.
+        capture (bool, optional): Collect stdout and stderr. Defaults to False.
+        timeout (float, optional): Seconds before the program is killed and `TimeoutExpired` raised. Defaults to None.
+        env (Dict[str, str], optional): Environment, inherited if None.
+        pass_fds (Dict[int, int], optional): Fds passed to the program, mapping fds in the program to fds of current process. Defaults to None.
+
+    Returns:
+        Dict[str, Any]: `returncode`, `duration_time`, `user_time` and `system_time` in ns, `maxrss` in KiB, and `stdout`, `stderr` if captured.
+    """
+    argv = shlex.split(command) if isinstance(command, str) else list(command)
+    if env is None:
+        env = os.environ
+
+    files = []
+    if capture:
+        files = [tempfile.TemporaryFile(), tempfile.TemporaryFile()]
+        file_actions = [(os.POSIX_SPAWN_DUP2, f.fileno(), fd)
+                        for f, fd in zip(files, (1, 2))]
+    else:
+        file_actions = [(os.POSIX_SPAWN_OPEN, fd, os.devnull, os.O_WRONLY, 0)
+                        for fd in (1, 2)]
+    actions, dups = fetch_pass_fds_actions(pass_fds)
+    file_actions += actions
+
+    try:
+        start = time.perf_counter_ns()
+        pid = os.posix_spawnp(argv[0], argv, env, file_actions=file_actions)
+
+        timer = None
+        killed = threading.Event()
+        if timeout is not None:
+
+            def kill():
+                killed.set()
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+            timer = threading.Timer(timeout, kill)
+            timer.start()
+
+        _, status, rusage = os.wait4(pid, 0)
+        duration = time.perf_counter_ns() - start
+
+        if timer is not None:
+            timer.cancel()
+            if killed.is_set():
+                raise subprocess.TimeoutExpired(argv, timeout)
+
+        res = {
+            'returncode': os.waitstatus_to_exitcode(status),
+            'duration_time': duration,
+            'user_time': int(rusage.ru_utime * 1e9),
+            'system_time': int(rusage.ru_stime * 1e9),
+            'maxrss': rusage.ru_maxrss,
+        }
+
+        if capture:
+            for name, f in zip(('stdout', 'stderr'), files):
+                f.seek(0)
+                res[name] = f.read().decode(errors='replace')
+
+        return res
+    finally:
+        for f in files:
+            f.close()
+        for fd in dups:
+            os.close(fd)
+
+
+def spawn_repeat(command: Union[str, Sequence[str]],
+                 num_runs: int,
+                 metric='duration_time',
+                 timeout: float = None) -> List[float]:
+    """Spawn given command `num_runs` times and collect `metric` of each run.
+
+    Args:
+        command (str | Sequence[str]): Argv, or a command line split with `shlex`.
+        num_runs (int): Times to run.
+        metric (str, optional): Key of `spawn` result to collect. Defaults to 'duration_time'.
+        timeout (float, optional): Seconds before a run is killed. Defaults to None.
+
+    Returns:
+        List[float]: `metric` of each run, `RuntimeError` is raised if a run fails.
+    """
+    argv = shlex.split(command) if isinstance(command, str) else list(command)
+    samples = []
+    for _ in range(num_runs):
+        res = spawn(argv, timeout=timeout)
+        if res['returncode'] != 0:
+            raise RuntimeError(f"{argv[0]} exited with {res['returncode']}")
+        samples.append(res[metric])
+    return samples
+
+
+def fetch_argv(command: Union[str, Sequence[str]]) -> List[str]:
+    """Fetch argv of a command, running command lines with shell syntax by `/bin/sh`.
+
+    Args:
+        command (str | Sequence[str]): Argv, or a command line.
+
+    Returns:
+        List[str]: Argv.
+    """
+    if not isinstance(command, str):
+        return list(command)
+    # plain words are run directly, so the shell is not measured as well
+    if SHELL_CHARS.isdisjoint(command):
+        return command.split()
+    return ['/bin/sh', '-c', command]
+
+
+def fetch_perf_stat(command,
+                    events: Sequence[str] = None,
+                    timeout: float = None,
+                    roi=False) -> Dict[str, Any]:
     """Use `perf stat <command>` to analyze given program and get dict of counters.
 
     Args:
-        command: Command to be used in `perf stat`.
+        command: Command to be used in `perf stat`, argv or a command line of shell.
+        events (Sequence[str], optional): Events to count. Defaults to common hardware and software events.
+        timeout (float, optional): Seconds before the program is killed. Defaults to None.
+        roi (bool, optional): Count only regions marked with `yatuner_roi.h` through `perf stat --control`, `duration_time` becomes the total time of regions. Defaults to False.
 
     """
-    perf_command = (
-        'perf stat -x,'
-        ' -e branch-instructions '
-        ' -e branch-misses '
-        ' -e bus-cycles '
-        ' -e cache-misses '
-        ' -e cache-references '
-        ' -e duration_time'
-        ' -e cpu-cycles '
-        ' -e instructions '
-        ' -e ref-cycles '
-        ' -e alignment-faults '
-        ' -e bpf-output '
-        ' -e context-switches '
-        ' -e cpu-clock '
-        ' -e cpu-migrations '
-        ' -e dummy '
-        ' -e emulation-faults '
-        ' -e major-faults '
-        ' -e minor-faults '
-        ' -e page-faults '
-        ' -e task-clock '
-        ' -e duration_time '
-        + command)
-
-    res = execute(perf_command)
+    if events is None:
+        events = [
+            'branch-instructions',
+            'branch-misses',
+            'bus-cycles',
+            'cache-misses',
+            'cache-references',
+            'cpu-cycles',
+            'instructions',
+            'ref-cycles',
+            'alignment-faults',
+            'context-switches',
+            'cpu-clock',
+            'cpu-migrations',
+            'major-faults',
+            'minor-faults',
+            'page-faults',
+            'task-clock',
+        ]
+    events = list(dict.fromkeys(list(events) + ['duration_time']))
+
+    command = fetch_argv(command)
+
+    perf_command = ['perf', 'stat', '-x,']
+    for event in events:
+        perf_command += ['-e', event]
+
+    channel = None
+    env = None
+    pass_fds = None
+    if roi:
+        channel = RoiChannel()
+        env = channel.env()
+        # perf takes the other ends at fds next to the ones of the program
+        ctl_fd, ack_fd = max(ROI_FDS.values()) + 1, max(ROI_FDS.values()) + 2
+        pass_fds = channel.child_fds()
+        pass_fds.update({ctl_fd: channel.ctl_r, ack_fd: channel.ack_w})
+        perf_command += ['--control', f'fd:{ctl_fd},{ack_fd}', '--delay=-1']
+
+    try:
+        res = spawn(perf_command + list(command),
+                    capture=True,
+                    timeout=timeout,
+                    env=env,
+                    pass_fds=pass_fds)
+        if channel is not None:
+            channel.close_child_ends()
+            duration = channel.fetch_time()
+    except FileNotFoundError as err:
+        raise RuntimeError(str(err))
+    finally:
+        if channel is not None:
+            channel.close()
 
     if res['returncode'] != 0:
         raise RuntimeError(res['stderr'])
+    elif roi and duration is None:
+        raise RuntimeError("no region of interest reported")
     else:
         counter_tuples = []
         for line in res['stderr'].splitlines():
             stat = line.split(',')
+            if len(stat) < 3:
+                # messages of perf or output of the program
+                continue
             counter_tuples.append((stat[2], stat[0]))
         # print(counter_tuples)
         counter_dict = dict(
             (x, 0 if y in ['<not supported>', '<not counted>'] else float(y))
             for (x, y) in counter_tuples)
+        if roi:
+            counter_dict['duration_time'] = duration
 
         return counter_dict
 
@@ -297,4 +563,105 @@ def fetch_size(filename: str) -> int:
     Returns:
         int: File size in bytes.
     """
-    return os.path.getsize(filename)
\ No newline at end of file
+    return os.path.getsize(filename)
+
+
+def fetch_fingerprint(filename: str) -> str:
+    """Fetch a fingerprint of an executable file.
+
+    For ELF files only sections loaded at runtime are hashed, so build-id
+    notes, `.comment`, debug info and symbol tables make no difference.
+    Other files are hashed as a whole.
+
+    Args:
+        filename (str): Path to file.
+
+    Returns:
+        str: Hex digest.
+    """
+    with open(filename, 'rb') as f:
+        data = f.read()
+
+    digest = hashlib.sha256()
+
+    if data[:4] != b'\x7fELF':
+        digest.update(data)
+        return digest.hexdigest()
+
+    endian = '<' if data[5] == 1 else '>'
+    if data[4] == 2:
+        shoff, = struct.unpack_from(endian + 'Q', data, 0x28)
+        shentsize, shnum, shstrndx = struct.unpack_from(
+            endian + 'HHH', data, 0x3a)
+        section = endian + 'IIQQQQ'
+    else:
+        shoff, = struct.unpack_from(endian + 'I', data, 0x20)
+        shentsize, shnum, shstrndx = struct.unpack_from(
+            endian + 'HHH', data, 0x2e)
+        section = endian + 'IIIIII'
+
+    sections = [
+        struct.unpack_from(section, data, shoff + i * shentsize)
+        for i in range(shnum)
+    ]
+    strtab_offset = sections[shstrndx][4] if sections else 0
+
+    shf_alloc = 0x2
+    sht_nobits = 8
+    for name, kind, flags, addr, offset, size in sections:
+        name = data[strtab_offset + name:data.index(b'\0', strtab_offset +
+                                                    name)]
+        if not flags & shf_alloc or name == b'.note.gnu.build-id':
+            continue
+        digest.update(name + struct.pack('<QQ', addr, size))
+        if kind != sht_nobits:
+            digest.update(data[offset:offset + size])
+
+    return digest.hexdigest()
+
+
+def fetch_tmpfs_dir() -> str:
+    """Fetch a writable directory mounted as tmpfs.
+
+    Returns:
+        str: The directory, None if not found.
+    """
+    mounts = {}
+    try:
+        with open('/proc/mounts', 'r', encoding='utf-8') as f:
+            for line in f.readlines():
+                _, mount_point, fs_type = line.split()[:3]
+                mounts[mount_point] = fs_type
+    except OSError:
+        return None
+
+    candidates = [
+        '/dev/shm',
+        os.environ.get('XDG_RUNTIME_DIR'),
+        f'/run/user/{os.getuid()}',
+        tempfile.gettempdir(),
+    ]
+    for candidate in candidates:
+        if (candidate is not None and mounts.get(candidate) == 'tmpfs'
+                and os.access(candidate, os.W_OK)):
+            return candidate
+
+    return None
+
+
+def make_memory_dir(prefix='yatuner-') -> str:
+    """Make a temporary directory on tmpfs, removed at exit.
+
+    Args:
+        prefix (str, optional): Prefix of directory name. Defaults to 'yatuner-'.
+
+    Returns:
+        str: The directory, None if tmpfs is not available.
+    """
+    tmpfs = fetch_tmpfs_dir()
+    if tmpfs is None:
+        return None
+
+    path = tempfile.mkdtemp(prefix=prefix, dir=tmpfs)
+    atexit.register(shutil.rmtree, path, True)
+    return path